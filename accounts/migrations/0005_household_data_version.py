@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-19 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_invitation_uniq_household_invited_email'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='household',
+            name='data_version',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -14,6 +14,10 @@ class Household(models.Model):
     # 目標備蓄日数（画面設計図：3/7/14/カスタム）:contentReference[oaicite:6]{index=6}
     target_days = models.PositiveIntegerField(default=3)
 
+    # 世帯の在庫データ（在庫・分類・保管場所）が変わるたびに +1 される番号
+    # 集計結果やグラフのキャッシュキーに使う（inventory.services.versions）
+    data_version = models.PositiveBigIntegerField(default=0, editable=False)
+
     def __str__(self):
         return self.name
 
@@ -9,6 +9,7 @@ urlpatterns = [
     path("mypage/", views.MyPageView.as_view(), name="mypage"),
     path("alert_setting/", views.AlertSettingView.as_view(), name="alert_setting"),
     path("members/", views.MemberListView.as_view(), name="member_list"),
+    path("members/json/", views.MemberListApiView.as_view(), name="member_list_json"),
     path("signup/", views.SignUpView.as_view(), name="signup"),
     path("signup/<uuid:token>/", SignUpView.as_view(), name="signup_with_token"),
     
@@ -18,8 +18,9 @@ from .forms import AlertSettingForm, UserUpdateForm, SignUpForm
 from .models import AlertSetting, Household
 
 # 既存：世帯必須のMixin（プロジェクトにあるやつ）
-from inventory.mixins import HouseholdRequiredMixin
+from inventory.mixins import AsyncHouseholdRequiredMixin, HouseholdRequiredMixin
 from inventory.models import InviteToken   # ← InviteToken の場所に合わせて修正
+from inventory.services import parallel
 
 
 User = get_user_model()
@@ -37,6 +38,31 @@ class MemberListView(LoginRequiredMixin, HouseholdRequiredMixin, TemplateView):
         context["members"] = members
         return context
     
+class MemberListApiView(AsyncHouseholdRequiredMixin, View):
+    """
+    世帯のメンバー一覧（JSON・async 版）
+    - 世帯 ＋ メンバー ＋ 未使用の招待数 を同時に読む
+    """
+
+    async def get(self, request):
+        household_id = request.user.household_id
+        household, members, pending_invites = await parallel.gather(
+            lambda: Household.objects.values("id", "name").get(pk=household_id),
+            lambda: list(
+                User.objects.filter(household_id=household_id)
+                .order_by("id")
+                .values("id", "username", "date_joined")
+            ),
+            lambda: InviteToken.objects.filter(
+                household_id=household_id, is_used=False, expires_at__gt=timezone.now()
+            ).count(),
+        )
+        return JsonResponse({
+            "household": household,
+            "members": members,
+            "pending_invites": pending_invites,
+        })
+
 class AlertSettingView(LoginRequiredMixin, HouseholdRequiredMixin, View):
     """
     アラート設定画面
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import InventoryItem, Memo, Category, StorageLocation
+from .models import InventoryItem, Memo, Category, StorageLocation, MediaFile
 
 admin.site.register(Category)
 admin.site.register(Memo)
@@ -16,3 +16,9 @@ class StorageLocationAdmin(admin.ModelAdmin):
     search_fields = ("name",)
     list_filter = ("household",)
 
+
+@admin.register(MediaFile)
+class MediaFileAdmin(admin.ModelAdmin):
+    list_display = ("id", "name", "size", "ref_count", "updated_at")
+    list_filter = ("ref_count",)
+    search_fields = ("name",)
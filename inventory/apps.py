@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class InventoryConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = 'inventory'
+
+    def ready(self):
+        # シグナル（画像の縮小処理など）を登録する
+        from . import signals  # noqa: F401
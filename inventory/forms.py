@@ -1,6 +1,6 @@
 # inventory/forms.py
 from django import forms
-from .models import InventoryItem
+from .models import Category, InventoryItem, StorageLocation
 
 
 class InventoryItemForm(forms.ModelForm):
@@ -30,4 +30,82 @@ class InventoryItemForm(forms.ModelForm):
         }
         widgets = {
             "expiry_date": forms.DateInput(attrs={"type": "date"}),
-        }
\ No newline at end of file
+        }
+
+
+class InventoryBulkEditForm(forms.Form):
+    """
+    選択した在庫の一括編集フォーム
+    - 分類・保管場所の選択肢は自分の世帯のものだけ（他世帯のIDは検証で弾かれる）
+    - 「変更しない」の項目は UPDATE に含めない
+    """
+    KEEP = ""
+    CLEAR = "none"
+
+    EXPIRY_CHOICES = [
+        ("keep", "変更しない"),
+        ("set", "この日付にする"),
+        ("clear", "未設定にする"),
+    ]
+
+    category = forms.ChoiceField(label="分類", required=False)
+    storage_location = forms.ChoiceField(label="保管場所", required=False)
+    expiry_action = forms.ChoiceField(label="賞味期限", choices=EXPIRY_CHOICES, initial="keep")
+    expiry_date = forms.DateField(
+        label="日付",
+        required=False,
+        widget=forms.DateInput(attrs={"type": "date"}),
+    )
+    quantity_delta = forms.IntegerField(
+        label="数量を増減",
+        required=False,
+        help_text="例：+2 / -1（0未満にはなりません）",
+    )
+
+    def __init__(self, *args, household, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self.fields["category"].choices = [
+            (self.KEEP, "変更しない"),
+            (self.CLEAR, "未分類にする"),
+        ] + [
+            (str(pk), name)
+            for pk, name in Category.objects.filter(household=household).order_by("name").values_list("id", "name")
+        ]
+        self.fields["storage_location"].choices = [
+            (self.KEEP, "変更しない"),
+            (self.CLEAR, "未設定にする"),
+        ] + [
+            (str(pk), name)
+            for pk, name in StorageLocation.objects.filter(household=household).order_by("name").values_list("id", "name")
+        ]
+
+    def clean(self):
+        cleaned = super().clean()
+        if cleaned.get("expiry_action") == "set" and not cleaned.get("expiry_date"):
+            self.add_error("expiry_date", "日付を入力してください。")
+        if not self.errors and not self.changes():
+            raise forms.ValidationError("変更する項目を1つ以上選んでください。")
+        return cleaned
+
+    def changes(self):
+        """
+        UPDATE に渡す値 {フィールド名: 値}（数量の増減だけは "quantity_delta" に入れる）
+        """
+        data = self.cleaned_data
+        changes = {}
+        for field in ("category", "storage_location"):
+            value = data.get(field)
+            if value == self.CLEAR:
+                changes[f"{field}_id"] = None
+            elif value:
+                changes[f"{field}_id"] = int(value)
+
+        if data.get("expiry_action") == "set":
+            changes["expiry_date"] = data.get("expiry_date")
+        elif data.get("expiry_action") == "clear":
+            changes["expiry_date"] = None
+
+        if data.get("quantity_delta"):
+            changes["quantity_delta"] = data["quantity_delta"]
+        return changes
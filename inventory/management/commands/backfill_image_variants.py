@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+
+from inventory.models import InventoryItem
+from inventory.services.thumbnails import generate_variants_for_source
+from inventory.services.workers import get_executor
+
+
+class Command(BaseCommand):
+    """
+    既存の在庫画像に縮小画像（サムネイル・詳細用）を作る
+
+    例）
+      python manage.py backfill_image_variants
+      python manage.py backfill_image_variants --force   # 既存の縮小画像も作り直す
+      python manage.py backfill_image_variants --sync    # ワーカーを使わず順番に処理
+    """
+
+    help = "在庫画像の縮小画像（WebP/JPEG）を一括作成します"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true", help="作成済みの縮小画像も作り直す")
+        parser.add_argument("--sync", action="store_true", help="ワーカープールを使わず同期で処理する")
+
+    def handle(self, *args, **options):
+        force = options["force"]
+
+        # 同じ画像を共有する在庫（複製など）は1回だけ処理する
+        qs = InventoryItem.objects.exclude(image="").exclude(image__isnull=True)
+        if not force:
+            qs = qs.filter(image_variants={})
+        sources = qs.values_list("image", flat=True).distinct().order_by("image")
+
+        total = 0
+        if options["sync"]:
+            for name in sources.iterator(chunk_size=500):
+                total += generate_variants_for_source(name, force=force)
+        else:
+            executor = get_executor()
+            futures = [
+                executor.submit(generate_variants_for_source, name, force)
+                for name in sources.iterator(chunk_size=500)
+            ]
+            for future in futures:
+                try:
+                    total += future.result()
+                except Exception as exc:
+                    self.stderr.write(f"失敗: {exc}")
+
+        self.stdout.write(self.style.SUCCESS(f"{total}件の在庫に縮小画像を設定しました。"))
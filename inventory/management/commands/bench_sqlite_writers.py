@@ -0,0 +1,163 @@
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+
+from inventory.services import writes
+
+BENCH_ALIAS = "sqlite_bench"
+
+
+def _percentile(values, ratio):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * ratio), len(values) - 1)]
+
+
+def _adjust(alias, item_id, writer):
+    """
+    数量の増減1回ぶん（apply_adjustments と同じ形：読んでから書き、履歴を1行足す）
+    """
+    with connections[alias].cursor() as cursor:
+        cursor.execute("SELECT quantity FROM bench_item WHERE id = %s", [item_id])
+        (quantity,) = cursor.fetchone()
+        cursor.execute("UPDATE bench_item SET quantity = %s WHERE id = %s", [quantity + 1, item_id])
+        cursor.execute(
+            "INSERT INTO bench_ledger (item_id, writer, delta) VALUES (%s, %s, %s)", [item_id, writer, 1]
+        )
+
+
+class Command(BaseCommand):
+    """
+    SQLite の同時書き込みを、既定の設定と本番向けの設定（settings.SQLITE_OPTIONS ＋
+    inventory.services.writes）で比べる
+
+    - 一時ファイルの SQLite を2つ作り、それぞれに --writers 本のスレッド（=接続）で
+      --writes 回ずつ書き込む。同時に --readers 本のスレッドが集計を読み続ける
+    - 1回の書き込みは「数量を読んで +1 し、履歴を1行足す」トランザクション
+    - 既定：Django の初期値のまま（rollback journal / BEGIN DEFERRED / timeout 5秒）、やり直しなし
+    - 本番：WAL などの PRAGMA / BEGIN IMMEDIATE / busy_timeout ＋ writes.run（プロセス内で順番・やり直し）
+    - 失敗（"database is locked" など）はエラーとして数える
+    - 実際のDB（DATABASES['default']）には触らない
+
+    例）
+      python manage.py bench_sqlite_writers
+      python manage.py bench_sqlite_writers --writers 50 --writes 40 --readers 10
+    """
+
+    help = "SQLite の同時書き込みのスループットを既定の設定と本番向けの設定で比較します"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--writers", type=int, default=50, help="同時に書き込むスレッド数")
+        parser.add_argument("--writes", type=int, default=20, help="1スレッドあたりの書き込み回数")
+        parser.add_argument("--readers", type=int, default=10, help="同時に読み続けるスレッド数")
+        parser.add_argument("--items", type=int, default=100, help="書き込み先の行数（少ないほど取り合う）")
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"書き込み {options['writers']} 本 × {options['writes']} 回 / 読み取り {options['readers']} 本 / "
+            f"行 {options['items']}"
+        )
+        self.stdout.write(
+            f"{'profile':<10} {'ok':>6} {'errors':>6} {'writes/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'reads/s':>8}"
+        )
+        profiles = (
+            ("default", {}, False),
+            ("production", getattr(settings, "SQLITE_OPTIONS", {}), True),
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            for name, sqlite_options, use_writes in profiles:
+                self._configure(Path(directory) / f"{name}.sqlite3", sqlite_options)
+                try:
+                    self._create_tables(options["items"])
+                    result = self._run(options, use_writes)
+                finally:
+                    connections[BENCH_ALIAS].close()
+                    del connections[BENCH_ALIAS]
+                    del connections.settings[BENCH_ALIAS]
+
+                ok, errors, elapsed, latencies, reads = result
+                self.stdout.write(
+                    f"{name:<10} {ok:>6} {errors:>6} {ok / elapsed:>9.1f} "
+                    f"{_percentile(latencies, 0.5) * 1000:>8.1f} {_percentile(latencies, 0.95) * 1000:>8.1f} "
+                    f"{reads / elapsed:>8.1f}"
+                )
+
+    def _configure(self, path, sqlite_options):
+        connections.settings[BENCH_ALIAS] = {
+            **connections[DEFAULT_DB_ALIAS].settings_dict,
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": str(path),
+            "OPTIONS": dict(sqlite_options),
+        }
+
+    def _create_tables(self, items):
+        with transaction.atomic(using=BENCH_ALIAS), connections[BENCH_ALIAS].cursor() as cursor:
+            cursor.execute("CREATE TABLE bench_item (id integer PRIMARY KEY, quantity integer NOT NULL)")
+            cursor.execute(
+                "CREATE TABLE bench_ledger (id integer PRIMARY KEY AUTOINCREMENT, item_id integer NOT NULL, "
+                "writer integer NOT NULL, delta integer NOT NULL)"
+            )
+            cursor.executemany(
+                "INSERT INTO bench_item (id, quantity) VALUES (%s, 0)", [(i,) for i in range(1, items + 1)]
+            )
+        connections[BENCH_ALIAS].close()
+
+    def _run(self, options, use_writes):
+        latencies = []
+        counts = {"ok": 0, "errors": 0, "reads": 0}
+        lock = threading.Lock()
+        done = threading.Event()
+
+        def write_loop(writer):
+            try:
+                for n in range(options["writes"]):
+                    item_id = (writer * options["writes"] + n) % options["items"] + 1
+                    started = time.perf_counter()
+                    try:
+                        if use_writes:
+                            writes.run(_adjust, BENCH_ALIAS, item_id, writer, using=BENCH_ALIAS)
+                        else:
+                            with transaction.atomic(using=BENCH_ALIAS):
+                                _adjust(BENCH_ALIAS, item_id, writer)
+                    except OperationalError:
+                        with lock:
+                            counts["errors"] += 1
+                        continue
+                    with lock:
+                        counts["ok"] += 1
+                        latencies.append(time.perf_counter() - started)
+            finally:
+                connections[BENCH_ALIAS].close()
+
+        def read_loop():
+            try:
+                while not done.is_set():
+                    try:
+                        with connections[BENCH_ALIAS].cursor() as cursor:
+                            cursor.execute("SELECT COUNT(*), SUM(delta) FROM bench_ledger")
+                            cursor.fetchone()
+                    except OperationalError:
+                        continue
+                    with lock:
+                        counts["reads"] += 1
+            finally:
+                connections[BENCH_ALIAS].close()
+
+        writers = [threading.Thread(target=write_loop, args=(i,)) for i in range(options["writers"])]
+        readers = [threading.Thread(target=read_loop) for _ in range(options["readers"])]
+        started = time.perf_counter()
+        for t in readers + writers:
+            t.start()
+        for t in writers:
+            t.join()
+        elapsed = time.perf_counter() - started
+        done.set()
+        for t in readers:
+            t.join()
+        return counts["ok"], counts["errors"], elapsed, latencies, counts["reads"]
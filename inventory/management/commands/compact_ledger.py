@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from accounts.models import Household
+from inventory.services.ledger import DEFAULT_KEEP_DAYS, compact
+
+
+class Command(BaseCommand):
+    """
+    数量の増減履歴を圧縮する（毎日1回の実行を想定）
+
+    - 世帯ごとに今日のスナップショットを作る
+    - 古い増減履歴（既定 30日より前）を削除する
+
+    例）
+      python manage.py compact_ledger
+      python manage.py compact_ledger --keep-days 7 --household 12
+    """
+
+    help = "世帯ごとの在庫スナップショットを作り、古い増減履歴を削除します"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--keep-days", type=int, default=DEFAULT_KEEP_DAYS)
+        parser.add_argument("--household", type=int, help="この世帯だけ処理する")
+
+    def handle(self, *args, **options):
+        households = Household.objects.order_by("id")
+        if options["household"]:
+            households = households.filter(pk=options["household"])
+
+        count = 0
+        deleted = 0
+        for household_id in households.values_list("id", flat=True).iterator(chunk_size=500):
+            deleted += compact(household_id, keep_days=options["keep_days"])
+            count += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{count}世帯のスナップショットを作成し、増減履歴を{deleted}件削除しました。"
+        ))
@@ -0,0 +1,48 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import Household
+from inventory.services.backup import export_jsonl, export_zip
+
+
+class Command(BaseCommand):
+    """
+    世帯1つを書き出す（バックアップ・別の環境への移行用）
+
+    - .zip：household.jsonl ＋ 画像（media/ の下）
+    - それ以外：JSONL だけ（画像は名前だけ入る）
+    - 少しずつ読んで少しずつ書くので、在庫・画像が多くてもメモリは増えない
+
+    例）
+      python manage.py export_household 12 --output backup.zip
+      python manage.py export_household 12 --output backup.jsonl
+      python manage.py export_household 12 > backup.jsonl
+    """
+
+    help = "世帯の在庫・履歴・分類・保管場所・メモ・アラート設定（と画像）を書き出します"
+
+    def add_arguments(self, parser):
+        parser.add_argument("household", type=int, help="世帯ID")
+        parser.add_argument("--output", help="書き出し先（.zip なら画像も入れる。省略時は JSONL を標準出力へ）")
+
+    def handle(self, *args, **options):
+        try:
+            household = Household.objects.get(pk=options["household"])
+        except Household.DoesNotExist:
+            raise CommandError(f"世帯 {options['household']} が見つかりません。")
+
+        output = options["output"]
+        if not output:
+            for chunk in export_jsonl(household):
+                sys.stdout.buffer.write(chunk)
+            return
+
+        chunks = export_zip(household) if output.endswith(".zip") else export_jsonl(household)
+        size = 0
+        with open(output, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+                size += len(chunk)
+
+        self.stderr.write(self.style.SUCCESS(f"{household.name} を {output} に書き出しました（{size:,} bytes）。"))
@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.models import Household
+from inventory.services.forecast import save_forecasts
+
+
+class Command(BaseCommand):
+    """
+    全世帯の分類ごとの消費ペースを推定して保存する（夜間バッチ）
+
+    - 世帯を chunk-size 件ずつまとめて、1チャンクあたり数クエリで計算する
+    - バランス画面は今日の計算結果があればそれを使う
+
+    例）
+      python manage.py forecast_consumption
+      python manage.py forecast_consumption --chunk-size 1000
+    """
+
+    help = "分類ごとの1日あたり消費量を全世帯分まとめて推定します"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        started = time.monotonic()
+
+        households = 0
+        saved = 0
+        chunk = []
+        for household_id in Household.objects.order_by("id").values_list("id", flat=True).iterator(chunk_size=chunk_size):
+            chunk.append(household_id)
+            if len(chunk) >= chunk_size:
+                saved += save_forecasts(chunk)
+                households += len(chunk)
+                chunk = []
+        if chunk:
+            saved += save_forecasts(chunk)
+            households += len(chunk)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"{households}世帯・{saved}分類の消費ペースを保存しました（{elapsed:.1f}秒）。"
+        ))
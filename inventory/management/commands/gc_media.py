@@ -0,0 +1,50 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from inventory.services.media import collect_garbage, collect_untracked, rebuild_ref_counts
+
+
+class Command(BaseCommand):
+    """
+    参照されなくなった在庫画像を削除する（定期実行を想定）
+
+    例）
+      python manage.py gc_media                  # 参照数0のファイルを削除
+      python manage.py gc_media --dry-run        # 消さずに件数と容量だけ表示
+      python manage.py gc_media --rebuild        # 先に参照数を数え直す
+      python manage.py gc_media --scan           # 管理外の古いファイルも探して削除
+    """
+
+    help = "参照されていない在庫画像を削除し、回収した容量を表示します"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=500)
+        parser.add_argument("--grace-hours", type=int, default=24, help="参照0になってから削除するまでの猶予（時間）")
+        parser.add_argument("--dry-run", action="store_true")
+        parser.add_argument("--rebuild", action="store_true", help="参照数を在庫テーブルから数え直す")
+        parser.add_argument("--scan", action="store_true", help="MediaFile に無いファイルもストレージを走査して削除")
+
+    def handle(self, *args, **options):
+        grace = timedelta(hours=options["grace_hours"])
+        chunk_size = options["chunk_size"]
+        dry_run = options["dry_run"]
+
+        if options["rebuild"]:
+            fixed = rebuild_ref_counts(chunk_size=chunk_size)
+            self.stdout.write(f"参照数を修正：{fixed}件")
+
+        result = collect_garbage(chunk_size=chunk_size, grace=grace, dry_run=dry_run)
+        files, reclaimed = result["files"], result["bytes"]
+        if result["fixed"]:
+            self.stdout.write(f"参照が残っていたため保持：{result['fixed']}件")
+
+        if options["scan"]:
+            untracked = collect_untracked(chunk_size=chunk_size, grace=grace, dry_run=dry_run)
+            files += untracked["files"]
+            reclaimed += untracked["bytes"]
+
+        label = "削除予定" if dry_run else "削除"
+        self.stdout.write(self.style.SUCCESS(
+            f"{label}：{files}ファイル / 回収 {reclaimed:,} bytes（{reclaimed / 1024 / 1024:.1f} MB）"
+        ))
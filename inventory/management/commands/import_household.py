@@ -0,0 +1,60 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.services.backup import InvalidBackup, import_lines, open_backup
+
+
+class Command(BaseCommand):
+    """
+    export_household で書き出したファイルから、新しい世帯を作って読み込む
+
+    - .zip なら画像もストレージに戻す（同じ画像が既にあれば書かない）
+    - 分類・保管場所は名前で引き直す
+    - メモの作成者は --owner のユーザーと同じ名前のときだけそのまま使い、それ以外は --owner のメモにする
+      （ほかの世帯のユーザーには付けない）
+    - 500件ずつまとめて書く。全体で1トランザクション（失敗したら何も残らない）
+    - メンバーは読み込まない（招待で入ってもらう）
+    - 縮小画像は作らないので、後で backfill_image_variants を実行する
+
+    例）
+      python manage.py import_household backup.zip
+      python manage.py import_household backup.jsonl --name "実家" --owner alice
+    """
+
+    help = "書き出した世帯データ（.jsonl / .zip）を新しい世帯として読み込みます"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="export_household で書き出したファイル")
+        parser.add_argument("--name", help="世帯名（省略時は書き出し元の世帯名）")
+        parser.add_argument("--owner", help="読み込む人のユーザー名（作成者が自分以外のメモは、このユーザーのメモとして読み込む）")
+
+    def handle(self, *args, **options):
+        owner = None
+        if options["owner"]:
+            owner = get_user_model().objects.filter(username=options["owner"]).first()
+            if owner is None:
+                raise CommandError(f"ユーザー {options['owner']} が見つかりません。")
+
+        try:
+            lines, archive = open_backup(options["path"])
+        except OSError as e:
+            raise CommandError(f"ファイルを開けません：{e}")
+
+        try:
+            household, counts, skipped = import_lines(lines, archive=archive, name=options["name"], owner=owner)
+        except InvalidBackup as e:
+            raise CommandError(str(e))
+        finally:
+            lines.close()
+            if archive is not None:
+                archive.close()
+
+        self.stdout.write(
+            "分類 {category} / 保管場所 {storage_location} / 在庫 {item} / 増減履歴 {ledger} / "
+            "スナップショット {snapshot} / メモ {memo}".format(**counts)
+        )
+        if skipped["image"]:
+            self.stdout.write(self.style.WARNING(f"画像が見つからず外した在庫：{skipped['image']}件"))
+        if skipped["memo"]:
+            self.stdout.write(self.style.WARNING(f"作成者が読み込み先の世帯にいないため読み込まなかったメモ：{skipped['memo']}件（--owner で指定できます）"))
+        self.stdout.write(self.style.SUCCESS(f"世帯「{household.name}」（ID {household.pk}）を作成しました。"))
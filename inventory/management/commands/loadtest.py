@@ -0,0 +1,208 @@
+import asyncio
+import io
+import threading
+import time
+from importlib import import_module
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+
+# 既定で測る読み取り API（async 版）
+DEFAULT_PATHS = [
+    "/inventory/api/items/",
+    "/inventory/api/balance/",
+    "/inventory/api/history/",
+    "/inventory/api/autocomplete/?q=a",
+    "/accounts/members/json/",
+]
+
+
+def _percentile(values, ratio):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * ratio), len(values) - 1)]
+
+
+def _wsgi_request(app, path, host, cookie):
+    path_info, _, query = path.partition("?")
+    environ = {
+        "REQUEST_METHOD": "GET",
+        "PATH_INFO": path_info,
+        "QUERY_STRING": query,
+        "HTTP_HOST": host,
+        "HTTP_COOKIE": cookie,
+        "wsgi.input": io.BytesIO(b""),
+    }
+    setup_testing_defaults(environ)
+
+    status = []
+
+    def start_response(line, headers, exc_info=None):
+        status.append(int(line.split()[0]))
+
+    result = app(environ, start_response)
+    try:
+        for _ in result:
+            pass
+    finally:
+        if hasattr(result, "close"):
+            result.close()
+    return status[0]
+
+
+async def _asgi_request(app, path, host, cookie):
+    path_info, _, query = path.partition("?")
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path_info,
+        "raw_path": path_info.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [(b"host", host.encode()), (b"cookie", cookie.encode())],
+        "client": ("127.0.0.1", 50000),
+        "server": (host, 80),
+    }
+    received = []
+    status = []
+
+    async def receive():
+        if not received:
+            received.append(True)
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # 切断はしない（応答を返し終わると Django 側で待ちがキャンセルされる）
+        await asyncio.Future()
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    await app(scope, receive, send)
+    return status[0]
+
+
+class Command(BaseCommand):
+    """
+    読み取り API を WSGI と ASGI で同時接続数を揃えて叩き、スループットを比べる
+
+    - サーバーは立てず、同じプロセスの中で Django の WSGI / ASGI ハンドラを直接呼ぶ
+      （HTTP の解析・ネットワークは含まない。Django とDBの部分の比較）
+    - WSGI：--wsgi-threads 本のワーカースレッド（gunicorn の gthread 相当）を
+      --users 人が取り合う。待ち時間も応答時間に含める
+    - ASGI：1つのイベントループで --users 人が同時に送る
+    - 各ユーザーは --requests 回ずつ順番に送る。200 以外の応答はエラーとして数える
+    - 指定したユーザーでログインしたセッションを一時的に作り、終わったら消す
+
+    例）
+      python manage.py loadtest --username alice
+      python manage.py loadtest --username alice --users 200 --requests 5 --wsgi-threads 8
+      python manage.py loadtest --username alice --path /inventory/api/items/ --path /inventory/
+    """
+
+    help = "読み取り API の WSGI / ASGI スループットを同時接続数を揃えて比較します"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--username", required=True, help="ログインに使うユーザー（世帯に所属していること）")
+        parser.add_argument("--users", type=int, default=200, help="同時に使うユーザー数")
+        parser.add_argument("--requests", type=int, default=5, help="1ユーザーあたりのリクエスト数")
+        parser.add_argument("--wsgi-threads", type=int, default=8, help="WSGI のワーカースレッド数")
+        parser.add_argument("--path", action="append", dest="paths", help="測るパス（複数指定可）")
+        parser.add_argument("--host", default="localhost", help="Host ヘッダー（ALLOWED_HOSTS に入っていること）")
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(username=options["username"])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"ユーザー {options['username']} が見つかりません。")
+        if not user.household_id:
+            raise CommandError("世帯に所属しているユーザーを指定してください。")
+
+        session = self._login(user)
+        cookie = f"{settings.SESSION_COOKIE_NAME}={session.session_key}"
+        wsgi_app = get_wsgi_application()
+        asgi_app = get_asgi_application()
+
+        self.stdout.write(
+            f"同時ユーザー {options['users']} / 1人 {options['requests']} 回 / "
+            f"WSGI スレッド {options['wsgi_threads']}"
+        )
+        self.stdout.write(f"{'path':<36} {'server':<5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>6}")
+        try:
+            for path in options["paths"] or DEFAULT_PATHS:
+                for server, run in (("WSGI", self._run_wsgi), ("ASGI", self._run_asgi)):
+                    app = wsgi_app if server == "WSGI" else asgi_app
+                    elapsed, latencies, errors = run(app, path, cookie, options)
+                    self.stdout.write(
+                        f"{path:<36} {server:<5} {len(latencies) / elapsed:>8.1f} "
+                        f"{_percentile(latencies, 0.5) * 1000:>8.1f} "
+                        f"{_percentile(latencies, 0.95) * 1000:>8.1f} {errors:>6}"
+                    )
+        finally:
+            session.delete()
+
+    def _login(self, user):
+        """
+        force_login と同じ内容のセッションを作る
+        """
+        session = import_module(settings.SESSION_ENGINE).SessionStore()
+        session[SESSION_KEY] = user._meta.pk.value_to_string(user)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.save()
+        return session
+
+    def _run_wsgi(self, app, path, cookie, options):
+        workers = threading.Semaphore(options["wsgi_threads"])
+        latencies = []
+        errors = []
+        lock = threading.Lock()
+
+        def user_loop():
+            try:
+                for _ in range(options["requests"]):
+                    started = time.perf_counter()
+                    with workers:
+                        status = _wsgi_request(app, path, options["host"], cookie)
+                    with lock:
+                        latencies.append(time.perf_counter() - started)
+                        if status != 200:
+                            errors.append(status)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=user_loop) for _ in range(options["users"])]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return time.perf_counter() - started, latencies, len(errors)
+
+    def _run_asgi(self, app, path, cookie, options):
+        latencies = []
+        errors = []
+
+        async def user_loop():
+            for _ in range(options["requests"]):
+                started = time.perf_counter()
+                status = await _asgi_request(app, path, options["host"], cookie)
+                latencies.append(time.perf_counter() - started)
+                if status != 200:
+                    errors.append(status)
+
+        async def main():
+            started = time.perf_counter()
+            await asyncio.gather(*(user_loop() for _ in range(options["users"])))
+            return time.perf_counter() - started
+
+        elapsed = asyncio.run(main())
+        return elapsed, latencies, len(errors)
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from inventory.services.deletion import CHUNK_SIZE, purge_pending
+
+
+class Command(BaseCommand):
+    """
+    削除済みの印が残っている分類・保管場所を片付ける
+
+    - ふだんは削除の直後にワーカーが片付けるので、印は残らない
+    - プロセスの再起動などでワーカーが途中で止まったときのやり直し用（定期実行してもよい）
+    - 在庫は --chunk-size 件ずつ、短いトランザクションで外す
+
+    例）
+      python manage.py purge_deleted
+      python manage.py purge_deleted --chunk-size 200
+    """
+
+    help = "削除済みの分類・保管場所から在庫を少しずつ外し、物理削除します"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="1トランザクションで外す在庫の数")
+
+    def handle(self, *args, **options):
+        result = purge_pending(chunk_size=options["chunk_size"])
+        self.stdout.write(self.style.SUCCESS(
+            f"分類 {result['category']}件 / 保管場所 {result['location']}件を削除し、"
+            f"在庫 {result['items']}件を外しました。"
+        ))
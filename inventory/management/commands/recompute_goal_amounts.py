@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.models import Household
+from inventory.services.supply import recompute_goal_amounts
+
+
+class Command(BaseCommand):
+    """
+    1人1日あたりの目安量が入っている分類の目標量を、全世帯分まとめて計算し直す
+
+    - 通常は目標備蓄日数・メンバーの変更時に自動で計算し直される
+    - 一括でユーザーを移動した後や、データ移行の後に使う
+
+    例）
+      python manage.py recompute_goal_amounts
+      python manage.py recompute_goal_amounts --household 12
+    """
+
+    help = "目標備蓄日数 × 人数 × 目安量 で分類の目標量を計算し直します"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--household", type=int, help="この世帯だけ計算し直す")
+        parser.add_argument("--chunk-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        started = time.monotonic()
+
+        households = Household.objects.order_by("id")
+        if options["household"]:
+            households = households.filter(pk=options["household"])
+
+        updated = 0
+        chunk = []
+        for household_id in households.values_list("id", flat=True).iterator(chunk_size=chunk_size):
+            chunk.append(household_id)
+            if len(chunk) >= chunk_size:
+                updated += recompute_goal_amounts(chunk)
+                chunk = []
+        if chunk:
+            updated += recompute_goal_amounts(chunk)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"{updated}分類の目標量を更新しました（{elapsed:.1f}秒）。"
+        ))
@@ -0,0 +1,47 @@
+# Generated by Django 6.0.2 on 2026-10-19 10:30
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_household_data_version'),
+        ('inventory', '0020_mediafile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventorySnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('taken_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('items', models.JSONField(default=dict)),
+                ('categories', models.JSONField(default=dict)),
+                ('household', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='accounts.household')),
+            ],
+            options={
+                'ordering': ['-taken_at'],
+                'constraints': [models.UniqueConstraint(fields=('household', 'date'), name='uniq_snapshot_per_household_date')],
+            },
+        ),
+        migrations.CreateModel(
+            name='QuantityLedger',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('item_id', models.BigIntegerField()),
+                ('category_id', models.BigIntegerField(blank=True, null=True)),
+                ('content_amount', models.FloatField(default=1.0)),
+                ('delta', models.IntegerField()),
+                ('reason', models.CharField(choices=[('create', '追加'), ('edit', '編集'), ('duplicate', '複製'), ('delete', '削除'), ('restore', '履歴から復元'), ('bulk_delete', '一括削除'), ('bulk_duplicate', '一括複製')], max_length=20)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('household', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entries', to='accounts.household')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['household', 'created_at'], name='ledger_household_time_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 6.0.2 on 2026-10-19 11:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_household_data_version'),
+        ('inventory', '0021_quantityledger_inventorysnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('daily_rate', models.FloatField(default=0)),
+                ('sample_days', models.PositiveIntegerField(default=0)),
+                ('computed_on', models.DateField()),
+                ('category', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='forecast', to='inventory.category')),
+                ('household', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='forecasts', to='accounts.household')),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-19 00:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0022_categoryforecast'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='daily_rate_per_person',
+            field=models.FloatField(default=0, verbose_name='1人1日あたりの目安量'),
+        ),
+    ]
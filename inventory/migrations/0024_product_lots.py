@@ -0,0 +1,66 @@
+# Generated by Django 6.0.2 on 2026-10-19 00:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def group_items_into_products(apps, schema_editor):
+    """
+    既存の在庫を (世帯, 名前) ごとに Product にまとめる
+    - Product は bulk_create、ひも付けは名前ごとの UPDATE 1回
+    """
+    InventoryItem = apps.get_model("inventory", "InventoryItem")
+    Product = apps.get_model("inventory", "Product")
+
+    pairs = set(
+        InventoryItem.objects.values_list("household_id", "name").distinct()
+    )
+    Product.objects.bulk_create(
+        [Product(household_id=household_id, name=name) for household_id, name in pairs],
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+    for product_id, household_id, name in Product.objects.values_list("id", "household_id", "name"):
+        InventoryItem.objects.filter(household_id=household_id, name=name).update(product_id=product_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_household_data_version'),
+        ('inventory', '0023_category_daily_rate_per_person'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='quantityledger',
+            name='reason',
+            field=models.CharField(choices=[('create', '追加'), ('edit', '編集'), ('duplicate', '複製'), ('delete', '削除'), ('restore', '履歴から復元'), ('bulk_delete', '一括削除'), ('bulk_duplicate', '一括複製'), ('consume', '使用')], max_length=20),
+        ),
+        migrations.CreateModel(
+            name='Product',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='商品名')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('household', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='products', to='accounts.household')),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='inventoryitem',
+            name='product',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='lots', to='inventory.product'),
+        ),
+        migrations.AddIndex(
+            model_name='inventoryitem',
+            index=models.Index(fields=['product', 'expiry_date'], name='item_product_expiry_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='product',
+            constraint=models.UniqueConstraint(fields=('household', 'name'), name='uniq_household_product_name'),
+        ),
+        migrations.RunPython(group_items_into_products, migrations.RunPython.noop),
+    ]
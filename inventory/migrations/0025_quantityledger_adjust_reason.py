@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-19 00:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0024_product_lots'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='quantityledger',
+            name='reason',
+            field=models.CharField(choices=[('create', '追加'), ('edit', '編集'), ('duplicate', '複製'), ('delete', '削除'), ('restore', '履歴から復元'), ('bulk_delete', '一括削除'), ('bulk_duplicate', '一括複製'), ('consume', '使用'), ('adjust', '数量調整')], max_length=20),
+        ),
+    ]
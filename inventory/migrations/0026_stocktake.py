@@ -0,0 +1,53 @@
+# Generated by Django 6.0.2 on 2026-10-19 00:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_household_data_version'),
+        ('inventory', '0025_quantityledger_adjust_reason'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='quantityledger',
+            name='reason',
+            field=models.CharField(choices=[('create', '追加'), ('edit', '編集'), ('duplicate', '複製'), ('delete', '削除'), ('restore', '履歴から復元'), ('bulk_delete', '一括削除'), ('bulk_duplicate', '一括複製'), ('consume', '使用'), ('adjust', '数量調整'), ('stocktake', '棚卸し')], max_length=20),
+        ),
+        migrations.CreateModel(
+            name='StocktakeSession',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('open', '棚卸し中'), ('applied', '反映済み'), ('cancelled', '中止')], default='open', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('applied_at', models.DateTimeField(blank=True, null=True)),
+                ('household', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stocktakes', to='accounts.household')),
+                ('started_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stocktakes', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='StocktakeEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('expected_quantity', models.IntegerField()),
+                ('expected_updated_at', models.DateTimeField()),
+                ('counted_quantity', models.IntegerField(blank=True, null=True)),
+                ('counted_at', models.DateTimeField(blank=True, null=True)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stocktake_entries', to='inventory.inventoryitem')),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='inventory.stocktakesession')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='stocktakesession',
+            index=models.Index(fields=['household', 'status'], name='stocktake_household_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='stocktakeentry',
+            constraint=models.UniqueConstraint(fields=('session', 'item'), name='uniq_stocktake_session_item'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 6.0.2 on 2026-10-19 00:56
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_household_data_version'),
+        ('inventory', '0028_operationbatch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdempotencyKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64)),
+                ('status', models.CharField(choices=[('pending', '処理中'), ('done', '完了')], default='pending', max_length=10)),
+                ('location', models.CharField(blank=True, max_length=500)),
+                ('payload', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('household', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='idempotency_keys', to='accounts.household')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('household', 'key'), name='uniq_household_idempotency_key')],
+            },
+        ),
+    ]
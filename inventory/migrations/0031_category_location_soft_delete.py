@@ -0,0 +1,63 @@
+# Generated by Django 6.0.2 on 2026-10-19 01:39
+
+import django.db.models.manager
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_household_data_version'),
+        ('inventory', '0030_sync_updated_at_tombstones'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='category',
+            options={'base_manager_name': 'all_objects', 'ordering': ['name']},
+        ),
+        migrations.AlterModelOptions(
+            name='storagelocation',
+            options={'base_manager_name': 'all_objects'},
+        ),
+        migrations.AlterModelManagers(
+            name='category',
+            managers=[
+                ('objects', django.db.models.manager.Manager()),
+                ('all_objects', django.db.models.manager.Manager()),
+            ],
+        ),
+        migrations.AlterModelManagers(
+            name='storagelocation',
+            managers=[
+                ('objects', django.db.models.manager.Manager()),
+                ('all_objects', django.db.models.manager.Manager()),
+            ],
+        ),
+        migrations.RemoveConstraint(
+            model_name='category',
+            name='uniq_household_category_name',
+        ),
+        migrations.RemoveConstraint(
+            model_name='storagelocation',
+            name='uniq_storage_location_per_household',
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='is_deleted',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='storagelocation',
+            name='is_deleted',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddConstraint(
+            model_name='category',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_deleted', False)), fields=('household', 'name'), name='uniq_household_category_name'),
+        ),
+        migrations.AddConstraint(
+            model_name='storagelocation',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_deleted', False)), fields=('household', 'name'), name='uniq_storage_location_per_household'),
+        ),
+    ]
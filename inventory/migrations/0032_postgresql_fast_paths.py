@@ -0,0 +1,53 @@
+# Generated by Django 6.0.2 on 2026-10-19 01:45
+
+from django.db import migrations
+
+# PostgreSQL のときだけ作るインデックス（SQLite では何もしない）
+# - 名前の部分一致（name__icontains）：PostgreSQL では UPPER(name::text) LIKE UPPER('%...%') になるので、
+#   同じ式に pg_trgm の GIN インデックスを張る
+# - 論理削除：一覧・検索は is_deleted = false の行しか見ないので、その行だけの部分インデックス
+TRIGRAM_INDEXES = [
+    ("item_name_trgm_idx", "inventory_inventoryitem", "name"),
+    ("product_name_trgm_idx", "inventory_product", "name"),
+    ("category_name_trgm_idx", "inventory_category", "name"),
+    ("location_name_trgm_idx", "inventory_storagelocation", "name"),
+    ("memo_title_trgm_idx", "inventory_memo", "title"),
+]
+PARTIAL_INDEXES = [
+    ("item_live_name_idx", "inventory_inventoryitem", "household_id, name", "NOT is_deleted"),
+    ("item_live_expiry_idx", "inventory_inventoryitem", "household_id, expiry_date", "NOT is_deleted"),
+    ("item_deleted_name_idx", "inventory_inventoryitem", "household_id, name", "is_deleted"),
+    ("category_deleted_idx", "inventory_category", "id", "is_deleted"),
+    ("location_deleted_idx", "inventory_storagelocation", "id", "is_deleted"),
+]
+
+
+def create_postgresql_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin (UPPER({column}::text) gin_trgm_ops)"
+        )
+    for name, table, columns, condition in PARTIAL_INDEXES:
+        schema_editor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns}) WHERE {condition}")
+
+
+def drop_postgresql_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    # pg_trgm 拡張はほかで使っているかもしれないので残す
+    for name, *_ in TRIGRAM_INDEXES + PARTIAL_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0031_category_location_soft_delete'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_postgresql_indexes, drop_postgresql_indexes),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 6.0.2 on 2026-10-19 09:00
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0032_postgresql_fast_paths'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='stocktakeentry',
+            name='expected_updated_at',
+        ),
+    ]
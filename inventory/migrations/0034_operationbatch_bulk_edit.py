@@ -0,0 +1,36 @@
+# Generated by Django 6.0.2 on 2026-10-19 09:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0033_remove_stocktakeentry_expected_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='operationbatch',
+            name='changed_fields',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AlterField(
+            model_name='operationbatch',
+            name='kind',
+            field=models.CharField(choices=[('bulk_delete', '一括削除'), ('bulk_duplicate', '一括複製'), ('bulk_edit', '一括編集')], max_length=20),
+        ),
+        migrations.CreateModel(
+            name='OperationBatchEdit',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('expiry_date', models.DateField(blank=True, null=True)),
+                ('quantity_delta', models.IntegerField(default=0)),
+                ('batch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='edits', to='inventory.operationbatch')),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='inventory.category')),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='inventory.inventoryitem')),
+                ('storage_location', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='inventory.storagelocation')),
+            ],
+        ),
+    ]
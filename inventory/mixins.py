@@ -1,8 +1,12 @@
 # inventory/mixins.py
 
+from django.contrib import messages
+from django.contrib.auth.views import redirect_to_login
 from django.shortcuts import redirect
 from django.urls import reverse
 
+from .services import idempotency
+
 class HouseholdRequiredMixin:
     """
     ログインユーザーに household が設定されていない場合、
@@ -13,4 +17,75 @@ class HouseholdRequiredMixin:
         if not getattr(request.user, "household", None):
             return redirect(reverse("inventory:no_household"))
         return super().dispatch(request, *args, **kwargs)
-    
\ No newline at end of file
+    
+
+class AsyncHouseholdRequiredMixin:
+    """
+    async ビュー用の LoginRequiredMixin + HouseholdRequiredMixin
+    - request.user は触ると同期でDBを読む（イベントループ上では使えない）ので、
+      request.auser() で読み込んだユーザーに差し替えてから判定する
+    - 世帯は request.user.household_id で使う（household を触ると同期で読みに行く）
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        if not user.household_id:
+            return redirect(reverse("inventory:no_household"))
+        request.user = user
+        return await super().dispatch(request, *args, **kwargs)
+
+
+class IdempotentPostMixin:
+    """
+    二重送信（連打・通信が遅いときの再送）で同じ処理が2回走らないようにするMixin
+
+    - フォームに {% idempotency_field %} でキーを埋め込んでおく
+    - 初めてのキー：普通に処理し、結果（リダイレクト先など）をキーと一緒に保存
+    - 2回目以降：処理をせず、1回目の結果をそのまま返す
+    - キーが無い送信（古い画面など）は今まで通り処理する
+
+    結果の保存・再現は次の2つで変えられる（デフォルトはリダイレクトだけ保存）
+      idempotency_outcome(response) → (location, payload) か None（保存しない）
+      idempotency_replay(record)    → 2回目以降に返すレスポンス
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        # post() を定義しているViewでも効くよう dispatch で包む
+        # （LoginRequiredMixin / HouseholdRequiredMixin より後ろに置く）
+        if request.method != "POST":
+            return super().dispatch(request, *args, **kwargs)
+
+        key = request.POST.get(idempotency.FIELD_NAME, "")
+        if not idempotency.valid_key(key):
+            return super().dispatch(request, *args, **kwargs)
+
+        record, created = idempotency.claim(request.user.household, key)
+        if not created:
+            if record.status == record.STATUS_DONE:
+                return self.idempotency_replay(record)
+            messages.info(request, "前回の送信を処理しています。しばらくしてから確認してください。")
+            return redirect(reverse("inventory:inventory_list"))
+
+        try:
+            response = super().dispatch(request, *args, **kwargs)
+        except Exception:
+            idempotency.release(record)
+            raise
+
+        outcome = self.idempotency_outcome(response)
+        if outcome is None:
+            idempotency.release(record)
+        else:
+            location, payload = outcome
+            idempotency.complete(record, location, payload)
+        return response
+
+    def idempotency_outcome(self, response):
+        if 300 <= response.status_code < 400 and response.has_header("Location"):
+            return response["Location"], {}
+        return None
+
+    def idempotency_replay(self, record):
+        return redirect(record.location or reverse("inventory:inventory_list"))
@@ -4,6 +4,112 @@ from django.conf import settings  # ← 追加（上部）
 import uuid
 from django.utils import timezone
 from datetime import timedelta
+from .storage import inventory_image_storage
+
+class Product(models.Model):
+    """
+    Product（商品）
+    - 同じ世帯・同じ名前の在庫（期限違いのロット）を1つにまとめる
+    - 在庫の保存時に名前から自動でひも付く（inventory.signals）
+    - 「N個使う」は期限の近いロットから減らす（inventory.services.lots）
+    """
+    household = models.ForeignKey(
+        Household,
+        on_delete=models.CASCADE,
+        related_name="products",
+    )
+    name = models.CharField("商品名", max_length=100)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["household", "name"],
+                name="uniq_household_product_name",
+            )
+        ]
+        ordering = ["name"]
+
+    def __str__(self):
+        return self.name
+
+
+class OperationBatch(models.Model):
+    """
+    OperationBatch（一括操作1回分）
+    - 一括削除・一括複製で変更した在庫に、この ID を付けておく
+    - 「元に戻す」は同じ ID の在庫を UPDATE 1回で戻す（inventory.services.batches）
+    - 一括編集は在庫ごとに違う値を上書きするので、変更前の値を OperationBatchEdit に残して戻す
+      （changed_fields：一括編集で変えた項目）
+    """
+    KIND_CHOICES = [
+        ("bulk_delete", "一括削除"),
+        ("bulk_duplicate", "一括複製"),
+        ("bulk_edit", "一括編集"),
+    ]
+
+    household = models.ForeignKey(
+        Household,
+        on_delete=models.CASCADE,
+        related_name="operation_batches",
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="operation_batches",
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    item_count = models.PositiveIntegerField(default=0)
+    changed_fields = models.JSONField(default=list, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    undone_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["household", "created_at"], name="opbatch_household_time_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.item_count}件"
+
+
+class OperationBatchEdit(models.Model):
+    """
+    OperationBatchEdit（一括編集で変えた在庫1件の、変更前の値）
+    - 分類・保管場所・期限は変更前の値を持つ（戻すときにそのまま書き戻す）
+    - 数量は変更前の数ではなく、実際に増減した数を持つ
+      （戻すときは逆に増減する。その後に使った分を消さない）
+    - 操作が保持期間を過ぎて消えると、一緒に消える
+    """
+    batch = models.ForeignKey(
+        OperationBatch,
+        on_delete=models.CASCADE,
+        related_name="edits",
+    )
+    item = models.ForeignKey(
+        "InventoryItem",
+        on_delete=models.CASCADE,
+        related_name="+",
+    )
+    category = models.ForeignKey(
+        "Category",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    storage_location = models.ForeignKey(
+        "StorageLocation",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    expiry_date = models.DateField(null=True, blank=True)
+    quantity_delta = models.IntegerField(default=0)
+
 
 class InventoryItem(models.Model):
     """
@@ -54,16 +160,195 @@ class InventoryItem(models.Model):
         return self.name
     
     # 商品画像保存フィールド
+    # 中身のハッシュ名で保存（同じ画像は1ファイルにまとめる）
     image = models.ImageField(
         upload_to="inventory_images/",
+        storage=inventory_image_storage,
         blank=True,
         null=True,
         verbose_name="商品画像"
     )
     
+    # 縮小画像（一覧用サムネイル・詳細用）のファイル名
+    # 例）{"source": 元画像名, "thumb": {"webp": ..., "jpg": ...}, "detail": {...}}
+    # バックグラウンドで作られるので、作成前は空 dict（テンプレは元画像を使う）
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
+
     # 在庫を論理削除するためのフラグ
     is_deleted = models.BooleanField(default=False)
+
+    # 最後にこの在庫を変更した一括操作（元に戻す用）
+    operation_batch = models.ForeignKey(
+        OperationBatch,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name="items",
+    )
+
+    # 同じ名前のロットをまとめる商品（保存時に自動でセット）
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name="lots",
+    )
+
+    class Meta:
+        indexes = [
+            # 期限の近いロットから使う（FEFO）ときの並び順
+            models.Index(fields=["product", "expiry_date"], name="item_product_expiry_idx"),
+            # 差分同期（前回以降に変わった在庫）
+            models.Index(fields=["household", "updated_at"], name="item_household_updated_idx"),
+        ]
         
+class QuantityLedger(models.Model):
+    """
+    QuantityLedger（数量の増減履歴）
+    - 追記のみ（更新・削除は compact_ledger による圧縮のときだけ）
+    - 在庫を物理削除しても残るよう、item は FK ではなく ID で持つ
+    - 分類・内容量も記録時点の値を持つ（分類別の消費量を集計するため）
+    """
+    REASON_CHOICES = [
+        ("create", "追加"),
+        ("edit", "編集"),
+        ("duplicate", "複製"),
+        ("delete", "削除"),
+        ("restore", "履歴から復元"),
+        ("bulk_delete", "一括削除"),
+        ("bulk_duplicate", "一括複製"),
+        ("consume", "使用"),
+        ("adjust", "数量調整"),
+        ("stocktake", "棚卸し"),
+        ("bulk_edit", "一括編集"),
+    ]
+
+    household = models.ForeignKey(
+        Household,
+        on_delete=models.CASCADE,
+        related_name="ledger_entries",
+    )
+    item_id = models.BigIntegerField()
+    category_id = models.BigIntegerField(null=True, blank=True)
+    content_amount = models.FloatField(default=1.0)
+
+    delta = models.IntegerField()
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["household", "created_at"], name="ledger_household_time_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.item_id} {self.delta:+d} ({self.reason})"
+
+
+class InventorySnapshot(models.Model):
+    """
+    InventorySnapshot（世帯の在庫数量のスナップショット）
+    - 1世帯1日1件（compact_ledger が作る）
+    - items: {在庫ID: 数量}、categories: {分類ID: 内容量×数量}（未分類は "none"）
+    - ある日時の在庫は「直前のスナップショット＋その後の増減履歴」で復元する
+    """
+    household = models.ForeignKey(
+        Household,
+        on_delete=models.CASCADE,
+        related_name="snapshots",
+    )
+    date = models.DateField()
+    taken_at = models.DateTimeField(default=timezone.now)
+    items = models.JSONField(default=dict)
+    categories = models.JSONField(default=dict)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["household", "date"],
+                name="uniq_snapshot_per_household_date",
+            )
+        ]
+        ordering = ["-taken_at"]
+
+    def __str__(self):
+        return f"{self.household_id} {self.date}"
+
+
+class CategoryForecast(models.Model):
+    """
+    CategoryForecast（分類ごとの1日あたり消費量の推定値）
+    - forecast_consumption（夜間バッチ）が全世帯分をまとめて計算して保存する
+    - 残り日数・なくなる日は、表示時に「現在量 / daily_rate」で出す
+    """
+    household = models.ForeignKey(
+        Household,
+        on_delete=models.CASCADE,
+        related_name="forecasts",
+    )
+    category = models.OneToOneField(
+        "Category",
+        on_delete=models.CASCADE,
+        related_name="forecast",
+    )
+    # 1日あたりの消費量（内容量×個数の単位）
+    daily_rate = models.FloatField(default=0)
+    # 推定に使えた日数（履歴が短いと少なくなる）
+    sample_days = models.PositiveIntegerField(default=0)
+    computed_on = models.DateField()
+
+    def __str__(self):
+        return f"{self.category_id}: {self.daily_rate:.2f}/日"
+
+
+class MediaFile(models.Model):
+    """
+    MediaFile（在庫画像ファイルの参照数）
+    - name: ストレージ上のファイル名（ハッシュ名）
+    - ref_count: このファイルを image に持つ在庫の数
+    - ref_count が 0 のまま一定時間たったファイルは gc_media で削除される
+    """
+    name = models.CharField(max_length=255, unique=True)
+    size = models.BigIntegerField(default=0)
+    ref_count = models.IntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    # 参照数の増減・再アップロードのたびに更新（GC の猶予時間の起点）
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["ref_count", "updated_at"], name="mediafile_gc_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count})"
+
+    @classmethod
+    def touch(cls, name, size):
+        """
+        アップロード時に行を作る／既存行の updated_at を進める
+        （GC 直前に再アップロードされたファイルを消さないため）
+        """
+        updated = cls.objects.filter(name=name).update(size=size, updated_at=timezone.now())
+        if not updated:
+            cls.objects.get_or_create(name=name, defaults={"size": size})
+
+
+class LiveManager(models.Manager):
+    """
+    削除済み（is_deleted=True）の行を除く既定のマネージャー（分類・保管場所）
+    - 削除は印を付けるだけで、在庫を外し終えてから物理削除する（inventory.services.deletion）
+    - 在庫からたどるとき・世帯の削除の連鎖では all_objects（base_manager）を使うので見える
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(is_deleted=False)
+
+
 class Category(models.Model):
     """
     Category（カテゴリ）マスタ
@@ -78,15 +363,29 @@ class Category(models.Model):
     description = models.CharField("概要", max_length=100, blank=True)
     
     created_at = models.DateTimeField(auto_now_add=True)
+    # 差分同期用（queryset.update() / bulk_update のときは明示的に入れる）
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # 削除済み（在庫を外し終えるまでの間だけ残る。画面・集計には出さない）
+    is_deleted = models.BooleanField(default=False, editable=False)
+
+    objects = LiveManager()
+    all_objects = models.Manager()
 
     class Meta:
+        base_manager_name = "all_objects"
         # 同じ世帯で同名カテゴリを重複させない（例：食料が2つできない）
+        # 削除済みの行は数えない（片付け中でも同じ名前で作り直せる）
         constraints = [
             models.UniqueConstraint(
                 fields=["household", "name"],
+                condition=models.Q(is_deleted=False),
                 name="uniq_household_category_name",
             )
         ]
+        indexes = [
+            models.Index(fields=["household", "updated_at"], name="category_household_updated_idx"),
+        ]
         ordering = ["name"]
     # 分類ごとの目標量（例：36）:contentReference[oaicite:7]{index=7}
     goal_amount = models.FloatField(default=0)
@@ -98,6 +397,12 @@ class Category(models.Model):
     ]
     goal_unit = models.CharField(max_length=10, choices=GOAL_UNIT_CHOICES, default="PCS")
 
+    # 1人1日あたりの目安量（例：水 3L）
+    # - 0 より大きいときは goal_amount を「目標備蓄日数 × 人数 × 目安量」で自動計算する
+    #   （inventory.services.supply）
+    # - 0 のときはこれまで通り goal_amount を手入力で使う
+    daily_rate_per_person = models.FloatField("1人1日あたりの目安量", default=0)
+
     # ----------------------------
     # 分類カラー（HEX 形式） 例: "#ff0000"
     # - フロントで色選択できるようにする
@@ -132,14 +437,26 @@ class StorageLocation(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # 削除済み（在庫を外し終えるまでの間だけ残る。画面・集計には出さない）
+    is_deleted = models.BooleanField(default=False, editable=False)
+
+    objects = LiveManager()
+    all_objects = models.Manager()
+
     class Meta:
+        base_manager_name = "all_objects"
         # 同一世帯で同名の保管場所を作れないようにする（地味に事故防止）
+        # 削除済みの行は数えない（片付け中でも同じ名前で作り直せる）
         constraints = [
             models.UniqueConstraint(
                 fields=["household", "name"],
+                condition=models.Q(is_deleted=False),
                 name="uniq_storage_location_per_household",
             )
         ]
+        indexes = [
+            models.Index(fields=["household", "updated_at"], name="location_household_updated_idx"),
+        ]
 
     def __str__(self) -> str:
         return self.name
@@ -165,6 +482,12 @@ class Memo(models.Model):
     title = models.CharField("タイトル", max_length=100)
     body = models.TextField("本文", blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["household", "updated_at"], name="memo_household_updated_idx"),
+        ]
 
     def __str__(self):
         return self.title
@@ -193,4 +516,144 @@ class InviteToken(models.Model):
         )
 
     def __str__(self):
-        return f"{self.household.name} 招待リンク"
\ No newline at end of file
+        return f"{self.household.name} 招待リンク"
+
+class StocktakeSession(models.Model):
+    """
+    StocktakeSession（棚卸し）
+    - 開始時に世帯の在庫の数量を StocktakeEntry に写しておく
+    - 数えた数は少しずつ保存し、最後に差分だけまとめて反映する（inventory.services.stocktake）
+    - 棚卸し中に在庫の数量が変わっていたら（expected_quantity と違う）、または履歴に移されていたら、
+      反映前に確認する（画像・メモだけの更新など、数量が変わらない編集は衝突にしない）
+    """
+    STATUS_OPEN = "open"
+    STATUS_APPLIED = "applied"
+    STATUS_CANCELLED = "cancelled"
+    STATUS_CHOICES = [
+        (STATUS_OPEN, "棚卸し中"),
+        (STATUS_APPLIED, "反映済み"),
+        (STATUS_CANCELLED, "中止"),
+    ]
+
+    household = models.ForeignKey(
+        Household,
+        on_delete=models.CASCADE,
+        related_name="stocktakes",
+    )
+    started_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="stocktakes",
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_OPEN)
+    created_at = models.DateTimeField(auto_now_add=True)
+    applied_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["household", "status"], name="stocktake_household_idx"),
+        ]
+
+    def __str__(self):
+        return f"棚卸し {self.created_at:%Y/%m/%d}（{self.get_status_display()}）"
+
+
+class StocktakeEntry(models.Model):
+    """
+    StocktakeEntry（棚卸しの1行）
+    - expected_quantity：開始時点の在庫の数量（今の数量と違えば衝突）
+    - counted_quantity：数えた数（未入力は None。None の行は反映しない）
+    """
+    session = models.ForeignKey(
+        StocktakeSession,
+        on_delete=models.CASCADE,
+        related_name="entries",
+    )
+    item = models.ForeignKey(
+        InventoryItem,
+        on_delete=models.CASCADE,
+        related_name="stocktake_entries",
+    )
+    expected_quantity = models.IntegerField()
+    counted_quantity = models.IntegerField(null=True, blank=True)
+    counted_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["session", "item"],
+                name="uniq_stocktake_session_item",
+            )
+        ]
+
+
+class IdempotencyKey(models.Model):
+    """
+    IdempotencyKey（二重送信防止のキー）
+    - フォームに埋め込んだキーごとに、処理結果（リダイレクト先など）を1件だけ持つ
+    - 同じキーの2回目以降は、処理をせずに1回目の結果を返す（inventory.mixins）
+    - 一定時間で期限切れ（INVENTORY_IDEMPOTENCY_TTL_HOURS）。古い行はときどきまとめて消す
+    """
+    STATUS_PENDING = "pending"
+    STATUS_DONE = "done"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "処理中"),
+        (STATUS_DONE, "完了"),
+    ]
+
+    household = models.ForeignKey(
+        Household,
+        on_delete=models.CASCADE,
+        related_name="idempotency_keys",
+    )
+    key = models.CharField(max_length=64)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    location = models.CharField(max_length=500, blank=True)
+    payload = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["household", "key"],
+                name="uniq_household_idempotency_key",
+            )
+        ]
+
+
+class SyncTombstone(models.Model):
+    """
+    SyncTombstone（削除の記録）
+    - 物理削除した在庫・分類・保管場所・メモを、差分同期のクライアントに伝えるために残す
+    - 在庫の論理削除（is_deleted）は在庫の更新として伝わるので、ここには書かない
+    - 一定日数（INVENTORY_SYNC_TOMBSTONE_DAYS）で消す。それより古いカーソルは全件取り直し
+    """
+    KIND_ITEM = "item"
+    KIND_CATEGORY = "category"
+    KIND_LOCATION = "location"
+    KIND_MEMO = "memo"
+    KIND_CHOICES = [
+        (KIND_ITEM, "在庫"),
+        (KIND_CATEGORY, "分類"),
+        (KIND_LOCATION, "保管場所"),
+        (KIND_MEMO, "メモ"),
+    ]
+
+    household = models.ForeignKey(
+        Household,
+        on_delete=models.CASCADE,
+        related_name="sync_tombstones",
+    )
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["household", "deleted_at"], name="tombstone_household_time_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.object_id}"
@@ -0,0 +1,179 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from inventory.models import InventoryItem, OperationBatchEdit
+from inventory.services import batches, events, ledger
+from inventory.services.versions import bump_household_version
+from inventory.services.writes import retry_on_locked
+
+# 1リクエストで受け付ける操作の上限（連打をまとめても十分な数）
+MAX_OPERATIONS = 200
+
+
+class InvalidAdjustment(ValueError):
+    """
+    操作の形式が正しくない（何も更新しない）
+    """
+
+
+def _int(value, field):
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise InvalidAdjustment(f"{field} は整数で指定してください。")
+    return value
+
+
+def normalize(operations):
+    """
+    [{id, delta} | {id, set}, ...] を在庫ごとの最終的な操作にまとめる
+    - 同じ在庫への操作は送られた順に合成する（+1, +1, -1 → +1 / set 5, +1 → set 6）
+    - set は 0 以上
+    戻り値：{在庫ID: ("delta", 増減) | ("set", 値)}
+    """
+    if not isinstance(operations, list) or not operations:
+        raise InvalidAdjustment("ops は1件以上のリストで指定してください。")
+    if len(operations) > MAX_OPERATIONS:
+        raise InvalidAdjustment(f"一度に送れる操作は{MAX_OPERATIONS}件までです。")
+
+    merged = {}
+    for op in operations:
+        if not isinstance(op, dict) or ("delta" in op) == ("set" in op):
+            raise InvalidAdjustment("各操作は {id, delta} か {id, set} のどちらかで指定してください。")
+        item_id = _int(op.get("id"), "id")
+
+        if "set" in op:
+            value = _int(op["set"], "set")
+            if value < 0:
+                raise InvalidAdjustment("set は0以上で指定してください。")
+            merged[item_id] = ("set", value)
+            continue
+
+        delta = _int(op["delta"], "delta")
+        kind, current = merged.get(item_id, ("delta", 0))
+        merged[item_id] = (kind, max(current + delta, 0) if kind == "set" else current + delta)
+
+    return merged
+
+
+@retry_on_locked
+def apply_adjustments(household, operations):
+    """
+    数量の増減・上書きをまとめて1トランザクションで反映する
+
+    - 自分の世帯の、論理削除されていない在庫だけが対象（それ以外は missing で返す）
+    - 同じ増減値・同じ set 値の在庫はまとめて UPDATE 1回
+      （増減は Greatest(F("quantity") + delta, 0) で、読んでから書かない）
+    - 反映後の値を1クエリで読み直し、実際に変わった分だけ増減履歴に残す
+
+    戻り値：{"items": [{"id", "quantity"}, ...], "missing": [在庫ID, ...]}
+    """
+    merged = normalize(operations)
+    now = timezone.now()
+
+    with transaction.atomic():
+        scoped = InventoryItem.objects.filter(household=household, is_deleted=False)
+        before = {
+            row["id"]: row
+            for row in scoped.select_for_update()
+            .filter(id__in=merged)
+            .values("id", "quantity", "category_id", "content_amount")
+        }
+        missing = sorted(set(merged) - set(before))
+
+        by_delta = defaultdict(list)
+        by_value = defaultdict(list)
+        for item_id, (kind, value) in merged.items():
+            if item_id not in before:
+                continue
+            if kind == "set":
+                by_value[value].append(item_id)
+            elif value:
+                by_delta[value].append(item_id)
+
+        for delta, ids in by_delta.items():
+            scoped.filter(id__in=ids).update(
+                quantity=Greatest(F("quantity") + delta, Value(0)),
+                updated_at=now,
+            )
+        for value, ids in by_value.items():
+            scoped.filter(id__in=ids).update(quantity=value, updated_at=now)
+
+        after = dict(scoped.filter(id__in=before).values_list("id", "quantity"))
+
+        # 増減履歴：quantity に「実際に変わった数」を入れて +1 倍で作る
+        entries = ledger.entries_from_rows(
+            household.pk,
+            [{**row, "quantity": after[item_id] - (row["quantity"] or 0)} for item_id, row in before.items()],
+            +1,
+            "adjust",
+        )
+        if ledger.record(entries):
+            bump_household_version(household.pk)
+        # 一覧を開いている他のメンバーへ（コミット後に送る）
+        events.publish_items(household.pk, [e.item_id for e in entries if e.delta], ("quantity",))
+
+    return {
+        "items": [{"id": item_id, "quantity": after[item_id]} for item_id in sorted(after)],
+        "missing": missing,
+    }
+
+
+@retry_on_locked
+def apply_bulk_edit(household, item_ids, changes, user=None):
+    """
+    一括編集：選択した在庫に同じ変更を UPDATE 1回で反映する
+    - changes：InventoryBulkEditForm.changes() の値
+      （category_id / storage_location_id / expiry_date / quantity_delta）
+    - 対象（自分の世帯の、履歴に移していない在庫）を先に1クエリで読んでロックし、その ID だけを更新・通知する
+      （送られてきた ID をそのまま通知に使わない。他世帯や存在しない ID は含めない）
+    - 元に戻せるように、一括操作（OperationBatch）を作って変更前の値を OperationBatchEdit に残す
+      （bulk_create 1回。数量は実際に増減した数を残し、増減履歴にも同じ数を書く）
+    戻り値：更新した件数
+    """
+    changes = dict(changes)
+    delta = changes.pop("quantity_delta", 0)
+    if delta:
+        changes["quantity"] = Greatest(F("quantity") + delta, Value(0))
+    changed_fields = tuple(changes)
+
+    with transaction.atomic():
+        rows = list(
+            InventoryItem.objects.filter(household=household, id__in=item_ids, is_deleted=False)
+            .select_for_update()
+            .values("id", "quantity", "category_id", "storage_location_id", "expiry_date", "content_amount")
+        )
+        if not rows:
+            return 0
+        # 0 で止まった分を差し引いた、実際の増減
+        for row in rows:
+            row["delta"] = max((row["quantity"] or 0) + delta, 0) - (row["quantity"] or 0) if delta else 0
+        touched_ids = [row["id"] for row in rows]
+
+        batch = batches.begin(household, user, "bulk_edit", changed_fields=changed_fields)
+        OperationBatchEdit.objects.bulk_create(
+            [
+                OperationBatchEdit(
+                    batch=batch,
+                    item_id=row["id"],
+                    category_id=row["category_id"],
+                    storage_location_id=row["storage_location_id"],
+                    expiry_date=row["expiry_date"],
+                    quantity_delta=row["delta"],
+                )
+                for row in rows
+            ],
+            batch_size=500,
+        )
+
+        updated = InventoryItem.objects.filter(id__in=touched_ids).update(updated_at=timezone.now(), **changes)
+        batches.finish(batch, updated)
+        ledger.record(ledger.entries_from_rows(
+            household.pk, [{**row, "quantity": row["delta"]} for row in rows], +1, "bulk_edit"
+        ))
+        events.publish_items(household.pk, touched_ids, changed_fields)
+
+    bump_household_version(household.pk)
+    return updated
@@ -0,0 +1,42 @@
+from accounts.models import AlertSetting
+
+# アラート設定が無い世帯のデフォルト
+DEFAULT_ALERT = {
+    "quantity_threshold": 1,  # 青（個数）
+    "expiry_days": 30,        # 青（期限日数）
+}
+
+RED = "red"
+BLUE = "blue"
+NONE = ""
+
+
+def alert_setting(household):
+    """
+    accounts.AlertSetting を世帯で1件取得する（無ければデフォルト）
+    - household は Household か世帯ID
+    """
+    setting = (
+        AlertSetting.objects.filter(household=household)
+        .values("quantity_threshold", "expiry_days")
+        .first()
+    )
+    return setting or DEFAULT_ALERT
+
+
+def alert_state(quantity, expiry_date, alert, today):
+    """
+    在庫1件のアラート判定
+    戻り値：(RED / BLUE / NONE, 残り日数（期限なしは None）)
+
+    - 赤（固定）：在庫0 または 期限<=0日
+    - 青（設定連動）：赤でなく、数量が閾値以下 または 期限が設定日数以内
+    """
+    days_left = None if expiry_date is None else (expiry_date - today).days
+    qty = quantity or 0  # None対策
+
+    if qty <= 0 or (days_left is not None and days_left <= 0):
+        return RED, days_left
+    if qty <= alert["quantity_threshold"] or (days_left is not None and days_left <= alert["expiry_days"]):
+        return BLUE, days_left
+    return NONE, days_left
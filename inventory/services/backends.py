@@ -0,0 +1,57 @@
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils import timezone
+
+from inventory.models import Product
+
+
+def is_postgresql(using=DEFAULT_DB_ALIAS):
+    """
+    いまのDBが PostgreSQL か（実行時に接続先で判定する。設定の ENGINE 名は見ない）
+    """
+    return connections[using].vendor == "postgresql"
+
+
+def claim(queryset):
+    """
+    ほかのワーカーが処理中（行ロック中）の行を飛ばして取る（SELECT ... FOR UPDATE SKIP LOCKED）
+    - トランザクションの中で使う。取った行はコミットまでほかのワーカーから見えない
+    - SKIP LOCKED が使えないDB（SQLite）ではそのまま返す
+      （SQLite は書き込みが1本ずつなので、同じ行を同時に処理することはない）
+    """
+    if connections[queryset.db].features.has_select_for_update_skip_locked:
+        return queryset.select_for_update(skip_locked=True)
+    return queryset
+
+
+def upsert_products(household_id, names):
+    """
+    世帯の商品を名前で取得し、無いものは作る
+    戻り値：{名前: Product}
+
+    - PostgreSQL：INSERT ... ON CONFLICT DO UPDATE ... RETURNING の1クエリ
+      （既にある行も RETURNING で返るので、読み直さない。同時に同じ名前を作っても1件にまとまる）
+    - それ以外：bulk_create(ignore_conflicts=True) で作り、名前で読み直す（2クエリ）
+    """
+    names = sorted(set(names))
+    if not names:
+        return {}
+
+    if not is_postgresql(Product.objects.db):
+        Product.objects.bulk_create(
+            [Product(household_id=household_id, name=name) for name in names], ignore_conflicts=True
+        )
+        return {p.name: p for p in Product.objects.filter(household_id=household_id, name__in=names)}
+
+    using = Product.objects.db
+    columns = ["id", "household_id", "name", "created_at"]
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {Product._meta.db_table} (household_id, name, created_at) "
+            "SELECT %s, unnest(%s::varchar[]), %s "
+            "ON CONFLICT (household_id, name) DO UPDATE SET name = EXCLUDED.name "
+            f"RETURNING {', '.join(columns)}",
+            [household_id, names, timezone.now()],
+        )
+        rows = cursor.fetchall()
+    products = (Product.from_db(using, columns, row) for row in rows)
+    return {product.name: product for product in products}
@@ -0,0 +1,571 @@
+import bisect
+import io
+import json
+import time
+import zipfile
+
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from accounts.models import AlertSetting, Household
+from inventory.models import (
+    Category,
+    InventoryItem,
+    InventorySnapshot,
+    Memo,
+    QuantityLedger,
+    StorageLocation,
+)
+from inventory.services import backends, media
+
+# ファイル形式（1行目の header に入れる。読み込み時に確かめる）
+FORMAT = "stocknavi-household"
+VERSION = 1
+
+# zip の中の名前：データ本体と画像（media/ の下に、ストレージ上の名前のまま入れる）
+DATA_NAME = "household.jsonl"
+MEDIA_PREFIX = "media/"
+
+# 読み出し（iterator）・書き込み（bulk_create）の1回あたりの件数
+BATCH_SIZE = 500
+
+# この大きさ（バイト）までためてから送る（1行ずつ送らない）
+CHUNK_BYTES = 64 * 1024
+
+# 画像ファイルを読む単位（バイト）
+FILE_CHUNK_BYTES = 1024 * 1024
+
+CATEGORY_FIELDS = ("name", "description", "goal_amount", "goal_unit", "daily_rate_per_person", "color")
+LOCATION_FIELDS = ("name", "description")
+ITEM_FIELDS = ("name", "quantity", "content_amount", "expiry_date", "is_deleted")
+
+
+class InvalidBackup(ValueError):
+    """
+    読み込めない書き出しファイル（形式・版が違う、行が壊れている、順番が違う）
+    """
+
+
+# ----------------------------
+# 書き出し
+# ----------------------------
+def _line(record):
+    return json.dumps(record, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+def _category_ref(category_id, names):
+    """
+    分類への参照：今ある分類は名前（自然キー）、消えた分類は {"gone": 元のID}
+    - 消えた分類の履歴も、分類ごとにまとまったまま読み込めるように
+    """
+    if category_id is None:
+        return None
+    name = names.get(category_id)
+    return name if name is not None else {"gone": category_id}
+
+
+def export_lines(household):
+    """
+    世帯1つを JSONL の行（str）で1行ずつ返すジェネレーター
+    - 1行目は header。以降は 参照される側から順に
+      alert_setting → category → storage_location → item → ledger → snapshot → memo
+    - 分類・保管場所は名前、メモの作成者はユーザー名（自然キー）で参照する
+    - 在庫は元のID（ref）を持ち、増減履歴・スナップショットはそれで在庫を指す
+    - 削除済み（在庫を外している途中）の分類・保管場所は書き出さず、在庫からは外れた扱いにする
+    - どの表も iterator で少しずつ読むので、件数が増えてもメモリは増えない
+      （分類・保管場所の ID → 名前 だけは持つ。どちらも数は少ない）
+    """
+    yield _line({
+        "type": "header",
+        "format": FORMAT,
+        "version": VERSION,
+        "exported_at": timezone.now(),
+        "household": {"name": household.name, "target_days": household.target_days},
+    })
+
+    alert = AlertSetting.objects.filter(household=household).values("quantity_threshold", "expiry_days").first()
+    if alert:
+        yield _line({"type": "alert_setting", **alert})
+
+    category_names = {}
+    for row in Category.objects.filter(household=household).order_by("id").values("id", *CATEGORY_FIELDS):
+        category_names[row.pop("id")] = row["name"]
+        yield _line({"type": "category", **row})
+
+    location_names = {}
+    for row in StorageLocation.objects.filter(household=household).order_by("id").values("id", *LOCATION_FIELDS):
+        location_names[row.pop("id")] = row["name"]
+        yield _line({"type": "storage_location", **row})
+
+    items = (
+        InventoryItem.objects.filter(household=household).order_by("id")
+        .values("id", *ITEM_FIELDS, "image", "category_id", "storage_location_id")
+    )
+    for row in items.iterator(chunk_size=BATCH_SIZE):
+        yield _line({
+            "type": "item",
+            "ref": row["id"],
+            **{field: row[field] for field in ITEM_FIELDS},
+            "category": category_names.get(row["category_id"]),
+            "storage_location": location_names.get(row["storage_location_id"]),
+            "image": row["image"] or None,
+        })
+
+    entries = (
+        QuantityLedger.objects.filter(household=household).order_by("id")
+        .values("item_id", "category_id", "content_amount", "delta", "reason", "created_at")
+    )
+    for row in entries.iterator(chunk_size=BATCH_SIZE):
+        yield _line({
+            "type": "ledger",
+            "item": row["item_id"],
+            "category": _category_ref(row["category_id"], category_names),
+            "content_amount": row["content_amount"],
+            "delta": row["delta"],
+            "reason": row["reason"],
+            "created_at": row["created_at"],
+        })
+
+    # スナップショットは1日1件（1件の中身は在庫数に比例するので、1件ずつ読む）
+    snapshots = InventorySnapshot.objects.filter(household=household).order_by("date")
+    for snapshot in snapshots.iterator(chunk_size=1):
+        yield _line({
+            "type": "snapshot",
+            "date": snapshot.date,
+            "taken_at": snapshot.taken_at,
+            "items": snapshot.items,
+            "categories": [
+                [None if key == "none" else _category_ref(int(key), category_names), amount]
+                for key, amount in snapshot.categories.items()
+            ],
+        })
+
+    memos = (
+        Memo.objects.filter(household=household).order_by("id")
+        .values("title", "body", "created_at", "updated_at", "user__username")
+    )
+    for row in memos.iterator(chunk_size=BATCH_SIZE):
+        yield _line({
+            "type": "memo",
+            "title": row["title"],
+            "body": row["body"],
+            "user": row["user__username"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+        })
+
+
+def iter_chunks(lines, size=CHUNK_BYTES):
+    """
+    行を size バイト程度ずつまとめた bytes にして返す（StreamingHttpResponse・ファイル書き込み用）
+    """
+    buf = []
+    buffered = 0
+    for line in lines:
+        data = line.encode("utf-8")
+        buf.append(data)
+        buffered += len(data)
+        if buffered >= size:
+            yield b"".join(buf)
+            buf = []
+            buffered = 0
+    if buf:
+        yield b"".join(buf)
+
+
+def export_jsonl(household):
+    """
+    世帯の JSONL（画像なし）を bytes のかたまりで返す
+    """
+    return iter_chunks(export_lines(household))
+
+
+class _Sink:
+    """
+    ZipFile の書き込み先（書かれた bytes をためておき、take() で取り出す）
+    - tell / seek を持たないので、ZipFile は「巻き戻さない」書き方（データ記述子付き）になる
+      → 書いた分をすぐ送れる
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _zip_info(name, compress_type):
+    info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+    info.compress_type = compress_type
+    return info
+
+
+def export_zip(household):
+    """
+    世帯の JSONL と画像をまとめた zip を bytes のかたまりで返すジェネレーター
+    - household.jsonl（圧縮する）＋ media/<画像名>（JPEG などはもう圧縮済みなので無圧縮）
+    - 同じ画像を複数の在庫が使っていても1つだけ入れる（DISTINCT で DB に重複を除かせる）
+    - 画像は FILE_CHUNK_BYTES ずつ読んで、その都度送る（ファイルを丸ごと読まない）
+    """
+    sink = _Sink()
+    storage = InventoryItem._meta.get_field("image").storage
+
+    with zipfile.ZipFile(sink, "w", allowZip64=True) as archive:
+        with archive.open(_zip_info(DATA_NAME, zipfile.ZIP_DEFLATED), "w", force_zip64=True) as dest:
+            for chunk in iter_chunks(export_lines(household)):
+                dest.write(chunk)
+                data = sink.take()
+                if data:
+                    yield data
+
+        images = (
+            InventoryItem.objects.filter(household=household).exclude(image="").exclude(image__isnull=True)
+            .order_by("image").values_list("image", flat=True).distinct()
+        )
+        for name in images.iterator(chunk_size=BATCH_SIZE):
+            if not storage.exists(name):
+                continue
+            with storage.open(name, "rb") as src, \
+                    archive.open(_zip_info(MEDIA_PREFIX + name, zipfile.ZIP_STORED), "w", force_zip64=True) as dest:
+                for chunk in iter(lambda: src.read(FILE_CHUNK_BYTES), b""):
+                    dest.write(chunk)
+                    yield sink.take()
+
+    # 最後に中央ディレクトリ（目次）が書かれる
+    yield sink.take()
+
+
+# ----------------------------
+# 読み込み
+# ----------------------------
+class _IdMap:
+    """
+    元のID → 新しいID の対応表（連続している区間ごとにまとめて持つ）
+    - 書き出しはID順、bulk_create も連番で採番するので、ほとんどの在庫は
+      「元のID が1増えると新しいIDも1増える」区間に入る
+      → 在庫が10万件でも、持つのは区間の数（欠番・バッチの数）だけ
+    """
+
+    def __init__(self):
+        self._starts = []  # 区間の先頭の元のID（昇順）
+        self._runs = []    # (先頭の元のID, 先頭の新しいID, 件数)
+
+    def add(self, old, new):
+        if self._runs:
+            start, first, length = self._runs[-1]
+            if old == start + length and new == first + length:
+                self._runs[-1] = (start, first, length + 1)
+                return
+        # ID順でない行（手で編集したファイルなど）も、順番を保って入れる
+        index = bisect.bisect(self._starts, old)
+        self._starts.insert(index, old)
+        self._runs.insert(index, (old, new, 1))
+
+    def get(self, old, default=None):
+        index = bisect.bisect(self._starts, old) - 1
+        if index >= 0:
+            start, first, length = self._runs[index]
+            if old < start + length:
+                return first + (old - start)
+        return default
+
+
+class _Importer:
+    """
+    JSONL を1行ずつ受け取り、種類ごとに BATCH_SIZE 件ためて bulk_create する
+    - 分類・保管場所は名前 → 新しいID で引く
+    - メモの作成者は、owner と読み込み先の世帯のメンバーの中からだけユーザー名で引く
+      （ほかの世帯に同じ名前のユーザーがいても、その人のメモにはしない）
+    - 在庫の元のID → 新しいID は _IdMap で持つ（増減履歴・スナップショットの付け替え用）
+    - 書き出し時にもう無かった在庫・分類への参照は「元のIDのマイナス」にする
+      （同じものどうしはまとまったまま、今ある行とはぶつからない）
+    """
+
+    def __init__(self, household, archive=None, owner=None):
+        self.household = household
+        self.archive = archive
+        self.owner = owner
+        self.storage = InventoryItem._meta.get_field("image").storage
+
+        self.category_ids = {}
+        self.location_ids = {}
+        self.item_ids = _IdMap()
+        self.users = {}
+        self.pending = {"item": [], "ledger": [], "memo": []}
+        self.counts = {"category": 0, "storage_location": 0, "item": 0, "ledger": 0, "snapshot": 0, "memo": 0}
+        self.skipped = {"image": 0, "memo": 0}
+        self.stage = 0
+
+    # 行の種類 → (順番, 処理するメソッド)
+    ORDER = {
+        "alert_setting": (1, "_alert_setting"),
+        "category": (2, "_category"),
+        "storage_location": (3, "_storage_location"),
+        "item": (4, "_item"),
+        "ledger": (5, "_ledger"),
+        "snapshot": (6, "_snapshot"),
+        "memo": (7, "_memo"),
+    }
+
+    def add(self, record):
+        try:
+            stage, method = self.ORDER[record["type"]]
+        except KeyError:
+            raise InvalidBackup(f"知らない行の種類です：{record.get('type')}")
+        if stage < self.stage:
+            raise InvalidBackup(f"行の順番が違います：{record['type']}")
+        if stage > self.stage:
+            # 次の種類に進む前に、ためている分を書く（後の行が前の行の新しいIDを使う）
+            self.flush()
+            self.stage = stage
+        getattr(self, method)(record)
+
+    def flush(self):
+        self._flush_items()
+        self._flush("ledger", QuantityLedger)
+        self._flush_memos()
+
+    def _flush(self, kind, model):
+        objs = self.pending[kind]
+        if objs:
+            model.objects.bulk_create(objs, batch_size=BATCH_SIZE)
+            self.counts[kind] += len(objs)
+            self.pending[kind] = []
+
+    def _queue(self, kind, obj, flush):
+        self.pending[kind].append(obj)
+        if len(self.pending[kind]) >= BATCH_SIZE:
+            flush()
+
+    # --- 分類・保管場所・アラート ---
+    def _alert_setting(self, record):
+        AlertSetting.objects.update_or_create(
+            household=self.household,
+            defaults={"quantity_threshold": record["quantity_threshold"], "expiry_days": record["expiry_days"]},
+        )
+
+    def _category(self, record):
+        category = Category.objects.create(
+            household=self.household, **{f: record[f] for f in CATEGORY_FIELDS if f in record}
+        )
+        self.category_ids[category.name] = category.pk
+        self.counts["category"] += 1
+
+    def _storage_location(self, record):
+        location = StorageLocation.objects.create(
+            household=self.household, **{f: record[f] for f in LOCATION_FIELDS if f in record}
+        )
+        self.location_ids[location.name] = location.pk
+        self.counts["storage_location"] += 1
+
+    def _resolve_category(self, ref):
+        if ref is None:
+            return None
+        if isinstance(ref, dict):
+            return -int(ref["gone"])
+        try:
+            return self.category_ids[ref]
+        except KeyError:
+            raise InvalidBackup(f"分類が見つかりません：{ref}")
+
+    def _resolve_location(self, name):
+        if name is None:
+            return None
+        try:
+            return self.location_ids[name]
+        except KeyError:
+            raise InvalidBackup(f"保管場所が見つかりません：{name}")
+
+    # --- 在庫 ---
+    def _item(self, record):
+        item = InventoryItem(
+            household=self.household,
+            category_id=self._resolve_category(record.get("category")),
+            storage_location_id=self._resolve_location(record.get("storage_location")),
+            name=record["name"],
+            quantity=record["quantity"],
+            content_amount=record["content_amount"],
+            expiry_date=parse_date(record["expiry_date"]) if record.get("expiry_date") else None,
+            is_deleted=record.get("is_deleted", False),
+            image=record.get("image") or None,
+        )
+        item._backup_ref = record["ref"]
+        self._queue("item", item, self._flush_items)
+
+    def _restore_image(self, name):
+        """
+        画像ファイルをストレージに戻し、保存した名前を返す（戻せなければ None）
+        - 中身のハッシュ名なので、同じ名前のファイルがあれば同じ中身（書かない）
+        """
+        if self.storage.exists(name):
+            return name
+        member = MEDIA_PREFIX + name
+        if self.archive is None or member not in self.archive.NameToInfo:
+            return None
+        with self.archive.open(member) as src:
+            return self.storage.save(name, File(src, name=name))
+
+    def _flush_items(self):
+        objs = self.pending["item"]
+        if not objs:
+            return
+
+        # 画像：このバッチで使う分だけ戻す
+        restored = {name: self._restore_image(name) for name in {o.image.name for o in objs if o.image}}
+        for obj in objs:
+            if obj.image:
+                saved = restored[obj.image.name]
+                if saved is None:
+                    self.skipped["image"] += 1
+                obj.image = saved
+
+        # 商品（同じ名前のロットのまとめ）：bulk_create ではシグナルが飛ばないのでここで付ける
+        products = backends.upsert_products(self.household.pk, {o.name for o in objs})
+        for obj in objs:
+            obj.product_id = products[obj.name].pk
+
+        InventoryItem.objects.bulk_create(objs, batch_size=BATCH_SIZE)
+        for obj in objs:
+            self.item_ids.add(obj._backup_ref, obj.pk)
+
+        # 画像の参照数（シグナルの代わり）
+        media.acquire(o.image.name for o in objs if o.image)
+
+        self.counts["item"] += len(objs)
+        self.pending["item"] = []
+
+    def _resolve_item(self, ref):
+        ref = int(ref)
+        return self.item_ids.get(ref, -ref)
+
+    # --- 増減履歴・スナップショット ---
+    def _ledger(self, record):
+        entry = QuantityLedger(
+            household=self.household,
+            item_id=self._resolve_item(record["item"]),
+            category_id=self._resolve_category(record.get("category")),
+            content_amount=record["content_amount"],
+            delta=record["delta"],
+            reason=record["reason"],
+            created_at=parse_datetime(record["created_at"]),
+        )
+        self._queue("ledger", entry, lambda: self._flush("ledger", QuantityLedger))
+
+    def _snapshot(self, record):
+        categories = {}
+        for ref, amount in record["categories"]:
+            category_id = self._resolve_category(ref)
+            key = "none" if category_id is None else str(category_id)
+            categories[key] = categories.get(key, 0) + amount
+
+        InventorySnapshot.objects.update_or_create(
+            household=self.household,
+            date=parse_date(record["date"]),
+            defaults={
+                "taken_at": parse_datetime(record["taken_at"]),
+                "items": {str(self._resolve_item(ref)): qty for ref, qty in record["items"].items()},
+                "categories": categories,
+            },
+        )
+        self.counts["snapshot"] += 1
+
+    # --- メモ ---
+    def _memo_user(self, username):
+        if self.owner is not None and username == self.owner.get_username():
+            return self.owner
+        if username not in self.users:
+            self.users[username] = (
+                get_user_model().objects.filter(household=self.household, username=username).first()
+            )
+        return self.users[username] or self.owner
+
+    def _memo(self, record):
+        user = self._memo_user(record.get("user"))
+        if user is None:
+            self.skipped["memo"] += 1
+            return
+
+        memo = Memo(household=self.household, user=user, title=record["title"], body=record.get("body", ""))
+        memo._backup_times = (parse_datetime(record["created_at"]), parse_datetime(record["updated_at"]))
+        self._queue("memo", memo, self._flush_memos)
+
+    def _flush_memos(self):
+        objs = self.pending["memo"]
+        if not objs:
+            return
+        Memo.objects.bulk_create(objs, batch_size=BATCH_SIZE)
+        # 作成日時・更新日時は auto_now(_add) で上書きされるので、後から元に戻す
+        for obj in objs:
+            obj.created_at, obj.updated_at = obj._backup_times
+        Memo.objects.bulk_update(objs, ["created_at", "updated_at"], batch_size=BATCH_SIZE)
+        self.counts["memo"] += len(objs)
+        self.pending["memo"] = []
+
+
+def _records(lines):
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            raise InvalidBackup(f"{number}行目が JSON として読めません。")
+
+
+def import_lines(lines, archive=None, name=None, owner=None):
+    """
+    JSONL の行（書き出しと同じ順番）から、新しい世帯を1つ作って読み込む
+    - archive：画像の入った zip（zipfile.ZipFile）。無ければ画像はストレージにある分だけ使う
+    - name：世帯名（省略時は書き出し元の世帯名）
+    - owner：読み込む人。作成者が owner でも読み込み先の世帯のメンバーでもないメモは、owner のメモにする
+      （owner が無ければそのメモは読み込まない）
+    - 全体を1トランザクションで行う（途中で失敗したら世帯ごと無かったことにする）
+      戻した画像ファイルは残るが、参照が無いので gc_media が消す
+
+    戻り値：(世帯, 種類ごとの件数, 読み込めなかった件数)
+    """
+    records = _records(lines)
+    header = next(records, None)
+    if not header or header.get("type") != "header" or header.get("format") != FORMAT:
+        raise InvalidBackup("StockNavi の世帯データではありません。")
+    if header.get("version") != VERSION:
+        raise InvalidBackup(f"対応していない版です：{header.get('version')}")
+
+    with transaction.atomic():
+        household = Household.objects.create(
+            name=name or header["household"]["name"],
+            target_days=header["household"]["target_days"],
+        )
+        importer = _Importer(household, archive=archive, owner=owner)
+        for record in records:
+            importer.add(record)
+        importer.flush()
+
+    return household, importer.counts, importer.skipped
+
+
+def open_backup(path):
+    """
+    書き出したファイル（.jsonl か .zip）を開き、(行のイテレーター, zip または None) を返す
+    - どちらも1行ずつ読む（ファイルを丸ごと読まない）
+    """
+    if zipfile.is_zipfile(path):
+        archive = zipfile.ZipFile(path)
+        if DATA_NAME not in archive.NameToInfo:
+            archive.close()
+            raise InvalidBackup(f"zip の中に {DATA_NAME} がありません。")
+        return io.TextIOWrapper(archive.open(DATA_NAME), encoding="utf-8"), archive
+    return open(path, encoding="utf-8"), None
@@ -1,10 +1,11 @@
 from django.db.models import Sum, F, FloatField
 from django.db.models.functions import Coalesce
 
-from inventory.models import InventoryItem, Category
+from inventory.models import InventoryItem, Category, StorageLocation
+from inventory.services.supply import member_counts
 
 
-def calc_category_amounts(household, storage_location_id=None):
+def calc_category_amounts(household, storage_location_id=None, members=None):
     """
     分類（Category）ごとの現在量を集計する。
     画面設計図の「内容量 × 個数」で計算する前提。
@@ -13,6 +14,8 @@ def calc_category_amounts(household, storage_location_id=None):
     - 論理削除済みは除外する
     - 数量0は除外する
     - 0件でも落ちない（Coalesceで0にする）
+    - 1人1日あたりの目安量がある分類は「何日分あるか」も同じループで出す
+      （members を渡さなければ世帯の人数を1クエリで数える）
     """
     qs = InventoryItem.objects.filter(
         household=household,
@@ -39,6 +42,9 @@ def calc_category_amounts(household, storage_location_id=None):
     # 分類マスタ（世帯の分類だけ）
     categories = Category.objects.filter(household=household).order_by("name")
 
+    if members is None:
+        members = member_counts([household.pk])[household.pk]
+
     rows = []
     total = 0.0
     for c in categories:
@@ -48,6 +54,9 @@ def calc_category_amounts(household, storage_location_id=None):
         goal = float(c.goal_amount or 0.0)
         achievement = 0.0 if goal <= 0 else (cur / goal) * 100
 
+        # 世帯全体の1日あたり必要量（目安量 × 人数）
+        daily_need = float(c.daily_rate_per_person or 0.0) * members
+
         rows.append(
             {
                 "id": c.id,
@@ -57,6 +66,8 @@ def calc_category_amounts(household, storage_location_id=None):
                 "goal_unit": c.goal_unit,
                 "current_amount": cur,
                 "achievement_percent": achievement,
+                "daily_need": daily_need,
+                "supply_days": cur / daily_need if daily_need > 0 else None,
             }
         )
 
@@ -67,4 +78,92 @@ def calc_category_amounts(household, storage_location_id=None):
     # 達成度が低い順に並び替え（不足を上に）
     rows.sort(key=lambda x: x["achievement_percent"])
 
-    return rows, total
\ No newline at end of file
+    return rows, total
+
+def calc_category_location_matrix(household):
+    """
+    分類 × 保管場所 の現在量を1回の GROUP BY で集計する（ピボット表）
+    - 保管場所を1つずつ切り替えて calc_category_amounts を何回も呼ばなくて済む
+    - 行合計・列合計・セルごとの達成度（セルの量 / 分類の目標量）も付ける
+    - 未分類・保管場所未設定の在庫も「未分類」「未設定」として数える
+    """
+    agg = (
+        InventoryItem.objects.filter(
+            household=household,
+            is_deleted=False,
+            quantity__gt=0,
+        )
+        .values("category_id", "storage_location_id")
+        .annotate(
+            amount=Coalesce(
+                Sum(F("content_amount") * F("quantity"), output_field=FloatField()),
+                0.0,
+            )
+        )
+    )
+    amounts = {
+        (row["category_id"], row["storage_location_id"]): float(row["amount"])
+        for row in agg
+    }
+
+    categories = list(
+        Category.objects.filter(household=household)
+        .order_by("name")
+        .values("id", "name", "color", "goal_amount", "goal_unit")
+    )
+    locations = list(
+        StorageLocation.objects.filter(household=household)
+        .order_by("name")
+        .values("id", "name")
+    )
+
+    # 未分類・未設定は、量がある時だけ行/列を出す
+    if any(cat_id is None for cat_id, _ in amounts):
+        categories.append({"id": None, "name": "未分類", "color": "", "goal_amount": 0, "goal_unit": ""})
+    if any(loc_id is None for _, loc_id in amounts):
+        locations.append({"id": None, "name": "未設定"})
+
+    max_amount = max(amounts.values(), default=0.0)
+    column_totals = [0.0] * len(locations)
+    rows = []
+    total = 0.0
+
+    for c in categories:
+        goal = float(c["goal_amount"] or 0.0)
+        cells = []
+        row_total = 0.0
+
+        for i, loc in enumerate(locations):
+            amount = amounts.get((c["id"], loc["id"]), 0.0)
+            row_total += amount
+            column_totals[i] += amount
+            cells.append(
+                {
+                    "storage_location_id": loc["id"],
+                    "amount": amount,
+                    "achievement_percent": 0.0 if goal <= 0 else (amount / goal) * 100,
+                    # ヒートマップの濃さ（最大セルを1.0）
+                    "heat": 0.0 if max_amount <= 0 else amount / max_amount,
+                }
+            )
+
+        total += row_total
+        rows.append(
+            {
+                "id": c["id"],
+                "name": c["name"],
+                "color": c["color"],
+                "goal_amount": goal,
+                "goal_unit": c["goal_unit"],
+                "cells": cells,
+                "total": row_total,
+                "achievement_percent": 0.0 if goal <= 0 else (row_total / goal) * 100,
+            }
+        )
+
+    return {
+        "locations": locations,
+        "rows": rows,
+        "column_totals": column_totals,
+        "total": total,
+    }
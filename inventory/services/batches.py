@@ -0,0 +1,153 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from inventory.models import Category, InventoryItem, OperationBatch, StorageLocation
+from inventory.services import events, ledger
+from inventory.services.versions import bump_household_version
+
+# 元に戻したときの在庫の状態（操作の種類 → is_deleted をどうするか）
+UNDO_DELETED_FLAG = {
+    "bulk_delete": False,     # 削除を取り消す → 在庫一覧に戻す
+    "bulk_duplicate": True,   # 複製を取り消す → 作った在庫を履歴へ
+}
+
+UNDO_REASON = {
+    "bulk_delete": "restore",
+    "bulk_duplicate": "delete",
+}
+
+
+def retention():
+    return timedelta(hours=getattr(settings, "INVENTORY_UNDO_RETENTION_HOURS", 24))
+
+
+def begin(household, user, kind, changed_fields=()):
+    """
+    一括操作を1件作る（在庫の UPDATE / 作成の前に呼ぶ）
+    - ついでに保持期間を過ぎた古い操作を消す（在庫側の ID は SET_NULL で外れる。一括編集の変更前の値も消える）
+    - changed_fields：一括編集で変える項目（戻すときはこの項目だけ書き戻す）
+    """
+    OperationBatch.objects.filter(
+        household=household,
+        created_at__lt=timezone.now() - retention(),
+    ).delete()
+    return OperationBatch.objects.create(
+        household=household, user=user, kind=kind, changed_fields=list(changed_fields),
+    )
+
+
+def finish(batch, item_count):
+    batch.item_count = item_count
+    batch.save(update_fields=["item_count"])
+
+
+def last_undoable(household):
+    """
+    元に戻せる直前の一括操作（保持期間内・まだ戻していない・最新の1件）
+    """
+    batch = (
+        OperationBatch.objects.filter(household=household, created_at__gte=timezone.now() - retention())
+        .order_by("-created_at", "-id")
+        .first()
+    )
+    if batch is None or batch.undone_at is not None or batch.item_count == 0:
+        return None
+    return batch
+
+
+def undo(household, batch_id):
+    """
+    一括操作を元に戻す（一括削除・一括複製は同じ操作IDの在庫を UPDATE 1回、一括編集は変更前の値を書き戻す）
+    - 直前の操作だけを戻せる（古い操作を戻すと、その後の操作と食い違うため）
+    戻り値：戻した件数（戻せないときは None）
+    """
+    with transaction.atomic():
+        batch = last_undoable(household)
+        if batch is None or batch.pk != int(batch_id):
+            return None
+        batch = OperationBatch.objects.select_for_update().get(pk=batch.pk)
+        if batch.undone_at is not None:
+            return None
+
+        if batch.kind == "bulk_edit":
+            restored = _undo_edit(household, batch)
+        else:
+            restored = _undo_flag(household, batch)
+
+        batch.undone_at = timezone.now()
+        batch.save(update_fields=["undone_at"])
+
+    bump_household_version(household.pk)
+    return restored
+
+
+def _undo_flag(household, batch):
+    """
+    一括削除・一括複製を戻す（同じ操作IDの在庫の is_deleted を UPDATE 1回）
+    """
+    target = UNDO_DELETED_FLAG[batch.kind]
+    qs = InventoryItem.objects.filter(
+        household=household,
+        operation_batch=batch,
+        is_deleted=not target,
+    )
+    rows = list(qs.values("id", "quantity", "category_id", "content_amount"))
+    restored = qs.update(is_deleted=target, updated_at=timezone.now())
+
+    sign = -1 if target else +1
+    ledger.record(ledger.entries_from_rows(household.pk, rows, sign, UNDO_REASON[batch.kind]))
+    events.publish_items(household.pk, [row["id"] for row in rows], ("is_deleted",))
+    return restored
+
+
+def _undo_edit(household, batch):
+    """
+    一括編集を戻す（OperationBatchEdit の変更前の値を、変えた項目だけ書き戻す）
+    - 履歴に移した在庫は戻さない
+    - その間に削除した分類・保管場所は「なし」に戻す
+    - 数量は増減した分だけ逆に増減する（その後に使った分はそのまま。0 より下にはしない）
+    """
+    fields = [f for f in batch.changed_fields if f != "quantity"]
+    edits = {edit.item_id: edit for edit in batch.edits.all()}
+    items = list(
+        InventoryItem.objects.filter(household=household, id__in=edits, is_deleted=False).select_for_update()
+    )
+
+    live_categories = set()
+    live_locations = set()
+    if "category_id" in fields:
+        live_categories = set(
+            Category.objects.filter(household=household, id__in=[e.category_id for e in edits.values()])
+            .values_list("id", flat=True)
+        )
+    if "storage_location_id" in fields:
+        live_locations = set(
+            StorageLocation.objects.filter(household=household, id__in=[e.storage_location_id for e in edits.values()])
+            .values_list("id", flat=True)
+        )
+
+    now = timezone.now()
+    entries = []
+    for item in items:
+        edit = edits[item.pk]
+        if "category_id" in fields:
+            item.category_id = edit.category_id if edit.category_id in live_categories else None
+        if "storage_location_id" in fields:
+            item.storage_location_id = (
+                edit.storage_location_id if edit.storage_location_id in live_locations else None
+            )
+        if "expiry_date" in fields:
+            item.expiry_date = edit.expiry_date
+        if edit.quantity_delta:
+            before = item.quantity or 0
+            item.quantity = max(before - edit.quantity_delta, 0)
+            entries.append(ledger.entry_for(item, item.quantity - before, "bulk_edit"))
+        item.updated_at = now
+
+    InventoryItem.objects.bulk_update(items, fields + ["quantity", "updated_at"], batch_size=500)
+    ledger.record(entries)
+    events.publish_items(household.pk, [item.pk for item in items], batch.changed_fields)
+    return len(items)
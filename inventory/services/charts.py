@@ -0,0 +1,136 @@
+import math
+
+from django.core.cache import cache
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from inventory.services.versions import household_cache_key
+
+# キャッシュの保持時間（版数が変われば別キーになるので長めでよい）
+CHART_CACHE_TIMEOUT = 60 * 60 * 24
+
+DEFAULT_COLOR = "#f1e8ff"
+EMPTY_COLOR = "#eeeeee"
+SHORTAGE_COLOR = "#f44336"
+ENOUGH_COLOR = "#4caf50"
+
+
+def _fmt(value):
+    """SVG座標用：小数2桁まで（余計な桁でHTMLを太らせない）"""
+    return f"{value:.2f}".rstrip("0").rstrip(".")
+
+
+def render_pie_svg(rows, size=240):
+    """
+    分類別の割合（share_percent）を円グラフの SVG にする
+    - 0件（合計0）のときは灰色の円と「データなし」
+    - 1分類で100%のときは path の円弧が描けないので circle で描く
+    - 凡例も SVG の中に描く（外部ライブラリ不要）
+    """
+    r = size / 2
+    cx = cy = r
+    slices = [row for row in rows if row["share_percent"] > 0]
+
+    legend_line = 20
+    height = size + 12 + legend_line * len(slices)
+
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {size} {height}" '
+        f'width="100%" role="img" aria-label="分類別の割合" class="balance-pie">'
+    ]
+
+    if not slices:
+        parts.append(f'<circle cx="{_fmt(cx)}" cy="{_fmt(cy)}" r="{_fmt(r)}" fill="{EMPTY_COLOR}"/>')
+        parts.append(
+            f'<text x="{_fmt(cx)}" y="{_fmt(cy)}" text-anchor="middle" '
+            f'dominant-baseline="middle" font-size="14" fill="#666">データなし</text>'
+        )
+    elif len(slices) == 1:
+        row = slices[0]
+        parts.append(
+            f'<circle cx="{_fmt(cx)}" cy="{_fmt(cy)}" r="{_fmt(r)}" '
+            f'fill="{escape(row["color"] or DEFAULT_COLOR)}" stroke="#fff">'
+            f'<title>{escape(row["name"])} 100%</title></circle>'
+        )
+    else:
+        angle = -math.pi / 2  # 12時の位置から時計回り
+        for row in slices:
+            sweep = 2 * math.pi * row["share_percent"] / 100
+            x1, y1 = cx + r * math.cos(angle), cy + r * math.sin(angle)
+            angle += sweep
+            x2, y2 = cx + r * math.cos(angle), cy + r * math.sin(angle)
+            large = 1 if sweep > math.pi else 0
+            parts.append(
+                f'<path d="M{_fmt(cx)},{_fmt(cy)} L{_fmt(x1)},{_fmt(y1)} '
+                f'A{_fmt(r)},{_fmt(r)} 0 {large} 1 {_fmt(x2)},{_fmt(y2)} Z" '
+                f'fill="{escape(row["color"] or DEFAULT_COLOR)}" stroke="#fff" stroke-width="1">'
+                f'<title>{escape(row["name"])} {row["share_percent"]:.0f}%</title></path>'
+            )
+
+    # 凡例
+    y = size + 12
+    for row in slices:
+        parts.append(
+            f'<rect x="0" y="{y + 3}" width="12" height="12" rx="2" '
+            f'fill="{escape(row["color"] or DEFAULT_COLOR)}" stroke="#ccc"/>'
+            f'<text x="18" y="{y + 13}" font-size="12" fill="#333">'
+            f'{escape(row["name"])} {row["share_percent"]:.0f}%</text>'
+        )
+        y += legend_line
+
+    parts.append("</svg>")
+    return mark_safe("".join(parts))
+
+
+def render_achievement_svg(rows, width=320):
+    """
+    分類ごとの達成度（achievement_percent）を横棒グラフの SVG にする
+    - 100%未満は赤、100%以上は緑（表のプログレスバーと同じ色）
+    - 棒の長さは100%で頭打ち、数値はそのまま表示
+    """
+    label_w = 96
+    value_w = 48
+    bar_w = width - label_w - value_w
+    line = 26
+    height = max(line * len(rows), line)
+
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {width} {height}" '
+        f'width="100%" role="img" aria-label="分類ごとの達成度" class="balance-bars">'
+    ]
+
+    if not rows:
+        parts.append(f'<text x="0" y="18" font-size="13" fill="#666">分類がありません</text>')
+
+    for i, row in enumerate(rows):
+        y = i * line
+        pct = row["achievement_percent"]
+        filled = bar_w * min(pct, 100) / 100
+        color = SHORTAGE_COLOR if pct < 100 else ENOUGH_COLOR
+        parts.append(
+            f'<text x="0" y="{y + 17}" font-size="12" fill="#333">{escape(row["name"][:8])}</text>'
+            f'<rect x="{label_w}" y="{y + 7}" width="{bar_w}" height="10" rx="5" fill="{EMPTY_COLOR}"/>'
+            f'<rect x="{label_w}" y="{y + 7}" width="{_fmt(filled)}" height="10" rx="5" fill="{color}">'
+            f'<title>{escape(row["name"])} {pct:.0f}%</title></rect>'
+            f'<text x="{width}" y="{y + 17}" font-size="12" text-anchor="end" fill="#333">{pct:.0f}%</text>'
+        )
+
+    parts.append("</svg>")
+    return mark_safe("".join(parts))
+
+
+def balance_charts(household, storage_id, rows):
+    """
+    バランス画面のグラフ（円・達成度）をまとめて返す
+    - 世帯のデータ版数＋保管場所でキャッシュ（在庫が変わらない限り再描画しない）
+    """
+    key = household_cache_key("balance_svg", household, storage_id or "all")
+    charts = cache.get(key)
+    if charts is None:
+        charts = {
+            "pie": str(render_pie_svg(rows)),
+            "bars": str(render_achievement_svg(rows)),
+        }
+        cache.set(key, charts, CHART_CACHE_TIMEOUT)
+
+    return {name: mark_safe(svg) for name, svg in charts.items()}
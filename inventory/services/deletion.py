@@ -0,0 +1,121 @@
+from django.db.models import Case, F, When
+from django.utils import timezone
+
+from inventory.models import Category, InventoryItem, StorageLocation
+from inventory.services import backends, events, writes
+from inventory.services.versions import bump_household_version
+from inventory.services.workers import submit_after_commit
+
+# 1回のトランザクションで外す在庫の数（SQLite の書き込みロックを短くする）
+CHUNK_SIZE = 500
+
+# 削除の種類 → (モデル, 在庫側の外部キー)
+TARGETS = {
+    "category": (Category, "category"),
+    "location": (StorageLocation, "storage_location"),
+}
+
+
+def _kind(model):
+    for kind, (target, _field) in TARGETS.items():
+        if target is model:
+            return kind
+    raise ValueError(f"{model.__name__} は削除の対象ではありません。")
+
+
+def live(path, field="name"):
+    """
+    在庫から読む分類・保管場所の列（削除済みの印が付いていれば NULL ＝ 未設定として読む）
+    - purge() が在庫を外し終えるまでの間も、API・商品のロット・棚卸しに削除した分類・保管場所を出さない
+    - path：在庫からの経路（"category" / "storage_location" / "item__storage_location" など）
+    例）.values("id", category_name=deletion.live("category"), category=deletion.live("category", "id"))
+    """
+    return Case(When(**{f"{path}__is_deleted": False}, then=F(f"{path}__{field}")), default=None)
+
+
+def schedule_delete(queryset):
+    """
+    分類・保管場所を削除する（一覧・選択肢・集計からはすぐ消える）
+    - リクエストの中では is_deleted の印を付ける UPDATE 1回だけ
+    - ひも付いた在庫を外して行を物理削除するのは、コミット後にワーカーで purge() が行う
+      （在庫が多くても、長い書き込みトランザクションで世帯全体を待たせない）
+    - ワーカーが途中で止まっても、印が残っているので purge_deleted コマンドでやり直せる
+
+    戻り値：削除した件数
+    """
+    kind = _kind(queryset.model)
+    rows = list(queryset.values_list("id", "household_id"))
+    if not rows:
+        return 0
+
+    queryset.model.objects.filter(pk__in=[pk for pk, _ in rows]).update(
+        is_deleted=True, updated_at=timezone.now()
+    )
+    for household_id in {household_id for _, household_id in rows}:
+        bump_household_version(household_id)
+    for pk, _ in rows:
+        submit_after_commit(purge, kind, pk)
+    return len(rows)
+
+
+def purge(kind, pk, chunk_size=CHUNK_SIZE):
+    """
+    削除済みの分類・保管場所1件を片付ける（ワーカー・purge_deleted コマンドから呼ぶ）
+    1) ひも付いた在庫を chunk_size 件ずつ外す（1回ごとに短い書き込みトランザクション。writes.run）
+       - updated_at を進め、ライブ更新にも流す（差分同期・一覧が「未分類」を拾えるように）
+    2) 在庫が残っていなければ行を物理削除する（削除の記録はシグナルが残す）
+    - 各回の最初に分類・保管場所の行を SKIP LOCKED で取る（backends.claim）。
+      ほかのプロセスのワーカー・コマンドが同じ行を処理中なら、そちらに任せて抜ける
+
+    戻り値：外した在庫の数
+    """
+    model, field = TARGETS[kind]
+    household_id = (
+        model.all_objects.filter(pk=pk, is_deleted=True).values_list("household_id", flat=True).first()
+    )
+    if household_id is None:
+        # もう片付いている（ほかのワーカー・コマンドが済ませた）
+        return 0
+
+    detached = 0
+    while True:
+        count = writes.run(_detach_chunk, model, field, pk, household_id, chunk_size)
+        if not count:
+            break
+        detached += count
+    return detached
+
+
+def _detach_chunk(model, field, pk, household_id, chunk_size):
+    """
+    在庫を chunk_size 件外す。外す在庫が残っていなければ行を物理削除する
+    戻り値：外した在庫の数（0 なら削除済み、またはほかのワーカーが処理中）
+    """
+    target = backends.claim(model.all_objects.filter(pk=pk, is_deleted=True))
+    if not list(target.values_list("pk", flat=True)):
+        return 0
+
+    items = InventoryItem.objects.filter(**{field: pk})
+    ids = list(items.order_by("id").values_list("id", flat=True)[:chunk_size])
+    if not ids:
+        model.all_objects.filter(pk=pk).delete()
+        return 0
+
+    items.filter(pk__in=ids).update(**{field: None}, updated_at=timezone.now())
+    bump_household_version(household_id)
+    events.publish_items(household_id, ids, (f"{field}_id",))
+    return len(ids)
+
+
+def purge_pending(chunk_size=CHUNK_SIZE):
+    """
+    削除済みの印が残っている分類・保管場所をすべて片付ける
+    戻り値：{"category": 件数, "location": 件数, "items": 外した在庫の数}
+    """
+    result = {"items": 0}
+    for kind, (model, _field) in TARGETS.items():
+        pks = list(model.all_objects.filter(is_deleted=True).order_by("id").values_list("id", flat=True))
+        for pk in pks:
+            result["items"] += purge(kind, pk, chunk_size=chunk_size)
+        result[kind] = len(pks)
+    return result
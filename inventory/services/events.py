@@ -0,0 +1,199 @@
+import asyncio
+import json
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import formats, timezone
+from django.utils.module_loading import import_string
+
+from inventory.models import InventoryItem
+from inventory.services import alerts
+
+# ライブ更新で送る在庫の項目（一覧の行を書き換えるのに必要なものだけ）
+TRACKED_FIELDS = (
+    "name", "quantity", "expiry_date", "category_id", "storage_location_id", "is_deleted",
+)
+
+# 何も起きなくても、この秒数ごとにコメント行を送る（プロキシに切られないように）
+HEARTBEAT_SECONDS = 15
+
+# 切れたときにブラウザが再接続するまでの時間（ミリ秒）
+RETRY_MS = 3000
+
+# 1接続あたりためておけるイベント数（あふれたら reset を送って取り直してもらう）
+QUEUE_SIZE = 200
+
+
+class Subscription:
+    """
+    1接続ぶんの受け口（イベントループ上の asyncio.Queue）
+    - publish は別スレッド（同期ビュー）から来るので、call_soon_threadsafe で積む
+    """
+
+    def __init__(self, household_id):
+        self.household_id = household_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+
+    def offer(self, event):
+        self.loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event):
+        if self.queue.full():
+            # 読むのが追いつかない：ためた分は捨てて、取り直してもらう
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            event = {"type": "reset"}
+        self.queue.put_nowait(event)
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class InProcessBackend:
+    """
+    同じプロセス内だけで配る pub/sub
+    - ASGI サーバー1プロセス（書き込みも同じプロセスで受ける）構成向け
+    - 複数プロセス・複数台に分けるときは、同じ形（subscribe / unsubscribe / publish /
+      has_subscribers）のバックエンドを作って INVENTORY_EVENTS_BACKEND で差し替える
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def subscribe(self, household_id):
+        subscription = Subscription(household_id)
+        with self._lock:
+            self._subscribers.setdefault(household_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.household_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.household_id]
+
+    def has_subscribers(self, household_id):
+        return household_id in self._subscribers
+
+    def publish(self, household_id, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(household_id, ()))
+        for subscription in subscribers:
+            subscription.offer(event)
+
+
+@lru_cache(maxsize=1)
+def get_backend():
+    path = getattr(settings, "INVENTORY_EVENTS_BACKEND", "inventory.services.events.InProcessBackend")
+    return import_string(path)()
+
+
+# ----------------------------
+# イベントを送る側
+# ----------------------------
+def _value(field, value):
+    if field == "expiry_date" and value is not None:
+        return value.isoformat()
+    return value
+
+
+def item_event(row, fields, alert, today):
+    """
+    在庫1件の変更イベント（コンパクトな dict）
+    - row：values() の結果（id / quantity / expiry_date / is_deleted と fields を含む）
+    - changed：変わった項目だけ。アラートの状態と残り日数は毎回付ける
+    """
+    if row["is_deleted"]:
+        return {"type": "item", "id": row["id"], "deleted": True}
+
+    state, days_left = alerts.alert_state(row["quantity"], row["expiry_date"], alert, today)
+    changed = {field: _value(field, row[field]) for field in fields}
+    if "expiry_date" in fields and row["expiry_date"] is not None:
+        # 一覧と同じ日付の書式（テンプレートの {{ item.expiry_date }}）
+        changed["expiry_label"] = formats.date_format(row["expiry_date"])
+    return {"type": "item", "id": row["id"], "changed": changed, "alert": state, "days_left": days_left}
+
+
+def publish_item_changes(household_id, changes):
+    """
+    保存した在庫の変更を、コミット後に世帯のメンバーへ送る（シグナルから呼ぶ）
+    - changes：{在庫ID: 変わった項目の tuple}
+    - 接続しているメンバーがいなければ何もしない（クエリもしない）
+    """
+    changes = {pk: fields for pk, fields in changes.items() if fields}
+    if household_id and changes:
+        transaction.on_commit(lambda: _send(household_id, changes))
+
+
+def publish_items(household_id, item_ids, fields=TRACKED_FIELDS):
+    """
+    queryset.update() などでまとめて変えた在庫を送る（シグナルが飛ばない一括更新の後に呼ぶ）
+    - fields：変えた項目（分からなければ TRACKED_FIELDS 全部）
+    """
+    fields = tuple(fields)
+    publish_item_changes(household_id, {int(pk): fields for pk in item_ids})
+
+
+def publish_item_deleted(household_id, item_id):
+    if household_id:
+        transaction.on_commit(
+            lambda: get_backend().publish(household_id, {"type": "item", "id": item_id, "deleted": True})
+        )
+
+
+def _send(household_id, changes):
+    backend = get_backend()
+    if not backend.has_subscribers(household_id):
+        return
+
+    needed = {"id", "quantity", "expiry_date", "is_deleted"}
+    for fields in changes.values():
+        needed.update(fields)
+
+    alert = alerts.alert_setting(household_id)
+    today = timezone.localdate()
+    rows = InventoryItem.objects.filter(household_id=household_id, pk__in=list(changes)).values(*needed)
+    found = set()
+    for row in rows:
+        found.add(row["id"])
+        backend.publish(household_id, item_event(row, changes[row["id"]], alert, today))
+
+    # コミット後に物理削除されていた
+    for pk in set(changes) - found:
+        backend.publish(household_id, {"type": "item", "id": pk, "deleted": True})
+
+
+# ----------------------------
+# SSE（受け取る側）
+# ----------------------------
+def _format(event_type, data):
+    return f"event: {event_type}\ndata: {json.dumps(data, ensure_ascii=False, separators=(',', ':'))}\n\n"
+
+
+async def stream(household_id, version):
+    """
+    SSE の本文（async generator）
+    - 最初に hello（接続時点の世帯のデータ版数）を送る。表示中の版数と違えば取り直してもらう
+    - 以降は世帯のイベントが来るたびに1件ずつ送る
+    - 接続が切れるとジェネレーターが閉じられ、finally で受け口を外す
+    """
+    backend = get_backend()
+    subscription = backend.subscribe(household_id)
+    try:
+        yield f"retry: {RETRY_MS}\n" + _format("hello", {"version": version})
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.get(), HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            # 同じ dict を他の接続にも配っているので書き換えない
+            yield _format(event["type"], event)
+    finally:
+        backend.unsubscribe(subscription)
@@ -0,0 +1,183 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db.models import F, FloatField, Min, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from inventory.models import Category, CategoryForecast, QuantityLedger
+from inventory.services.versions import household_cache_key
+
+# 何日分の履歴から消費ペースを推定するか
+# （compact_ledger の保持日数 30日より短くしておく）
+WINDOW_DAYS = 28
+
+# 消費として数える増減履歴の理由（使用・数量の増減ボタン・編集画面や同期での数量の変更）
+# 編集は「使ったので数量を減らした」ことが多いので、在庫・日ごとに足してマイナスになった分を数える
+# 削除・一括削除・棚卸しなどのマイナスは「使った」わけではないので数えない
+CONSUMPTION_REASONS = ("consume", "adjust", "edit")
+
+# 新しい日ほど重く見る（指数加重平均の半減期）
+HALF_LIFE_DAYS = 7
+
+FORECAST_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def _weights(days):
+    """
+    経過日数 0..days-1 ごとの重み（今日が一番重い）
+    """
+    return [0.5 ** (age / HALF_LIFE_DAYS) for age in range(days)]
+
+
+def estimate_rates(household_ids, today=None):
+    """
+    複数世帯の分類ごとの1日あたり消費量をまとめて推定する
+
+    - 消費量 = 使用・数量の増減・編集（CONSUMPTION_REASONS）を在庫・日ごとに足し合わせたマイナス分
+      （内容量 × 個数。押し間違えて +1 → -1 したような分は打ち消し合う。編集で増やしただけの日は数えない）
+    - 集計は (世帯, 分類, 日, 在庫) の GROUP BY 1回と、世帯ごとの履歴開始日 1回だけ
+    - 履歴開始日は期間で絞らずに世帯の最初の履歴から取る（今日はじめて記録した世帯でも、
+      昔からある世帯なら1日分を1日あたりとみなさない）
+    - 推定は「分類 × 日」の行列に同じ重みベクトルを掛けるだけ（全分類を1パス）
+    - 履歴が WINDOW_DAYS より短い世帯は、履歴のある日数で割る
+
+    戻り値：{household_id: {category_id: (daily_rate, sample_days)}}
+    """
+    today = today or timezone.localdate()
+    start = today - timedelta(days=WINDOW_DAYS - 1)
+    ledger = QuantityLedger.objects.filter(household_id__in=household_ids)
+
+    daily = (
+        ledger.filter(
+            created_at__date__gte=start,
+            reason__in=CONSUMPTION_REASONS,
+            category_id__isnull=False,
+        )
+        .annotate(day=TruncDate("created_at"))
+        .values("household_id", "category_id", "day", "item_id")
+        .annotate(
+            net=Sum("delta"),
+            amount=Sum(-F("delta") * F("content_amount"), output_field=FloatField()),
+        )
+        .filter(net__lt=0)
+    )
+
+    first_seen = dict(
+        ledger.values("household_id")
+        .annotate(first=Min("created_at"))
+        .values_list("household_id", "first")
+    )
+
+    # 分類 × 日（age=今日からの日数）の行列
+    matrix = defaultdict(lambda: [0.0] * WINDOW_DAYS)
+    for row in daily:
+        age = (today - row["day"]).days
+        if 0 <= age < WINDOW_DAYS:
+            matrix[(row["household_id"], row["category_id"])][age] += row["amount"]
+
+    weights = _weights(WINDOW_DAYS)
+    results = defaultdict(dict)
+
+    for (household_id, category_id), series in matrix.items():
+        first = first_seen.get(household_id)
+        days = WINDOW_DAYS
+        if first is not None:
+            days = min(WINDOW_DAYS, (today - timezone.localdate(first)).days + 1)
+        days = max(days, 1)
+
+        w = weights[:days]
+        rate = sum(a * b for a, b in zip(series[:days], w)) / sum(w)
+        results[household_id][category_id] = (rate, days)
+
+    return results
+
+
+def get_daily_rates(household, today=None):
+    """
+    1世帯分の {category_id: daily_rate} を返す
+    - 今日の夜間バッチ結果（CategoryForecast）があればそれを使う
+    - 無ければその場で推定し、世帯のデータ版数＋日付でキャッシュする
+    """
+    today = today or timezone.localdate()
+    key = household_cache_key("forecast_rates", household, today.isoformat())
+    rates = cache.get(key)
+    if rates is not None:
+        return rates
+
+    stored = list(
+        CategoryForecast.objects.filter(household=household, computed_on=today)
+        .values_list("category_id", "daily_rate")
+    )
+    if stored:
+        rates = dict(stored)
+    else:
+        estimated = estimate_rates([household.pk], today=today).get(household.pk, {})
+        rates = {category_id: rate for category_id, (rate, _days) in estimated.items()}
+
+    cache.set(key, rates, FORECAST_CACHE_TIMEOUT)
+    return rates
+
+
+def attach_forecast(rows, rates, today=None):
+    """
+    calc_category_amounts の rows に見込みを付け足す
+    - daily_rate     : 1日あたり消費量（履歴が無ければ 0）
+    - days_of_supply : 今の量で何日もつか（消費が無ければ None）
+    - run_out_date   : なくなる見込み日（同上）
+    """
+    today = today or timezone.localdate()
+    for r in rows:
+        rate = rates.get(r["id"], 0.0)
+        r["daily_rate"] = rate
+        if rate > 0:
+            days = r["current_amount"] / rate
+            r["days_of_supply"] = days
+            r["run_out_date"] = today + timedelta(days=int(days))
+        else:
+            r["days_of_supply"] = None
+            r["run_out_date"] = None
+    return rows
+
+
+def save_forecasts(household_ids, today=None):
+    """
+    夜間バッチ用：複数世帯の推定結果を CategoryForecast にまとめて保存する
+    戻り値：保存した件数
+    """
+    today = today or timezone.localdate()
+    estimated = estimate_rates(household_ids, today=today)
+
+    # 履歴には削除済みの分類IDも残っているので、今ある分類だけ保存する
+    existing = set(
+        Category.objects.filter(household_id__in=household_ids).values_list("id", flat=True)
+    )
+
+    objs = [
+        CategoryForecast(
+            household_id=household_id,
+            category_id=category_id,
+            daily_rate=rate,
+            sample_days=days,
+            computed_on=today,
+        )
+        for household_id, per_category in estimated.items()
+        for category_id, (rate, days) in per_category.items()
+        if category_id in existing
+    ]
+    if objs:
+        CategoryForecast.objects.bulk_create(
+            objs,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=["category"],
+            update_fields=["daily_rate", "sample_days", "computed_on"],
+        )
+
+    # 消費が無くなった分類は 0 に戻す（古い推定値を残さない）
+    CategoryForecast.objects.filter(household_id__in=household_ids).exclude(
+        computed_on=today
+    ).update(daily_rate=0, sample_days=0, computed_on=today)
+
+    return len(objs)
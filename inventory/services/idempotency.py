@@ -0,0 +1,104 @@
+import random
+import re
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from inventory.models import IdempotencyKey
+
+# フォームの hidden のフィールド名
+FIELD_NAME = "idempotency_key"
+
+# 受け付けるキーの形式（テンプレートタグは uuid4 の hex を出す）
+KEY_PATTERN = re.compile(r"^[A-Za-z0-9_-]{16,64}$")
+
+# 同じキーの処理がまだ終わっていないとき、結果を待つ時間（秒）と間隔
+WAIT_SECONDS = 5.0
+POLL_INTERVAL = 0.1
+
+# 新しいキーを登録するたびに、この確率で期限切れの行をまとめて消す
+PRUNE_PROBABILITY = 0.01
+
+
+def ttl():
+    return timedelta(hours=getattr(settings, "INVENTORY_IDEMPOTENCY_TTL_HOURS", 24))
+
+
+def valid_key(key):
+    return bool(key) and bool(KEY_PATTERN.match(key))
+
+
+def claim(household, key, wait=True):
+    """
+    キーを「処理中」として登録する
+
+    戻り値：(record, created)
+      - created=True ：初めてのキー。呼び出し側で処理して complete / release する
+      - created=False：同じキーが既にある。record.status が done なら結果を返すだけ
+                       （処理中なら WAIT_SECONDS まで完了を待つ。待っても終わらなければ pending のまま返す）
+
+    - wait=False：処理中でも待たずにすぐ返す（1リクエストで多くのキーを扱う差分同期用。
+      キーごとに待つと、送り直しのたびにリクエストのスレッドが長く止まる）
+    - 一意制約への INSERT 1回で判定するので、同時に2つ来ても片方しか処理しない
+    - 期限切れのキーは上書きして、新しいキーとして扱う
+    """
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            record = IdempotencyKey.objects.create(household=household, key=key, created_at=now)
+    except IntegrityError:
+        record = None
+
+    if record is not None:
+        if random.random() < PRUNE_PROBABILITY:
+            prune()
+        return record, True
+
+    deadline = time.monotonic() + (WAIT_SECONDS if wait else 0)
+    while True:
+        record = IdempotencyKey.objects.filter(household=household, key=key).first()
+        if record is None:
+            # 1回目が失敗して release された：改めて登録する
+            return claim(household, key, wait=wait)
+        if record.created_at < now - ttl():
+            # 期限切れ：同じ行を新しいキーとして使い直す
+            updated = IdempotencyKey.objects.filter(pk=record.pk, created_at=record.created_at).update(
+                status=IdempotencyKey.STATUS_PENDING, location="", payload={}, created_at=now,
+            )
+            if updated:
+                record.refresh_from_db()
+                return record, True
+            continue
+        if record.status == IdempotencyKey.STATUS_DONE or time.monotonic() >= deadline:
+            return record, False
+        time.sleep(POLL_INTERVAL)
+
+
+def complete(record, location="", payload=None):
+    """
+    処理結果を保存する（2回目以降はこれを返す）
+    """
+    IdempotencyKey.objects.filter(pk=record.pk).update(
+        status=IdempotencyKey.STATUS_DONE,
+        location=location[:500],
+        payload=payload or {},
+    )
+
+
+def release(record):
+    """
+    処理しなかった（入力エラー・例外）：キーを消して、同じキーで送り直せるようにする
+    """
+    IdempotencyKey.objects.filter(pk=record.pk, status=IdempotencyKey.STATUS_PENDING).delete()
+
+
+def prune():
+    """
+    期限切れのキーをまとめて消す（created_at のインデックスで範囲削除）
+    戻り値：消した件数
+    """
+    deleted, _ = IdempotencyKey.objects.filter(created_at__lt=timezone.now() - ttl()).delete()
+    return deleted
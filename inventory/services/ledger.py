@@ -0,0 +1,136 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from inventory.models import InventoryItem, InventorySnapshot, QuantityLedger
+
+# スナップショットに含まれない古い増減履歴を残しておく日数
+DEFAULT_KEEP_DAYS = 30
+
+
+def entry_for(item, delta, reason):
+    """
+    在庫インスタンスから増減履歴1件を作る（まだ保存しない）
+    """
+    return QuantityLedger(
+        household_id=item.household_id,
+        item_id=item.pk,
+        category_id=item.category_id,
+        content_amount=item.content_amount,
+        delta=delta,
+        reason=reason,
+    )
+
+
+def entries_from_rows(household_id, rows, sign, reason):
+    """
+    values("id", "quantity", "category_id", "content_amount") の結果から
+    一括操作用の増減履歴を作る
+    - sign=-1 : 一括削除（その時点の数量ぶん減る）
+    - sign=+1 : 一括複製・復元（数量ぶん増える）
+    """
+    return [
+        QuantityLedger(
+            household_id=household_id,
+            item_id=row["id"],
+            category_id=row["category_id"],
+            content_amount=row["content_amount"],
+            delta=sign * (row["quantity"] or 0),
+            reason=reason,
+        )
+        for row in rows
+    ]
+
+
+def record(entries):
+    """
+    増減履歴をまとめて1回の INSERT で書く
+    - 増減0の行は書かない
+    - 画面の処理1回（同期なら変更1件）につき1回だけ、その書き込みと同じトランザクションで呼ぶ
+      （1件ずつ INSERT しない）
+    """
+    entries = [e for e in entries if e.delta]
+    if entries:
+        QuantityLedger.objects.bulk_create(entries, batch_size=500)
+    return len(entries)
+
+
+def _category_amounts(rows):
+    amounts = defaultdict(float)
+    for row in rows:
+        key = str(row["category_id"]) if row["category_id"] else "none"
+        amounts[key] += (row["quantity"] or 0) * (row["content_amount"] or 0)
+    return dict(amounts)
+
+
+def take_snapshot(household_id, date=None):
+    """
+    世帯の今の在庫数量をスナップショットとして保存する（同じ日の分は上書き）
+    - 論理削除済みの在庫は含めない
+    """
+    date = date or timezone.localdate()
+    rows = list(
+        InventoryItem.objects.filter(household_id=household_id, is_deleted=False)
+        .values("id", "quantity", "category_id", "content_amount")
+        .iterator(chunk_size=2000)
+    )
+
+    snapshot, _ = InventorySnapshot.objects.update_or_create(
+        household_id=household_id,
+        date=date,
+        defaults={
+            "taken_at": timezone.now(),
+            "items": {str(r["id"]): r["quantity"] for r in rows},
+            "categories": _category_amounts(rows),
+        },
+    )
+    return snapshot
+
+
+def quantities_as_of(household_id, moment):
+    """
+    ある日時の在庫数量 {在庫ID: 数量} を復元する
+    - 直前のスナップショット1件＋その後の増減履歴（短い末尾）だけを読む
+    - スナップショットが無い期間は、増減履歴だけから組み立てる
+    """
+    if not isinstance(moment, datetime):
+        # 日付が渡されたら、その日の終わり時点とする
+        moment = timezone.make_aware(datetime.combine(moment + timedelta(days=1), time.min))
+
+    snapshot = (
+        InventorySnapshot.objects.filter(household_id=household_id, taken_at__lte=moment)
+        .order_by("-taken_at")
+        .first()
+    )
+
+    quantities = {}
+    tail = QuantityLedger.objects.filter(household_id=household_id, created_at__lte=moment)
+    if snapshot is not None:
+        quantities = {int(k): v for k, v in snapshot.items.items()}
+        tail = tail.filter(created_at__gt=snapshot.taken_at)
+
+    for item_id, delta in tail.values("item_id").annotate(delta=Sum("delta")).values_list("item_id", "delta"):
+        quantities[item_id] = quantities.get(item_id, 0) + delta
+
+    return {k: v for k, v in quantities.items() if v > 0}
+
+
+def compact(household_id, keep_days=DEFAULT_KEEP_DAYS, date=None):
+    """
+    1世帯分の圧縮
+    1) 今日のスナップショットを作る
+    2) keep_days より古く、かつスナップショットより前の増減履歴を削除する
+       （それ以前の「ある日時の在庫」は日単位のスナップショットで復元できる）
+    戻り値：削除した増減履歴の件数
+    """
+    with transaction.atomic():
+        snapshot = take_snapshot(household_id, date=date)
+        cutoff = min(snapshot.taken_at, timezone.now() - timedelta(days=keep_days))
+        deleted, _ = QuantityLedger.objects.filter(
+            household_id=household_id,
+            created_at__lt=cutoff,
+        ).delete()
+    return deleted
@@ -0,0 +1,125 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from inventory.models import InventoryItem, Product
+from inventory.services import backends, deletion, events, ledger
+from inventory.services.versions import bump_household_version
+
+# 同時に使われてロットが減っていたときに読み直す回数の上限
+MAX_RETRIES = 5
+
+
+class InsufficientStock(Exception):
+    """
+    使う数が商品の在庫合計より多い（何も減らさずに戻す）
+    """
+
+    def __init__(self, available):
+        super().__init__(f"在庫が足りません（残り {available}）")
+        self.available = available
+
+
+def product_for(household_id, name):
+    """
+    世帯・名前から商品を取得（無ければ作る）
+    - 2人が同時に同じ名前で登録しても、一意制約で1件にまとまる
+    - PostgreSQL では ON CONFLICT の1クエリ（backends.upsert_products）
+    """
+    if backends.is_postgresql():
+        return backends.upsert_products(household_id, [name])[name]
+
+    try:
+        with transaction.atomic():
+            product, _ = Product.objects.get_or_create(household_id=household_id, name=name)
+    except IntegrityError:
+        product = Product.objects.get(household_id=household_id, name=name)
+    return product
+
+
+def _fefo_lots(product):
+    """
+    使う順（期限が近い順・期限なしは最後・同じ期限は古い登録から）のロット
+    - id と数量だけ読む（ロットが数百あってもインスタンスを作らない）
+    """
+    return (
+        InventoryItem.objects.filter(product=product, is_deleted=False, quantity__gt=0)
+        .order_by(F("expiry_date").asc(nulls_last=True), "id")
+        .values_list("id", "quantity")
+    )
+
+
+def consume(product, quantity):
+    """
+    商品を quantity 個使う：期限の近いロットから順に減らす（1トランザクション）
+
+    - 数量は読んでから書くのではなく「quantity >= 減らす数」を条件にした
+      F() の UPDATE で減らす（同時に使われても数量がマイナスにならない）
+    - 条件に合わず0件更新だったロットは今の数量を読み直して、取れる分だけ取る
+    - 合計が足りなければ InsufficientStock を出して全部元に戻す
+    - 増減履歴（reason="consume"）はロットごとに1件、まとめて1回で書く
+
+    戻り値：[(在庫ID, 減らした数), ...]
+    """
+    if quantity <= 0:
+        return []
+
+    taken = []
+    remaining = quantity
+    now = timezone.now()
+
+    with transaction.atomic():
+        # 先に (ID, 数量) を全部読んでおく（同じ接続で UPDATE しながら SELECT のカーソルを
+        # 読み進めない。SQLite では読み途中の結果に自分の更新が混ざりうる）
+        for item_id, current in list(_fefo_lots(product)):
+            if remaining <= 0:
+                break
+
+            for _ in range(MAX_RETRIES):
+                take = min(current, remaining)
+                if take <= 0:
+                    break
+                # 読んだ後に他のメンバーが履歴へ移したロットは減らさない
+                updated = InventoryItem.objects.filter(pk=item_id, is_deleted=False, quantity__gte=take).update(
+                    quantity=F("quantity") - take,
+                    updated_at=now,
+                )
+                if updated:
+                    taken.append((item_id, take))
+                    remaining -= take
+                    break
+                # 他のメンバーが先に使った：今の数量で取り直す
+                current = (
+                    InventoryItem.objects.filter(pk=item_id, is_deleted=False)
+                    .values_list("quantity", flat=True)
+                    .first()
+                ) or 0
+
+        if remaining > 0:
+            # 例外で atomic を抜けるので、ここまでの UPDATE も元に戻る
+            raise InsufficientStock(quantity - remaining)
+
+        lots = InventoryItem.objects.in_bulk([item_id for item_id, _ in taken])
+        ledger.record([ledger.entry_for(lots[item_id], -take, "consume") for item_id, take in taken])
+        bump_household_version(product.household_id)
+        events.publish_items(product.household_id, [item_id for item_id, _ in taken], ("quantity",))
+
+    return taken
+
+
+def product_summary(product):
+    """
+    商品の残り合計と、使う順のロット一覧
+    """
+    lots = list(
+        InventoryItem.objects.filter(product=product, is_deleted=False, quantity__gt=0)
+        .order_by(F("expiry_date").asc(nulls_last=True), "id")
+        # 削除済みの印が付いた保管場所は未設定（None）として返す
+        .values("id", "quantity", "expiry_date", location=deletion.live("storage_location"))
+    )
+    return {
+        "id": product.pk,
+        "name": product.name,
+        "total": sum(lot["quantity"] for lot in lots),
+        "lots": lots,
+    }
@@ -0,0 +1,217 @@
+import posixpath
+from collections import Counter
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from inventory.models import InventoryItem, MediaFile
+from inventory.services.thumbnails import VARIANT_FORMATS, VARIANT_SIZES, variant_name
+from inventory.storage import HASHED_PREFIX, PLAIN_PREFIXES
+
+# 参照数0になってから削除するまでの猶予（アップロード直後・複製直後の事故防止）
+DEFAULT_GRACE = timedelta(hours=24)
+
+
+def _image_storage():
+    return InventoryItem._meta.get_field("image").storage
+
+
+def acquire(names):
+    """
+    画像ファイルの参照数を増やす（在庫の作成・画像差し替え・一括作成時）
+    - names は同じ名前を複数含んでよい（まとめて1回の UPDATE にする）
+    """
+    counts = Counter(n for n in names if n)
+    for name, n in counts.items():
+        updated = MediaFile.objects.filter(name=name).update(
+            ref_count=F("ref_count") + n,
+            updated_at=timezone.now(),
+        )
+        if updated:
+            continue
+
+        # 旧方式で保存された画像など、行がまだ無いファイル
+        storage = _image_storage()
+        size = storage.size(name) if storage.exists(name) else 0
+        try:
+            with transaction.atomic():
+                MediaFile.objects.create(name=name, size=size, ref_count=n)
+        except IntegrityError:
+            MediaFile.objects.filter(name=name).update(ref_count=F("ref_count") + n)
+
+
+def release(names):
+    """
+    画像ファイルの参照数を減らす（在庫の物理削除・画像差し替え時）
+    - 実ファイルはここでは消さない（gc_media がまとめて消す）
+    """
+    counts = Counter(n for n in names if n)
+    for name, n in counts.items():
+        MediaFile.objects.filter(name=name).update(
+            ref_count=F("ref_count") - n,
+            updated_at=timezone.now(),
+        )
+
+
+def rebuild_ref_counts(chunk_size=1000):
+    """
+    参照数を在庫テーブルから数え直す（ずれた時の修復用）
+    戻り値：更新した MediaFile の件数
+    """
+    actual = dict(
+        InventoryItem.objects.exclude(image="").exclude(image__isnull=True)
+        .values("image")
+        .annotate(n=Count("id"))
+        .values_list("image", "n")
+    )
+
+    fixed = 0
+    # 既存行：実際の参照数に合わせる
+    qs = MediaFile.objects.order_by("id").values_list("id", "name", "ref_count")
+    last_id = 0
+    while True:
+        rows = list(qs.filter(id__gt=last_id)[:chunk_size])
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        for pk, name, ref_count in rows:
+            n = actual.pop(name, 0)
+            if n != ref_count:
+                MediaFile.objects.filter(pk=pk).update(ref_count=n, updated_at=timezone.now())
+                fixed += 1
+
+    # 行が無いファイル：作る
+    if actual:
+        acquire(Counter(actual).elements())
+        fixed += len(actual)
+
+    return fixed
+
+
+def _delete_file_and_variants(storage, name):
+    """
+    元画像と縮小画像を消し、消した合計バイト数を返す
+    """
+    reclaimed = 0
+    targets = [name] + [
+        variant_name(name, size_key, ext)
+        for size_key in VARIANT_SIZES
+        for ext, _fmt, _opts in VARIANT_FORMATS
+    ]
+    for target in targets:
+        if storage.exists(target):
+            reclaimed += storage.size(target)
+            storage.delete(target)
+    return reclaimed
+
+
+def collect_garbage(chunk_size=500, grace=DEFAULT_GRACE, dry_run=False):
+    """
+    参照されなくなった画像ファイルを少しずつ削除する（チャンク単位）
+
+    安全のための順序：
+    1) ref_count<=0 かつ猶予時間を過ぎた行を候補にする
+    2) 在庫テーブルを直接見て、本当に参照が無いか確認する（ずれていたら数を直して残す）
+    3) 行の条件付き削除 → ファイル削除 を1トランザクションで行う
+       （同じファイルの再アップロードは MediaFile.touch で先に行を書くので、
+        どちらかが必ず待たされる）
+
+    戻り値：{"files": 削除ファイル数, "bytes": 回収バイト数, "fixed": 参照数を直した数}
+    """
+    storage = _image_storage()
+    cutoff = timezone.now() - grace
+    result = {"files": 0, "bytes": 0, "fixed": 0}
+
+    last_id = 0
+    while True:
+        chunk = list(
+            MediaFile.objects.filter(id__gt=last_id, ref_count__lte=0, updated_at__lt=cutoff)
+            .order_by("id")
+            .values_list("id", "name")[:chunk_size]
+        )
+        if not chunk:
+            break
+        last_id = chunk[-1][0]
+
+        names = [name for _pk, name in chunk]
+        referenced = dict(
+            InventoryItem.objects.filter(image__in=names)
+            .values("image")
+            .annotate(n=Count("id"))
+            .values_list("image", "n")
+        )
+
+        for pk, name in chunk:
+            if name in referenced:
+                MediaFile.objects.filter(pk=pk).update(ref_count=referenced[name])
+                result["fixed"] += 1
+                continue
+
+            if dry_run:
+                result["files"] += 1
+                result["bytes"] += storage.size(name) if storage.exists(name) else 0
+                continue
+
+            with transaction.atomic():
+                deleted, _ = MediaFile.objects.filter(
+                    pk=pk, ref_count__lte=0, updated_at__lt=cutoff
+                ).delete()
+                if deleted:
+                    result["bytes"] += _delete_file_and_variants(storage, name)
+                    result["files"] += 1
+
+    return result
+
+
+def _walk(storage, path):
+    """
+    ストレージ配下のファイル名をディレクトリ単位で順に返す
+    """
+    dirs, files = storage.listdir(path)
+    for f in files:
+        yield posixpath.join(path, f)
+    for d in dirs:
+        sub = posixpath.join(path, d)
+        if (sub + "/").startswith(PLAIN_PREFIXES):
+            continue
+        yield from _walk(storage, sub)
+
+
+def collect_untracked(chunk_size=500, grace=DEFAULT_GRACE, dry_run=False):
+    """
+    MediaFile 行の無い古いファイル（旧方式の保存・保存途中で失敗したもの）を消す
+    - 在庫から参照されているものは残す
+    - 最終更新が猶予時間より新しいものは残す
+    """
+    storage = _image_storage()
+    cutoff = timezone.now() - grace
+    result = {"files": 0, "bytes": 0}
+    if not storage.exists(HASHED_PREFIX.rstrip("/")):
+        return result
+
+    def flush(batch):
+        tracked = set(MediaFile.objects.filter(name__in=batch).values_list("name", flat=True))
+        referenced = set(InventoryItem.objects.filter(image__in=batch).values_list("image", flat=True))
+        for name in batch:
+            if name in tracked or name in referenced:
+                continue
+            if storage.get_modified_time(name) >= cutoff:
+                continue
+            if dry_run:
+                result["bytes"] += storage.size(name)
+            else:
+                result["bytes"] += _delete_file_and_variants(storage, name)
+            result["files"] += 1
+
+    batch = []
+    for name in _walk(storage, HASHED_PREFIX.rstrip("/")):
+        batch.append(name)
+        if len(batch) >= chunk_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+
+    return result
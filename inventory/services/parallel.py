@@ -0,0 +1,33 @@
+import asyncio
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+
+
+def _closing(call):
+    @wraps(call)
+    def run():
+        try:
+            return call()
+        finally:
+            # リクエスト終了時と同じ扱い（CONN_MAX_AGE を過ぎた接続・壊れた接続だけ閉じる）
+            close_old_connections()
+
+    return run
+
+
+async def gather(*calls):
+    """
+    互いに依存しない読み取り（引数なしの同期関数）を同時に走らせ、結果を順番どおりに返す
+
+    - Django の async ORM（aget / async for など）は、内部で1本のスレッドにまとめて
+      実行されるので、asyncio.gather で並べても1つずつしか進まない
+    - ここでは thread_sensitive=False で別々のスレッド（別々のDB接続）に出して、
+      待ち時間を重ねる
+    - 別々の接続なので、結果どうしは同じ時点のスナップショットとは限らない
+      （読み取り専用の画面・API だけで使う）
+    """
+    return await asyncio.gather(
+        *(sync_to_async(_closing(call), thread_sensitive=False)() for call in calls)
+    )
@@ -0,0 +1,208 @@
+import csv
+import io
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db.models import F, Min, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from inventory.models import Category, InventoryItem
+from inventory.services.alerts import alert_setting
+from inventory.services.balance import calc_category_location_matrix
+from inventory.services.versions import household_cache_key
+
+SHOPPING_CACHE_TIMEOUT = 60 * 60 * 24
+
+UNIT_LABELS = dict(Category.GOAL_UNIT_CHOICES)
+
+# 保管場所が決まらない行のまとめ先
+NO_LOCATION = "未設定"
+
+
+def _dominant_location(row):
+    """
+    分類の在庫が一番多く置いてある保管場所ID（在庫が無ければ None）
+    """
+    best = max(row["cells"], key=lambda cell: cell["amount"], default=None)
+    if best is None or best["amount"] <= 0:
+        return None
+    return best["storage_location_id"]
+
+
+def build_shopping_list(household, today=None):
+    """
+    買い物リストを作る（世帯の大きさに関係なくクエリ数は一定）
+
+    1) 分類ごとの不足：目標量 − 現在量（分類 × 保管場所の集計を流用）
+       → 一番多く置いてある保管場所にまとめる
+    2) 商品ごと（同じ名前のロットをまとめる）：数量の合計が quantity_threshold 以下 /
+       一番近い期限が expiry_days 以内（GROUP BY 1クエリ）
+       - 期限で買い足す量は、期限が近いロットの数量の合計
+       - 分類・保管場所はロットの中で ID が一番小さいもの（ふつうは全ロット同じ）
+    3) 同じ商品が両方に当てはまっても1行にし、不足している分類と
+       同じ保管場所にある商品は、その分類の行の中に入れる（重複させない）
+
+    クエリ：アラート設定 1 ＋ 分類×保管場所 3 ＋ 在庫 1
+    戻り値：{"groups": [{"location_id", "name", "entries": [...]}, ...], "count": 行数}
+    """
+    today = today or timezone.localdate()
+    alert = alert_setting(household)
+
+    key = household_cache_key(
+        "shopping", household, today.isoformat(), alert["quantity_threshold"], alert["expiry_days"]
+    )
+    result = cache.get(key)
+    if result is not None:
+        return result
+
+    matrix = calc_category_location_matrix(household)
+    location_names = {loc["id"]: loc["name"] for loc in matrix["locations"]}
+    category_names = {row["id"]: row["name"] for row in matrix["rows"] if row["id"] is not None}
+
+    entries = {}  # (location_id, category_id) -> 分類の行 / ("item", 商品) -> 商品の行
+
+    for row in matrix["rows"]:
+        if row["id"] is None or row["goal_amount"] <= 0:
+            continue
+        shortage = row["goal_amount"] - row["total"]
+        if shortage <= 0:
+            continue
+        location_id = _dominant_location(row)
+        entries[(location_id, row["id"])] = {
+            "kind": "category",
+            "location_id": location_id,
+            "category_id": row["id"],
+            "category_name": row["name"],
+            "name": row["name"],
+            "amount": shortage,
+            "unit": UNIT_LABELS.get(row["goal_unit"], row["goal_unit"]),
+            "reasons": [f"目標まで不足（{row['achievement_percent']:.0f}%）"],
+            "items": [],
+        }
+
+    expiry_limit = today + timedelta(days=alert["expiry_days"])
+    alert_products = (
+        InventoryItem.objects.filter(household=household, is_deleted=False)
+        # 商品が付いていない在庫（古いデータ）は1件で1商品として扱う
+        .annotate(group=Coalesce("product_id", -F("id")))
+        .values("group")
+        .annotate(
+            product_name=Min("name"),
+            total=Coalesce(Sum("quantity"), 0),
+            first_expiry=Min("expiry_date"),
+            expiring=Coalesce(Sum("quantity", filter=Q(expiry_date__lte=expiry_limit)), 0),
+            category=Min("category_id"),
+            location=Min("storage_location_id"),
+        )
+        .filter(Q(total__lte=alert["quantity_threshold"]) | Q(first_expiry__lte=expiry_limit))
+        .order_by("product_name", "group")
+    )
+
+    for product in alert_products:
+        qty = product["total"]
+        reasons = []
+        amount = 0
+        if qty <= alert["quantity_threshold"]:
+            reasons.append(f"残り{qty}個")
+            amount = max(alert["quantity_threshold"] + 1 - qty, 1)
+        if product["first_expiry"] is not None and product["first_expiry"] <= expiry_limit:
+            reasons.append(f"期限 {product['first_expiry']:%m/%d}")
+            amount = max(amount, product["expiring"], 1)
+
+        location_id = product["location"]
+        if location_id not in location_names:
+            location_id = None
+        category_id = product["category"]
+
+        line = {
+            "id": product["group"],
+            "name": product["product_name"],
+            "quantity": qty,
+            "amount": amount,
+            "reasons": reasons,
+        }
+
+        parent = entries.get((location_id, category_id))
+        if parent is not None:
+            parent["items"].append(line)
+            continue
+
+        entries[("item", product["group"])] = {
+            "kind": "item",
+            "location_id": location_id,
+            "category_id": category_id,
+            "category_name": category_names.get(category_id, "未分類"),
+            "name": product["product_name"],
+            "amount": amount,
+            "unit": "個",
+            "reasons": reasons,
+            "items": [],
+        }
+
+    groups = {}
+    for entry in entries.values():
+        groups.setdefault(entry["location_id"], []).append(entry)
+
+    # 保管場所は名前順（未設定は最後）、中は分類名 → 品名の順
+    ordered = sorted(groups, key=lambda pk: (pk is None, location_names.get(pk, "")))
+    result = {
+        "groups": [
+            {
+                "location_id": pk,
+                "name": location_names.get(pk, NO_LOCATION) if pk is not None else NO_LOCATION,
+                "entries": sorted(groups[pk], key=lambda e: (e["category_name"], e["kind"], e["name"])),
+            }
+            for pk in ordered
+        ],
+        "count": len(entries),
+    }
+    cache.set(key, result, SHOPPING_CACHE_TIMEOUT)
+    return result
+
+
+def _fmt_amount(value):
+    return f"{value:.1f}".rstrip("0").rstrip(".")
+
+
+def _entry_note(entry):
+    notes = list(entry["reasons"])
+    for item in entry["items"]:
+        notes.append(f"{item['name']}：{'・'.join(item['reasons'])}")
+    return " / ".join(notes)
+
+
+def to_text(shopping):
+    """
+    メモやメッセージに貼り付けられるテキストにする
+    """
+    lines = []
+    for group in shopping["groups"]:
+        lines.append(f"■ {group['name']}")
+        for entry in group["entries"]:
+            lines.append(
+                f"・{entry['name']} {_fmt_amount(entry['amount'])}{entry['unit']}（{_entry_note(entry)}）"
+            )
+        lines.append("")
+    return "\n".join(lines).rstrip() + "\n" if lines else "買うものはありません\n"
+
+
+def to_csv(shopping):
+    """
+    表計算ソフト用の CSV（Excel で文字化けしないよう BOM 付き）
+    """
+    buf = io.StringIO()
+    buf.write("\ufeff")
+    writer = csv.writer(buf)
+    writer.writerow(["保管場所", "分類", "品名", "必要量", "単位", "理由"])
+    for group in shopping["groups"]:
+        for entry in group["entries"]:
+            writer.writerow([
+                group["name"],
+                entry["category_name"],
+                entry["name"],
+                _fmt_amount(entry["amount"]),
+                entry["unit"],
+                _entry_note(entry),
+            ])
+    return buf.getvalue()
@@ -0,0 +1,211 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from inventory.models import InventoryItem, StocktakeEntry, StocktakeSession
+from inventory.services import deletion, events, ledger
+from inventory.services.versions import bump_household_version
+
+# bulk_create / bulk_update の1回あたりの件数（SQLite の変数上限を超えない大きさ）
+BATCH_SIZE = 500
+
+
+class InvalidCount(ValueError):
+    """
+    数えた数の形式が正しくない（何も保存しない）
+    """
+
+
+def start(household, user=None):
+    """
+    棚卸しを始める（世帯に棚卸し中のものがあればそれを続ける）
+    - 論理削除されていない在庫の数量を1クエリで読み、bulk_create で写す
+    """
+    with transaction.atomic():
+        session = (
+            StocktakeSession.objects.select_for_update()
+            .filter(household=household, status=StocktakeSession.STATUS_OPEN)
+            .first()
+        )
+        if session is not None:
+            return session
+
+        session = StocktakeSession.objects.create(household=household, started_by=user)
+        rows = (
+            InventoryItem.objects.filter(household=household, is_deleted=False)
+            .values_list("id", "quantity")
+            .iterator(chunk_size=2000)
+        )
+        StocktakeEntry.objects.bulk_create(
+            (
+                StocktakeEntry(
+                    session=session,
+                    item_id=item_id,
+                    expected_quantity=quantity or 0,
+                )
+                for item_id, quantity in rows
+            ),
+            batch_size=BATCH_SIZE,
+        )
+    return session
+
+
+def save_counts(session, counts):
+    """
+    数えた数を途中保存する（入力のたびに少しずつ呼ばれる想定）
+    - counts：{在庫ID: 数 or None}（None は未入力に戻す）
+    - 同じ数の行はまとめて UPDATE 1回（行ごとに save しない）
+    戻り値：保存した行数
+    """
+    if not isinstance(counts, dict):
+        raise InvalidCount("counts は {在庫ID: 数} で指定してください。")
+
+    by_value = defaultdict(list)
+    for key, value in counts.items():
+        try:
+            item_id = int(key)
+        except (TypeError, ValueError):
+            raise InvalidCount("在庫ID は整数で指定してください。")
+        if value is not None and (isinstance(value, bool) or not isinstance(value, int) or value < 0):
+            raise InvalidCount("数は0以上の整数で指定してください。")
+        by_value[value].append(item_id)
+
+    now = timezone.now()
+    saved = 0
+    with transaction.atomic():
+        entries = StocktakeEntry.objects.filter(
+            session=session,
+            session__status=StocktakeSession.STATUS_OPEN,
+        )
+        for value, item_ids in by_value.items():
+            saved += entries.filter(item_id__in=item_ids).update(
+                counted_quantity=value,
+                counted_at=now if value is not None else None,
+            )
+    return saved
+
+
+def compute_diff(session):
+    """
+    数えた数と「今の在庫」の差分（1クエリ）
+    - 数量が違う行と、棚卸し中に編集・削除された行（衝突）だけを返す
+    - conflict：None / "edited"（数量が開始時と違う）/ "deleted"
+      updated_at は見ない（画像の縮小・分類の削除・目標量の再計算など、数量を変えない
+      バックグラウンドの更新でも進むため）
+    """
+    rows = (
+        StocktakeEntry.objects.filter(session=session, counted_quantity__isnull=False)
+        .values(
+            "item_id",
+            "item__name",
+            "item__quantity",
+            "item__is_deleted",
+            "item__content_amount",
+            "expected_quantity",
+            "counted_quantity",
+            # 削除済みの印が付いた分類・保管場所は未設定として扱う（在庫を外すのはワーカー）
+            category_id=deletion.live("item__category", "id"),
+            location=deletion.live("item__storage_location"),
+        )
+        .order_by(F("location").asc(nulls_first=True), "item__name", "item_id")
+    )
+
+    diff = []
+    for row in rows:
+        current = row["item__quantity"] or 0
+        if row["item__is_deleted"]:
+            conflict = "deleted"
+        elif current != row["expected_quantity"]:
+            conflict = "edited"
+        else:
+            conflict = None
+
+        if row["counted_quantity"] == current and conflict is None:
+            continue
+
+        diff.append({
+            "id": row["item_id"],
+            "name": row["item__name"],
+            "location": row["location"],
+            "category_id": row["category_id"],
+            "content_amount": row["item__content_amount"],
+            "expected": row["expected_quantity"],
+            "current": current,
+            "counted": row["counted_quantity"],
+            "delta": row["counted_quantity"] - current,
+            "conflict": conflict,
+        })
+    return diff
+
+
+def apply(session, overwrite_ids=()):
+    """
+    差分を在庫にまとめて反映する（1トランザクション・bulk_update 1回）
+
+    - 衝突のない行はそのまま反映
+    - 棚卸し中に編集された行は overwrite_ids に入っているものだけ反映（それ以外はスキップ）
+    - 削除された在庫は反映しない
+    - 増減履歴（reason="stocktake"）をまとめて書き、棚卸しを「反映済み」にする
+
+    戻り値：{"applied": 反映した行数, "skipped": スキップした行数}
+    """
+    overwrite_ids = {int(pk) for pk in overwrite_ids}
+    now = timezone.now()
+
+    with transaction.atomic():
+        session = StocktakeSession.objects.select_for_update().get(pk=session.pk)
+        if session.status != StocktakeSession.STATUS_OPEN:
+            return {"applied": 0, "skipped": 0}
+
+        # 反映が終わるまで他の更新を待たせる（PostgreSQL などでは行ロック）
+        list(
+            InventoryItem.objects.select_for_update()
+            .filter(stocktake_entries__session=session, stocktake_entries__counted_quantity__isnull=False)
+            .values_list("id", flat=True)
+        )
+
+        objs = []
+        rows = []
+        skipped = 0
+        for row in compute_diff(session):
+            if row["conflict"] == "deleted" or (
+                row["conflict"] == "edited" and row["id"] not in overwrite_ids
+            ):
+                skipped += 1
+                continue
+            if row["delta"] == 0:
+                continue
+            objs.append(InventoryItem(pk=row["id"], quantity=row["counted"]))
+            rows.append({
+                "id": row["id"],
+                "category_id": row["category_id"],
+                "content_amount": row["content_amount"],
+                "quantity": row["delta"],
+            })
+
+        if objs:
+            # 数量は bulk_update 1回、更新日時は全行同じ値なので UPDATE 1回
+            # （bulk_update に updated_at も入れると CASE 式の組み立てが倍になり遅い）
+            InventoryItem.objects.bulk_update(objs, ["quantity"], batch_size=BATCH_SIZE)
+            InventoryItem.objects.filter(pk__in=[obj.pk for obj in objs]).update(updated_at=now)
+            # rows の quantity には増減（数えた数 − 今の数）が入っている
+            ledger.record(ledger.entries_from_rows(session.household_id, rows, +1, "stocktake"))
+            bump_household_version(session.household_id)
+            events.publish_items(session.household_id, [obj.pk for obj in objs], ("quantity",))
+
+        session.status = StocktakeSession.STATUS_APPLIED
+        session.applied_at = now
+        session.save(update_fields=["status", "applied_at"])
+
+    return {"applied": len(objs), "skipped": skipped}
+
+
+def cancel(session):
+    """
+    棚卸しを中止する（在庫は変えない）
+    """
+    StocktakeSession.objects.filter(pk=session.pk, status=StocktakeSession.STATUS_OPEN).update(
+        status=StocktakeSession.STATUS_CANCELLED
+    )
@@ -0,0 +1,82 @@
+from django.db.models import Count
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from inventory.models import Category
+from inventory.services.versions import bump_household_version
+
+
+def member_counts(household_ids):
+    """
+    世帯ごとの人数 {household_id: 人数} を1クエリで返す
+    - メンバーがいない世帯も 1人として扱う（必要量が0にならないように）
+    """
+    counts = dict(
+        CustomUser.objects.filter(household_id__in=household_ids)
+        .values("household_id")
+        .annotate(n=Count("id"))
+        .values_list("household_id", "n")
+    )
+    return {household_id: max(counts.get(household_id, 0), 1) for household_id in household_ids}
+
+
+def required_amount(daily_rate_per_person, members, target_days):
+    """
+    目標量 = 目標備蓄日数 × 人数 × 1人1日あたりの目安量
+    例）水 3L/人日 × 2人 × 3日 = 18L
+    """
+    return float(daily_rate_per_person or 0) * members * target_days
+
+
+def apply_required_amount(category, members=None):
+    """
+    1分類分：1人1日あたりの目安量が入っていれば goal_amount を計算し直す（保存はしない）
+    - 目安量が 0 の分類は、これまで通り手入力の goal_amount を使う
+    """
+    if not category.daily_rate_per_person:
+        return category
+
+    household = category.household
+    if members is None:
+        members = member_counts([household.pk])[household.pk]
+    category.goal_amount = required_amount(
+        category.daily_rate_per_person, members, household.target_days
+    )
+    return category
+
+
+def recompute_goal_amounts(household_ids):
+    """
+    人数・目標備蓄日数が変わった世帯の goal_amount をまとめて計算し直す
+    - 人数 1クエリ ＋ 分類 1クエリ ＋ bulk_update だけ（分類ごとに save しない）
+    - 値が変わった分類だけ書き、書いた世帯はデータ版数を進める
+    戻り値：更新した分類の件数
+    """
+    household_ids = list(household_ids)
+    if not household_ids:
+        return 0
+
+    members = member_counts(household_ids)
+    categories = (
+        Category.objects.filter(household_id__in=household_ids, daily_rate_per_person__gt=0)
+        .select_related("household")
+        .only("id", "household_id", "household__target_days", "daily_rate_per_person", "goal_amount")
+    )
+
+    now = timezone.now()
+    changed = []
+    for c in categories:
+        goal = required_amount(c.daily_rate_per_person, members[c.household_id], c.household.target_days)
+        if goal != c.goal_amount:
+            c.goal_amount = goal
+            c.updated_at = now
+            changed.append(c)
+
+    if changed:
+        # bulk_update は auto_now を入れないので、差分同期用に updated_at も書く
+        Category.objects.bulk_update(changed, ["goal_amount", "updated_at"], batch_size=500)
+        for household_id in {c.household_id for c in changed}:
+            bump_household_version(household_id)
+
+    return len(changed)
+
@@ -0,0 +1,412 @@
+import base64
+import json
+import random
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.forms.models import model_to_dict, modelform_factory
+from django.utils import timezone
+
+from inventory.forms import InventoryItemForm
+from inventory.models import Category, InventoryItem, Memo, StorageLocation, SyncTombstone
+from inventory.services import deletion, idempotency, ledger
+from inventory.services.supply import apply_required_amount
+
+# 1ページの既定件数と上限（全種類の合計）
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 1000
+
+# 1リクエストで受け付ける変更の上限
+MAX_MUTATIONS = 100
+
+# 削除の記録を書くたびに、この確率で期限切れの記録をまとめて消す
+PRUNE_PROBABILITY = 0.01
+
+# カーソル上の削除の記録の列の名前
+DELETED = "deleted"
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+# 種類ごとの同期する列（レスポンスはこの順の配列で返す）と、クライアントが書ける項目
+SPECS = {
+    SyncTombstone.KIND_ITEM: {
+        "model": InventoryItem,
+        "fields": (
+            "id", "name", "quantity", "content_amount", "expiry_date",
+            "category_id", "storage_location_id", "is_deleted", "updated_at",
+        ),
+        "form_fields": ["category", "storage_location", "name", "quantity", "content_amount", "expiry_date"],
+    },
+    SyncTombstone.KIND_CATEGORY: {
+        "model": Category,
+        "fields": (
+            "id", "name", "description", "color", "goal_amount", "goal_unit",
+            "daily_rate_per_person", "updated_at",
+        ),
+        "form_fields": ["name", "description", "color", "goal_amount", "goal_unit", "daily_rate_per_person"],
+    },
+    SyncTombstone.KIND_LOCATION: {
+        "model": StorageLocation,
+        "fields": ("id", "name", "description", "updated_at"),
+        "form_fields": ["name", "description"],
+    },
+    SyncTombstone.KIND_MEMO: {
+        "model": Memo,
+        "fields": ("id", "title", "body", "user_id", "updated_at"),
+        "form_fields": ["title", "body"],
+    },
+}
+
+
+class InvalidCursor(ValueError):
+    """
+    カーソルの形式が正しくない
+    """
+
+
+class CursorExpired(Exception):
+    """
+    カーソルが古すぎる（削除の記録が残っていない）：クライアントは全件取り直す
+    """
+
+
+class InvalidMutation(ValueError):
+    """
+    変更の形式が正しくない（何も更新しない）
+    """
+
+
+def to_micros(value):
+    """
+    日時 → エポックからのマイクロ秒（JSON でそのまま比較できる整数）
+    """
+    return (value - _EPOCH) // timedelta(microseconds=1)
+
+
+def from_micros(value):
+    return _EPOCH + timedelta(microseconds=value)
+
+
+def tombstone_days():
+    return getattr(settings, "INVENTORY_SYNC_TOMBSTONE_DAYS", 30)
+
+
+def _json_value(value):
+    if isinstance(value, datetime):
+        return to_micros(value)
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+# ----------------------------
+# カーソル
+# ----------------------------
+def encode_cursor(issued, positions):
+    """
+    {"t": 発行時刻, "p": {種類: [updated_at, id]}} を URL に載せられる文字列にする
+    """
+    raw = json.dumps({"t": issued, "p": positions}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """
+    戻り値：(発行時刻, {種類: (updated_at, id)})
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        issued = data["t"]
+        positions = {
+            kind: (int(pos[0]), int(pos[1]))
+            for kind, pos in data["p"].items()
+            if kind in SPECS or kind == DELETED
+        }
+    except (ValueError, TypeError, KeyError, IndexError, AttributeError):
+        raise InvalidCursor("cursor の形式が正しくありません。")
+    if not isinstance(issued, int):
+        raise InvalidCursor("cursor の形式が正しくありません。")
+    return issued, positions
+
+
+def _after(field, position):
+    """
+    (時刻, id) の組で position より後ろ（同じ時刻の行が多くてもページをまたげる）
+    """
+    moment = from_micros(position[0])
+    return Q(**{f"{field}__gt": moment}) | Q(**{field: moment, "id__gt": position[1]})
+
+
+# ----------------------------
+# 差分の取得
+# ----------------------------
+def changes(household, cursor="", limit=DEFAULT_LIMIT):
+    """
+    cursor 以降に変わった在庫・分類・保管場所・メモと、削除の記録を1ページ返す
+
+    - 種類ごとに (updated_at, id) の順で limit+1 件ずつ読み、時刻順に混ぜて先頭 limit 件を返す
+      （クエリは 種類4つ＋削除の記録 の5回。OFFSET を使わないので後ろのページも速い）
+    - 直近 INVENTORY_SYNC_SAFETY_SECONDS 秒の変更は次回に回す
+      （長いトランザクションが古い updated_at でコミットしても取りこぼさない）
+    - 行は fields の順の配列。日時はエポックからのマイクロ秒、日付は ISO 形式
+    - 在庫の論理削除は is_deleted=true の更新として届く。物理削除は deleted に [種類, id]
+    - 初回（cursor なし）は全件を返し、削除の記録はその時点以降だけ返す
+    - has_more が true の間は、返した cursor で続きを取る
+    """
+    limit = max(1, min(int(limit), MAX_LIMIT))
+    until = timezone.now() - timedelta(seconds=getattr(settings, "INVENTORY_SYNC_SAFETY_SECONDS", 2))
+    until_micros = to_micros(until)
+
+    if cursor:
+        issued, positions = decode_cursor(cursor)
+        if issued < to_micros(timezone.now() - timedelta(days=tombstone_days())):
+            raise CursorExpired("前回の同期から時間が経ちすぎています。全件を取り直してください。")
+    else:
+        positions = {DELETED: (until_micros, 0)}
+
+    fetched = []
+    for kind, spec in SPECS.items():
+        qs = spec["model"].objects.filter(household=household, updated_at__lte=until)
+        if kind in positions:
+            qs = qs.filter(_after("updated_at", positions[kind]))
+        for row in qs.order_by("updated_at", "id").values_list(*spec["fields"])[: limit + 1]:
+            fetched.append((to_micros(row[-1]), kind, row[0], row))
+
+    qs = SyncTombstone.objects.filter(household=household, deleted_at__lte=until)
+    if DELETED in positions:
+        qs = qs.filter(_after("deleted_at", positions[DELETED]))
+    for pk, kind, object_id, deleted_at in (
+        qs.order_by("deleted_at", "id").values_list("id", "kind", "object_id", "deleted_at")[: limit + 1]
+    ):
+        fetched.append((to_micros(deleted_at), DELETED, pk, (kind, object_id)))
+
+    fetched.sort(key=lambda f: (f[0], f[1], f[2]))
+    page = fetched[:limit]
+
+    rows = {}
+    deleted = []
+    for moment, kind, pk, row in page:
+        positions[kind] = (moment, pk)
+        if kind == DELETED:
+            deleted.append(list(row))
+        else:
+            rows.setdefault(kind, []).append([_json_value(v) for v in row])
+
+    return {
+        "cursor": encode_cursor(until_micros, {kind: list(pos) for kind, pos in positions.items()}),
+        "has_more": len(fetched) > limit,
+        "fields": {kind: spec["fields"] for kind, spec in SPECS.items()},
+        "changes": rows,
+        "deleted": deleted,
+    }
+
+
+# ----------------------------
+# 削除の記録
+# ----------------------------
+def record_tombstone(household_id, kind, object_id):
+    SyncTombstone.objects.create(household_id=household_id, kind=kind, object_id=object_id)
+    if random.random() < PRUNE_PROBABILITY:
+        prune_tombstones()
+
+
+def prune_tombstones():
+    """
+    期限切れの削除の記録をまとめて消す
+    戻り値：消した件数
+    """
+    cutoff = timezone.now() - timedelta(days=tombstone_days())
+    deleted, _ = SyncTombstone.objects.filter(deleted_at__lt=cutoff).delete()
+    return deleted
+
+
+# ----------------------------
+# オフライン中の変更の反映
+# ----------------------------
+def _form_class(kind, household):
+    spec = SPECS[kind]
+    if kind == SyncTombstone.KIND_ITEM:
+        form_class = modelform_factory(InventoryItem, form=InventoryItemForm, fields=spec["form_fields"])
+    else:
+        form_class = modelform_factory(spec["model"], fields=spec["form_fields"])
+
+    def build(data, instance):
+        form = form_class(data=data, instance=instance)
+        # 他世帯の分類・保管場所は選べない
+        if "category" in form.fields:
+            form.fields["category"].queryset = Category.objects.filter(household=household)
+        if "storage_location" in form.fields:
+            form.fields["storage_location"].queryset = StorageLocation.objects.filter(household=household)
+        return form
+
+    return build
+
+
+def _row(kind, obj):
+    return [_json_value(getattr(obj, field)) for field in SPECS[kind]["fields"]]
+
+
+def _result(status, kind, obj=None, **extra):
+    result = {"status": status, "type": kind}
+    if obj is not None:
+        result["id"] = obj.pk
+        result["row"] = _row(kind, obj)
+    result.update(extra)
+    return result
+
+
+def _validate(mutations):
+    if not isinstance(mutations, list) or not mutations:
+        raise InvalidMutation("mutations は1件以上のリストで指定してください。")
+    if len(mutations) > MAX_MUTATIONS:
+        raise InvalidMutation(f"一度に送れる変更は{MAX_MUTATIONS}件までです。")
+
+    for m in mutations:
+        kind = m.get("type") if isinstance(m, dict) else None
+        if not isinstance(kind, str) or kind not in SPECS or m.get("op") not in ("upsert", "delete"):
+            raise InvalidMutation("各変更は type（item/category/location/memo）と op（upsert/delete）を指定してください。")
+        if not isinstance(m.get("fields", {}), dict):
+            raise InvalidMutation("fields はオブジェクトで指定してください。")
+        if "id" in m:
+            if isinstance(m["id"], bool) or not isinstance(m["id"], int) or not isinstance(m.get("base"), int):
+                raise InvalidMutation("既存の行の変更は id と base（取得した updated_at）を整数で指定してください。")
+        elif m["op"] == "delete" or not idempotency.valid_key(m.get("ref")):
+            raise InvalidMutation("新規作成は ref（16〜64文字の英数字）を指定してください。")
+
+
+def apply_mutations(household, user, mutations):
+    """
+    オフライン中にためた変更をまとめて反映する
+
+    mutations：[{"type", "op": "upsert"|"delete", "id", "base", "fields"} | {"type", "op": "upsert", "ref", "fields"}, ...]
+      - 既存の行：base（クライアントが最後に見た updated_at）がサーバーと違えば conflict
+        （上書きせず、サーバーの今の行を返す。どちらを残すかはクライアントが決めて送り直す）
+      - 新規作成：ref を二重送信防止キーに使う（再送しても1件しかできない）
+      - fields は送った項目だけ変える（残りはサーバーの値のまま）
+    戻り値：送った順の結果 [{"status": ok|conflict|gone|invalid|retry, "type", "id", "row", "errors"}]
+
+    - 変更ごとに別のトランザクション（1件の失敗で他を巻き戻さない）
+    - 在庫の数量の増減は、その変更と同じトランザクションで増減履歴に書く
+      （途中で失敗しても、反映済みの変更の履歴は欠けない）
+    """
+    _validate(mutations)
+
+    results = []
+    for m in mutations:
+        if "id" in m:
+            results.append(_apply_existing(household, user, m))
+        else:
+            results.append(_apply_create(household, user, m))
+    return results
+
+
+def _prepare(kind, obj, household, user):
+    """
+    フォームを通した後、画面から保存するときと同じ値を補う
+    """
+    obj.household = household
+    if kind == SyncTombstone.KIND_CATEGORY:
+        apply_required_amount(obj)
+    elif kind == SyncTombstone.KIND_MEMO:
+        obj.user = user
+
+
+def _apply_create(household, user, m):
+    kind = m["type"]
+    model = SPECS[kind]["model"]
+
+    # 待たない：1回目がまだ処理中なら、この変更だけ retry で返す（最大 MAX_MUTATIONS 件ぶん待たせない）
+    record, created = idempotency.claim(household, m["ref"], wait=False)
+    if not created:
+        object_id = record.payload.get("id")
+        if not object_id:
+            # 1回目がまだ処理中：あとで送り直してもらう
+            return {"status": "retry", "type": kind, "ref": m["ref"]}
+        obj = model.objects.filter(household=household, pk=object_id).first()
+        if obj is None:
+            return {"status": "gone", "type": kind, "ref": m["ref"], "id": object_id}
+        return _result("ok", kind, obj, ref=m["ref"])
+
+    form = _form_class(kind, household)(m.get("fields", {}), model(household=household))
+    if not form.is_valid():
+        idempotency.release(record)
+        return {"status": "invalid", "type": kind, "ref": m["ref"], "errors": form.errors.get_json_data()}
+
+    try:
+        with transaction.atomic():
+            obj = form.save(commit=False)
+            _prepare(kind, obj, household, user)
+            obj.save()
+            if kind == SyncTombstone.KIND_ITEM:
+                ledger.record([ledger.entry_for(obj, obj.quantity, "create")])
+    except IntegrityError:
+        idempotency.release(record)
+        return {"status": "invalid", "type": kind, "ref": m["ref"], "errors": {"__all__": [{"message": "同じ名前がすでにあります。"}]}}
+    except Exception:
+        idempotency.release(record)
+        raise
+
+    idempotency.complete(record, payload={"id": obj.pk})
+    return _result("ok", kind, obj, ref=m["ref"])
+
+
+def _apply_existing(household, user, m):
+    kind = m["type"]
+    spec = SPECS[kind]
+
+    try:
+        with transaction.atomic():
+            obj = spec["model"].objects.select_for_update().filter(household=household, pk=m["id"]).first()
+            if obj is None:
+                # もう無い：削除なら目的は達成、更新ならクライアントは行を消す
+                if m["op"] == "delete":
+                    return {"status": "ok", "type": kind, "id": m["id"]}
+                return {"status": "gone", "type": kind, "id": m["id"]}
+
+            if to_micros(obj.updated_at) != m["base"]:
+                return _result("conflict", kind, obj)
+
+            if m["op"] == "delete":
+                return _delete(kind, obj)
+
+            before = obj.quantity if kind == SyncTombstone.KIND_ITEM else 0
+            data = model_to_dict(obj, fields=spec["form_fields"])
+            data.update(m.get("fields", {}))
+            form = _form_class(kind, household)(data, obj)
+            if not form.is_valid():
+                return {"status": "invalid", "type": kind, "id": obj.pk, "errors": form.errors.get_json_data()}
+
+            obj = form.save(commit=False)
+            _prepare(kind, obj, household, user)
+            obj.save()
+            if kind == SyncTombstone.KIND_ITEM:
+                ledger.record([ledger.entry_for(obj, obj.quantity - before, "edit")])
+    except IntegrityError:
+        return {"status": "invalid", "type": kind, "id": m["id"], "errors": {"__all__": [{"message": "同じ名前がすでにあります。"}]}}
+
+    return _result("ok", kind, obj)
+
+
+def _delete(kind, obj):
+    """
+    画面から削除したときと同じ：在庫は論理削除（履歴へ）、メモは物理削除（削除の記録が残る）、
+    分類・保管場所は削除済みの印を付けて、在庫を外すのはワーカー（物理削除のときに記録が残る）
+    - _apply_existing のトランザクションの中で呼ぶ（増減履歴も同じトランザクションで書く）
+    """
+    if kind in (SyncTombstone.KIND_CATEGORY, SyncTombstone.KIND_LOCATION):
+        deletion.schedule_delete(type(obj).objects.filter(pk=obj.pk))
+        return {"status": "ok", "type": kind, "id": obj.pk}
+
+    if kind != SyncTombstone.KIND_ITEM:
+        pk = obj.pk
+        obj.delete()
+        return {"status": "ok", "type": kind, "id": pk}
+
+    if not obj.is_deleted:
+        obj.is_deleted = True
+        obj.save(update_fields=["is_deleted", "updated_at"])
+        ledger.record([ledger.entry_for(obj, -obj.quantity, "delete")])
+    return _result("ok", kind, obj)
@@ -0,0 +1,145 @@
+import posixpath
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from inventory.models import InventoryItem
+
+# 変種（バリアント）の種類と長辺ピクセル数
+# - thumb : 在庫一覧の 56px サムネイル（高密度画面向けに 2倍）
+# - detail: 商品情報の 120px 画像（同上）
+VARIANT_SIZES = {
+    "thumb": 112,
+    "detail": 240,
+}
+
+# 出力形式（拡張子, Pillowの形式名, 保存オプション）
+VARIANT_FORMATS = (
+    ("webp", "WEBP", {"quality": 80, "method": 4}),
+    ("jpg", "JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+)
+
+SOURCE_PREFIX = "inventory_images/"
+VARIANT_PREFIX = "inventory_images/variants/"
+
+
+def variant_name(source_name, size_key, ext):
+    """
+    元画像のファイル名から変種のファイル名を決める（同じ元画像なら常に同じ名前）
+    例）inventory_images/water.jpg → inventory_images/variants/water_thumb.webp
+    """
+    stem = posixpath.splitext(source_name)[0]
+    if stem.startswith(SOURCE_PREFIX):
+        stem = stem[len(SOURCE_PREFIX):]
+    return f"{VARIANT_PREFIX}{stem}_{size_key}.{ext}"
+
+
+def source_stem_for_variant(name):
+    """
+    variant_name() の逆：縮小画像のファイル名から元画像の「拡張子なしの名前」を返す
+    縮小画像でなければ None
+    例）inventory_images/variants/water_thumb.webp → inventory_images/water
+    """
+    if not name.startswith(VARIANT_PREFIX):
+        return None
+    stem = posixpath.splitext(name[len(VARIANT_PREFIX):])[0]
+    for size_key in VARIANT_SIZES:
+        suffix = f"_{size_key}"
+        if stem.endswith(suffix):
+            return SOURCE_PREFIX + stem[: -len(suffix)]
+    return None
+
+
+def _open_normalized(storage, source_name):
+    """
+    元画像を開き、EXIFの向きを反映したRGB画像にする
+    - 透過PNGは白背景に合成（JPEGに透過は無いため）
+    - 返す画像は新しく作ったものなので EXIF は引き継がれない
+    """
+    with storage.open(source_name, "rb") as fp:
+        img = Image.open(fp)
+        img = ImageOps.exif_transpose(img)
+
+        if img.mode in ("RGBA", "LA", "P"):
+            img = img.convert("RGBA")
+            background = Image.new("RGB", img.size, (255, 255, 255))
+            background.paste(img, mask=img.split()[-1])
+            return background
+
+        return img.convert("RGB")
+
+
+def build_variants(source_name, storage, force=False):
+    """
+    1枚の元画像から全サイズ・全形式の変種を作って保存する
+    - 既にファイルがあれば作り直さない（force=True なら上書き）
+    - 戻り値は InventoryItem.image_variants に入れる dict
+    """
+    variants = {"source": source_name}
+    img = None
+
+    for size_key, px in VARIANT_SIZES.items():
+        entry = {}
+        for ext, fmt, options in VARIANT_FORMATS:
+            name = variant_name(source_name, size_key, ext)
+
+            if storage.exists(name):
+                if not force:
+                    entry[ext] = name
+                    continue
+                storage.delete(name)
+
+            if img is None:
+                img = _open_normalized(storage, source_name)
+
+            resized = img.copy()
+            resized.thumbnail((px, px), Image.Resampling.LANCZOS)
+
+            buf = BytesIO()
+            # exif を渡さないので、位置情報などのメタデータは書き出されない
+            resized.save(buf, fmt, **options)
+            entry[ext] = storage.save(name, ContentFile(buf.getvalue()))
+
+        variants[size_key] = entry
+
+    return variants
+
+
+def generate_variants_for_source(source_name, force=False):
+    """
+    元画像ファイル名単位で変種を作り、同じ画像を使う全在庫へ一括で反映する
+    - 複製で同じ画像を共有している在庫もまとめて1回のUPDATEで済む
+    - updated_at は進めない（縮小画像は元画像から作る派生データで、在庫の内容は変わらない。
+      同期やライブ更新に「変更」として流さない）。一覧の断片キャッシュは
+      キーに image_variants を入れているので、縮小画像ができた行は別キーになる
+    """
+    storage = InventoryItem._meta.get_field("image").storage
+    if not source_name or not storage.exists(source_name):
+        return 0
+
+    variants = build_variants(source_name, storage, force=force)
+
+    return InventoryItem.objects.filter(image=source_name).update(image_variants=variants)
+
+
+def generate_item_variants(item_id, force=False):
+    """
+    ワーカー用の入口：在庫IDから元画像を引いて変種を作る
+    """
+    source_name = (
+        InventoryItem.objects.filter(pk=item_id)
+        .values_list("image", flat=True)
+        .first()
+    )
+    return generate_variants_for_source(source_name, force=force)
+
+
+def needs_variants(item):
+    """
+    変種の作成（作り直し）が必要か
+    - 画像が差し替えられたら source が一致しなくなる
+    """
+    if not item.image:
+        return False
+    return (item.image_variants or {}).get("source") != item.image.name
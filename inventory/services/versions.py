@@ -0,0 +1,59 @@
+from django.db import transaction
+from django.db.models import F
+
+from accounts.models import Household
+
+
+def _increment(household_id):
+    Household.objects.filter(pk=household_id).update(data_version=F("data_version") + 1)
+
+
+class _PendingBump:
+    """コミット後に1回だけ版数を進める（実行済みかを覚えておき、まとめる相手を探すのに使う）"""
+
+    def __init__(self, household_id):
+        self.household_id = household_id
+        self.done = False
+
+    def __call__(self):
+        self.done = True
+        _increment(self.household_id)
+
+
+def bump_household_version(household_id):
+    """
+    世帯のデータ版数（Household.data_version）を +1 する
+    - F() で加算するので、同時に更新されても取りこぼさない
+    - queryset.update() など、シグナルが飛ばない一括更新の後は明示的に呼ぶ
+    - トランザクションの中では、世帯ごとにコミット後の1回にまとめる
+      （1つの操作で在庫を何件保存しても、Household の UPDATE は1回。ロールバックしたら進めない）
+    """
+    if not household_id:
+        return
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        _increment(household_id)
+        return
+
+    # 同じ atomic ブロックで登録済み（まだ実行していない）なら足さない
+    # （セーブポイントごと取り消されたものは run_on_commit から消えている）
+    savepoint_ids = set(connection.savepoint_ids)
+    for sids, bump, *_ in connection.run_on_commit:
+        if (
+            isinstance(bump, _PendingBump) and bump.household_id == household_id
+            and not bump.done and sids == savepoint_ids
+        ):
+            return
+    transaction.on_commit(_PendingBump(household_id))
+
+
+def household_cache_key(prefix, household, *parts):
+    """
+    世帯の版数入りキャッシュキーを作る
+    - 版数が変わると自動で別キーになる（古いキャッシュは期限切れで消える）
+    例）household_cache_key("balance_svg", household, "all")
+        → "balance_svg:12:v34:all"
+    """
+    tail = ":".join(str(p) for p in parts)
+    key = f"{prefix}:{household.pk}:v{household.data_version}"
+    return f"{key}:{tail}" if tail else key
@@ -0,0 +1,49 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = Lock()
+
+
+def get_executor():
+    """
+    バックグラウンド処理用のスレッドプールを返す（プロセス内で1つだけ作る）
+    - スレッド数は settings.INVENTORY_WORKER_THREADS（既定 2）
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "INVENTORY_WORKER_THREADS", 2),
+                thread_name_prefix="stocknavi-worker",
+            )
+        return _executor
+
+
+def _run(fn, args, kwargs):
+    """
+    ワーカースレッド側の実行ラッパー
+    - 例外はログに出すだけ（リクエスト側には影響させない）
+    - スレッドごとのDB接続を閉じる（接続の取りっぱなし防止）
+    """
+    try:
+        fn(*args, **kwargs)
+    except Exception:
+        logger.exception("background task failed: %s", getattr(fn, "__name__", fn))
+    finally:
+        close_old_connections()
+
+
+def submit_after_commit(fn, *args, **kwargs):
+    """
+    トランザクション確定後にワーカーへ処理を渡す
+    - ロールバックされた保存に対しては何もしない
+    - トランザクション外で呼ばれた場合はすぐに投入される
+    """
+    transaction.on_commit(lambda: get_executor().submit(_run, fn, args, kwargs))
@@ -0,0 +1,71 @@
+import random
+import threading
+import time
+from contextlib import nullcontext
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+
+# "database is locked" のときのやり直し回数と、1回目の待ち時間（秒。回ごとに倍にする）
+RETRIES = 5
+BACKOFF_SECONDS = 0.05
+
+# 接続先（alias）ごとの書き込みロック（同じプロセス内のスレッドどうしで順番にする）
+_locks = {}
+_locks_lock = threading.Lock()
+
+
+def is_locked(exc):
+    """
+    SQLite のロック待ちで失敗した例外か
+    """
+    message = str(exc).lower()
+    return "database is locked" in message or "database table is locked" in message
+
+
+def _write_lock(connection):
+    if connection.vendor != "sqlite" or not getattr(settings, "INVENTORY_SQLITE_SERIALIZE_WRITES", False):
+        return nullcontext()
+    with _locks_lock:
+        return _locks.setdefault(connection.alias, threading.Lock())
+
+
+def run(fn, *args, using=DEFAULT_DB_ALIAS, **kwargs):
+    """
+    fn(*args, **kwargs) を1つの書き込みトランザクションとして実行する
+
+    - SQLite では同じプロセスの書き込みを1本ずつ流す（INVENTORY_SQLITE_SERIALIZE_WRITES）
+      ロックを取り合って busy_timeout の待ち（少しずつ眠って取り直す）に入るより速い
+    - それでもロック待ちで失敗したら（別プロセスが長く書いていた等）、全体を巻き戻して
+      少し待ってからやり直す（最大 RETRIES 回）
+    - すでにトランザクションの中なら、そのまま呼ぶだけ（途中からのやり直しはできないので外側に任せる）
+    - コミット後の処理（on_commit）は、巻き戻した回の分は捨てられる
+    """
+    connection = connections[using]
+    if connection.in_atomic_block:
+        return fn(*args, **kwargs)
+
+    attempt = 0
+    while True:
+        try:
+            with _write_lock(connection), transaction.atomic(using=using):
+                return fn(*args, **kwargs)
+        except OperationalError as exc:
+            attempt += 1
+            if not is_locked(exc) or attempt > RETRIES:
+                raise
+        # 同時にやり直して、また取り合わないようにばらつかせる
+        time.sleep(BACKOFF_SECONDS * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
+
+
+def retry_on_locked(fn):
+    """
+    run() を通して呼ぶデコレーター（サービスの書き込み関数に付ける）
+    """
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        return run(fn, *args, **kwargs)
+
+    return wrapper
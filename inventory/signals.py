@@ -0,0 +1,235 @@
+# inventory/signals.py
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from accounts.models import CustomUser, Household
+
+from .models import Category, InventoryItem, Memo, StorageLocation, SyncTombstone
+from .services import events, media
+from .services.lots import product_for
+from .services.sync import record_tombstone as record_sync_tombstone
+from .services.supply import recompute_goal_amounts
+from .services.versions import bump_household_version
+from .services.thumbnails import generate_item_variants, needs_variants
+from .services.workers import submit_after_commit
+
+# 読み込み時点の画像名を覚えておく属性名（DBには保存しない）
+_LOADED_IMAGE = "_loaded_image_name"
+_LOADED_NAME = "_loaded_item_name"
+_LOADED_TRACKED = "_loaded_tracked_fields"
+
+
+def _image_name(instance):
+    """
+    image の生の値（ファイル名）を返す
+    - only()/defer() で読み込んでいない場合は None
+    """
+    if "image" not in instance.__dict__:
+        return None
+    value = instance.__dict__["image"]
+    return getattr(value, "name", value) or ""
+
+
+@receiver(post_init, sender=InventoryItem)
+def remember_loaded_image(sender, instance, **kwargs):
+    setattr(instance, _LOADED_IMAGE, _image_name(instance))
+
+
+@receiver(post_save, sender=InventoryItem)
+def track_image_references(sender, instance, created, **kwargs):
+    """
+    画像ファイルの参照数を増減する
+    - 作成（複製の pk=None 保存も含む）：新しい画像 +1
+    - 画像の差し替え：新しい画像 +1 / 古い画像 -1
+    """
+    current = _image_name(instance)
+    if current is None:
+        return
+
+    previous = "" if created else getattr(instance, _LOADED_IMAGE, None)
+    if previous is None or previous == current:
+        setattr(instance, _LOADED_IMAGE, current)
+        return
+
+    media.acquire([current])
+    media.release([previous])
+    setattr(instance, _LOADED_IMAGE, current)
+
+
+@receiver(post_delete, sender=InventoryItem)
+def release_image_reference(sender, instance, **kwargs):
+    """
+    物理削除（履歴の完全削除など）で参照数を減らす
+    - ファイル自体は gc_media が猶予時間の後に消す
+    """
+    media.release([getattr(instance, _LOADED_IMAGE, None) or _image_name(instance)])
+
+
+@receiver(post_init, sender=InventoryItem)
+def remember_loaded_name(sender, instance, **kwargs):
+    setattr(instance, _LOADED_NAME, instance.__dict__.get("name"))
+
+
+@receiver(pre_save, sender=InventoryItem)
+def assign_product(sender, instance, **kwargs):
+    """
+    同じ世帯・同じ名前の在庫を同じ商品（ロット）にまとめる
+    - 新規・複製・名前変更のときだけ商品を引き直す
+    """
+    if "name" not in instance.__dict__:
+        return
+    if instance.product_id and instance.name == getattr(instance, _LOADED_NAME, None):
+        return
+    instance.product = product_for(instance.household_id, instance.name)
+    setattr(instance, _LOADED_NAME, instance.name)
+
+
+@receiver(post_save, sender=InventoryItem)
+def enqueue_image_variants(sender, instance, **kwargs):
+    """
+    画像が登録・差し替えされたら、縮小画像の作成をワーカーに任せる
+    - リクエスト内では重い画像処理をしない（保存はすぐ返す）
+    """
+    if needs_variants(instance):
+        submit_after_commit(generate_item_variants, instance.pk)
+
+
+def _tracked_values(instance):
+    return {f: instance.__dict__[f] for f in events.TRACKED_FIELDS if f in instance.__dict__}
+
+
+@receiver(post_init, sender=InventoryItem)
+def remember_tracked_fields(sender, instance, **kwargs):
+    setattr(instance, _LOADED_TRACKED, _tracked_values(instance))
+
+
+@receiver(post_save, sender=InventoryItem)
+def publish_item_change(sender, instance, created, update_fields=None, **kwargs):
+    """
+    一覧を開いているメンバーへ、変わった項目だけをライブ更新で送る（コミット後）
+    """
+    current = _tracked_values(instance)
+    if created:
+        changed = tuple(current)
+    else:
+        loaded = getattr(instance, _LOADED_TRACKED, {})
+        changed = tuple(
+            f for f, value in current.items()
+            if f in loaded and loaded[f] != value and (update_fields is None or f in update_fields)
+        )
+    events.publish_item_changes(instance.household_id, {instance.pk: changed})
+    setattr(instance, _LOADED_TRACKED, current)
+
+
+@receiver(post_delete, sender=InventoryItem)
+def publish_item_delete(sender, instance, **kwargs):
+    events.publish_item_deleted(instance.household_id, instance.pk)
+
+
+@receiver(post_save, sender=InventoryItem)
+@receiver(post_delete, sender=InventoryItem)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=StorageLocation)
+@receiver(post_delete, sender=StorageLocation)
+def bump_version_on_change(sender, instance, **kwargs):
+    """
+    在庫・分類・保管場所が変わったら世帯のデータ版数を進める（集計キャッシュの無効化）
+    - 1つの操作（トランザクション）で何件変えても、進めるのはコミット後に1回（bump_household_version）
+    """
+    bump_household_version(instance.household_id)
+
+
+_TOMBSTONE_KINDS = {
+    InventoryItem: SyncTombstone.KIND_ITEM,
+    Category: SyncTombstone.KIND_CATEGORY,
+    StorageLocation: SyncTombstone.KIND_LOCATION,
+    Memo: SyncTombstone.KIND_MEMO,
+}
+
+
+@receiver(post_delete, sender=InventoryItem)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=StorageLocation)
+@receiver(post_delete, sender=Memo)
+def record_tombstone(sender, instance, origin=None, **kwargs):
+    """
+    物理削除を差分同期のクライアントに伝えるため、削除の記録を残す
+    - 世帯ごと消えるとき（Household の削除からの連鎖）は記録しない（記録も一緒に消えるため）
+    """
+    if _deleting_household(origin):
+        return
+    record_sync_tombstone(instance.household_id, _TOMBSTONE_KINDS[sender], instance.pk)
+
+
+@receiver(pre_delete, sender=Category)
+@receiver(pre_delete, sender=StorageLocation)
+def touch_detached_items(sender, instance, origin=None, **kwargs):
+    """
+    分類・保管場所を消すと在庫は SET_NULL で外れる（UPDATE なので updated_at は変わらない）
+    - 外れる在庫の updated_at を先に進めて、差分同期で「未分類・未設定になった」が届くようにする
+    """
+    if _deleting_household(origin):
+        return
+    items = instance.items.all()
+    if events.get_backend().has_subscribers(instance.household_id):
+        events.publish_items(
+            instance.household_id,
+            list(items.values_list("id", flat=True)),
+            ("category_id", "storage_location_id"),
+        )
+    items.update(updated_at=timezone.now())
+
+
+def _deleting_household(origin):
+    return isinstance(origin, Household) or getattr(origin, "model", None) is Household
+
+
+# 読み込み時点の値を覚えておく属性名（目標量の再計算が必要か判定する）
+_LOADED_TARGET_DAYS = "_loaded_target_days"
+_LOADED_HOUSEHOLD = "_loaded_household_id"
+
+
+@receiver(post_init, sender=Household)
+def remember_target_days(sender, instance, **kwargs):
+    setattr(instance, _LOADED_TARGET_DAYS, instance.__dict__.get("target_days"))
+
+
+@receiver(post_save, sender=Household)
+def recompute_goals_on_target_days(sender, instance, created, **kwargs):
+    """
+    目標備蓄日数が変わったら、目安量から計算している分類の目標量を計算し直す
+    """
+    previous = getattr(instance, _LOADED_TARGET_DAYS, None)
+    if not created and previous is not None and previous != instance.target_days:
+        recompute_goal_amounts([instance.pk])
+    setattr(instance, _LOADED_TARGET_DAYS, instance.target_days)
+
+
+@receiver(post_init, sender=CustomUser)
+def remember_household(sender, instance, **kwargs):
+    setattr(instance, _LOADED_HOUSEHOLD, instance.__dict__.get("household_id"))
+
+
+@receiver(post_save, sender=CustomUser)
+def recompute_goals_on_member_change(sender, instance, created, **kwargs):
+    """
+    世帯の人数が変わったら（参加・移動・脱退）、関係する世帯の目標量を計算し直す
+    - 人数は集計画面などにも出るので、目標量が変わらなくてもデータ版数は進める
+    """
+    previous = None if created else getattr(instance, _LOADED_HOUSEHOLD, None)
+    current = instance.household_id
+    if previous != current:
+        household_ids = [pk for pk in (previous, current) if pk]
+        recompute_goal_amounts(household_ids)
+        for household_id in household_ids:
+            bump_household_version(household_id)
+    setattr(instance, _LOADED_HOUSEHOLD, current)
+
+
+@receiver(post_delete, sender=CustomUser)
+def recompute_goals_on_member_delete(sender, instance, **kwargs):
+    if instance.household_id:
+        recompute_goal_amounts([instance.household_id])
+        bump_household_version(instance.household_id)
@@ -0,0 +1,93 @@
+# inventory/storage.py
+import hashlib
+import posixpath
+import re
+
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+
+# ハッシュ名で保存する対象（元画像）のディレクトリ
+HASHED_PREFIX = "inventory_images/"
+
+# 縮小画像は元画像名から決まる名前なのでハッシュ化しない
+PLAIN_PREFIXES = ("inventory_images/variants/",)
+
+# ハッシュ名（sha256 の16進64桁）を含むファイル名
+_DIGEST_RE = re.compile(r"/([0-9a-f]{64})(?:_[a-z]+)?\.[a-z0-9]+$")
+
+
+def content_digest(name):
+    """
+    ハッシュ名のファイル（元画像・その縮小画像）なら sha256 を返す。それ以外は None
+    - 名前が中身で決まるので、ETag や長期キャッシュの判定に使える
+    """
+    match = _DIGEST_RE.search(name)
+    return match.group(1) if match else None
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    在庫画像を「中身のハッシュ値」の名前で保存するストレージ
+    例）inventory_images/3f/3f9a...c2.jpg
+
+    - 同じ画像を何度アップロードしても、ファイルは1つだけ（重複排除）
+    - ファイルごとの参照数は MediaFile で管理し、GC（gc_media）で消す
+    - ハッシュ名は中身が変わらないので、長期キャッシュにも使える
+    """
+
+    def is_hashed_name(self, name):
+        return name.startswith(HASHED_PREFIX) and not name.startswith(PLAIN_PREFIXES)
+
+    def hashed_name(self, digest, original_name):
+        ext = posixpath.splitext(original_name)[1].lower()
+        return f"{HASHED_PREFIX}{digest[:2]}/{digest}{ext}"
+
+    def _digest(self, content):
+        """
+        アップロード内容を分割読みしながら sha256 を計算する（大きな写真でもメモリを食わない）
+        """
+        sha = hashlib.sha256()
+        size = 0
+        if hasattr(content, "seek"):
+            content.seek(0)
+        for chunk in content.chunks():
+            sha.update(chunk)
+            size += len(chunk)
+        if hasattr(content, "seek"):
+            content.seek(0)
+        return sha.hexdigest(), size
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        name = name.replace("\\", "/")
+
+        if not self.is_hashed_name(name):
+            return super().save(name, content, max_length=max_length)
+
+        digest, size = self._digest(content)
+        name = self.hashed_name(digest, name)
+
+        # MediaFile 行を先に書く（＝書き込みロックを取る）ことで、
+        # 同じファイルを消そうとしている GC と順番に処理されるようにする
+        MediaFile = apps.get_model("inventory", "MediaFile")
+        with transaction.atomic():
+            MediaFile.touch(name, size)
+            if not self.exists(name):
+                super().save(name, content, max_length=max_length)
+
+        return name
+
+
+_inventory_image_storage = None
+
+
+def inventory_image_storage():
+    """
+    InventoryItem.image 用のストレージ（ImageField の storage に callable で渡す）
+    """
+    global _inventory_image_storage
+    if _inventory_image_storage is None:
+        _inventory_image_storage = ContentAddressedStorage()
+    return _inventory_image_storage
@@ -0,0 +1,20 @@
+# inventory/templatetags/inventory_forms.py
+import uuid
+
+from django import template
+from django.utils.html import format_html
+
+from inventory.services.idempotency import FIELD_NAME
+
+register = template.Library()
+
+
+@register.simple_tag
+def idempotency_field():
+    """
+    二重送信防止キーの hidden を出す（表示のたびに新しいキー）
+    使い方：
+      {% load inventory_forms %}
+      <form method="post">{% csrf_token %}{% idempotency_field %} ...
+    """
+    return format_html('<input type="hidden" name="{}" value="{}">', FIELD_NAME, uuid.uuid4().hex)
@@ -0,0 +1,56 @@
+# inventory/templatetags/inventory_images.py
+from django import template
+from django.utils.html import format_html
+
+from inventory.services.thumbnails import VARIANT_SIZES
+
+register = template.Library()
+
+
+def _srcset(storage, variants, ext):
+    """
+    "url 112w, url 240w" 形式の srcset を作る（小さい順）
+    """
+    parts = []
+    for size_key, px in sorted(VARIANT_SIZES.items(), key=lambda kv: kv[1]):
+        name = (variants.get(size_key) or {}).get(ext)
+        if not name:
+            return ""
+        parts.append(f"{storage.url(name)} {px}w")
+    return ", ".join(parts)
+
+
+@register.simple_tag
+def item_picture(item, size="thumb", css_class="", display_px=56):
+    """
+    在庫画像を <picture> で出す
+    - 縮小画像（WebP/JPEG）があれば srcset で出し分ける
+    - まだ作られていない（or 画像差し替え直後）は元画像にフォールバック
+    - どちらも loading="lazy" で画面外の画像は読み込まない
+
+    使い方）{% item_picture item "thumb" "item-thumb" 56 %}
+    """
+    image = item.image
+    variants = item.image_variants or {}
+    alt = item.name
+
+    if variants.get("source") == image.name and variants.get(size):
+        storage = image.storage
+        webp_srcset = _srcset(storage, variants, "webp")
+        jpg_srcset = _srcset(storage, variants, "jpg")
+        if webp_srcset and jpg_srcset:
+            return format_html(
+                '<picture>'
+                '<source type="image/webp" srcset="{}" sizes="{}px">'
+                '<img src="{}" srcset="{}" sizes="{}px" class="{}" alt="{}" '
+                'width="{}" height="{}" loading="lazy" decoding="async">'
+                '</picture>',
+                webp_srcset, display_px,
+                storage.url(variants[size]["jpg"]), jpg_srcset, display_px,
+                css_class, alt, display_px, display_px,
+            )
+
+    return format_html(
+        '<img src="{}" class="{}" alt="{}" width="{}" height="{}" loading="lazy" decoding="async">',
+        image.url, css_class, alt, display_px, display_px,
+    )
@@ -0,0 +1,8 @@
+"""
+在庫アプリのテスト（機能ごとにモジュールを分け、データもそれぞれのテストで作る）
+
+同じテストを SQLite と PostgreSQL の両方で流す（.github/workflows/tests.yml の matrix と同じ）：
+  python manage.py test inventory
+  POSTGRES_DB=stocknavi POSTGRES_USER=... POSTGRES_PASSWORD=... POSTGRES_HOST=localhost python manage.py test inventory
+（PostgreSQL ではテスト用DBに pg_trgm 拡張を作れる権限が必要）
+"""
@@ -0,0 +1,35 @@
+"""
+画像を使うテストの部品（テストクラスごとの一時的な MEDIA_ROOT と、その場で作る画像）
+"""
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from PIL import Image
+
+
+def image_file(name="photo.png", color="red", size=(400, 300), mode="RGB"):
+    """
+    PNG 画像のアップロード（色・大きさが違えば中身のハッシュ名も違う）
+    """
+    buf = BytesIO()
+    Image.new(mode, size, color).save(buf, "PNG")
+    return SimpleUploadedFile(name, buf.getvalue(), content_type="image/png")
+
+
+class TemporaryMediaMixin:
+    """
+    MEDIA_ROOT をテストクラスごとの一時ディレクトリに差し替える（終わったら消す）
+    - setUpTestData で画像を保存してもよいように、TestCase の setUpClass より先に差し替える
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        media_root = tempfile.mkdtemp()
+        override = override_settings(MEDIA_ROOT=media_root)
+        override.enable()
+        cls.addClassCleanup(shutil.rmtree, media_root, True)
+        cls.addClassCleanup(override.disable)
+        super().setUpClass()
@@ -0,0 +1,170 @@
+"""
+数量のまとめ増減（inventory.services.adjust）
+"""
+from datetime import date
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.models import Household
+from inventory.forms import InventoryBulkEditForm
+from inventory.models import Category, InventoryItem, QuantityLedger
+from inventory.services import adjust, events
+
+
+class AdjustTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.household = Household.objects.create(name="増減テスト家")
+        cls.user = get_user_model().objects.create_user("alice", password="p", household=cls.household)
+
+    def _item(self, name, quantity, **kwargs):
+        return InventoryItem.objects.create(household=self.household, name=name, quantity=quantity, **kwargs)
+
+    def test_normalize_merges_in_order(self):
+        merged = adjust.normalize([
+            {"id": 1, "delta": 1}, {"id": 1, "delta": 1}, {"id": 1, "delta": -1},
+            {"id": 2, "set": 5}, {"id": 2, "delta": 1},
+            {"id": 3, "set": 1}, {"id": 3, "delta": -3},
+        ])
+
+        self.assertEqual(merged, {1: ("delta", 1), 2: ("set", 6), 3: ("set", 0)})
+
+    def test_invalid_operations(self):
+        for ops in ([], [{"id": 1}], [{"id": 1, "delta": 1, "set": 1}], [{"id": 1, "set": -1}]):
+            with self.subTest(ops=ops), self.assertRaises(adjust.InvalidAdjustment):
+                adjust.normalize(ops)
+
+    def test_apply_floors_at_zero_and_records_actual_change(self):
+        a = self._item("水", 1)
+        b = self._item("米", 2)
+        gone = self._item("履歴", 1, is_deleted=True)
+
+        with self.captureOnCommitCallbacks():
+            result = adjust.apply_adjustments(self.household, [
+                {"id": a.pk, "delta": -5},
+                {"id": b.pk, "delta": 1}, {"id": b.pk, "delta": 1},
+                {"id": gone.pk, "delta": 1},
+            ])
+
+        self.assertEqual(result["items"], [{"id": a.pk, "quantity": 0}, {"id": b.pk, "quantity": 4}])
+        self.assertEqual(result["missing"], [gone.pk])
+        self.assertEqual(
+            sorted(QuantityLedger.objects.filter(reason="adjust").values_list("item_id", "delta")),
+            sorted([(a.pk, -1), (b.pk, 2)]),
+        )
+        self.assertEqual(InventoryItem.objects.get(pk=gone.pk).quantity, 1)
+
+    def test_view_rejects_malformed_payload(self):
+        item = self._item("水", 1)
+        self.client.force_login(self.user)
+
+        for body in ("{", b"\xff\xfe{", "[]", '{"ops": {}}', '{"ops": "1"}',
+                     {"ops": [{"id": item.pk, "delta": 1}, {"id": "x", "delta": 1}]}):
+            with self.subTest(body=body):
+                response = self.client.post(reverse("inventory:inventory_adjust"), body, content_type="application/json")
+
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("error", response.json())
+
+        self.assertEqual(InventoryItem.objects.get(pk=item.pk).quantity, 1)
+
+    def test_view_applies_operations(self):
+        item = self._item("水", 1)
+        self.client.force_login(self.user)
+
+        with self.captureOnCommitCallbacks():
+            response = self.client.post(
+                reverse("inventory:inventory_adjust"), {"ops": [{"id": item.pk, "delta": 2}]},
+                content_type="application/json",
+            )
+
+        self.assertEqual(response.json(), {"items": [{"id": item.pk, "quantity": 3}], "missing": []})
+
+
+class BulkEditFormTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.household = Household.objects.create(name="一括編集フォーム家")
+        cls.other = Household.objects.create(name="よその家")
+        cls.category = Category.objects.create(household=cls.household, name="水")
+        cls.other_category = Category.objects.create(household=cls.other, name="よその分類")
+
+    def _form(self, **data):
+        return InventoryBulkEditForm({"expiry_action": "keep", **data}, household=self.household)
+
+    def test_changes_contain_only_selected_fields(self):
+        form = self._form(category=str(self.category.pk), storage_location=InventoryBulkEditForm.CLEAR,
+                          expiry_action="set", expiry_date="2026-12-31", quantity_delta="-2")
+
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.changes(), {
+            "category_id": self.category.pk, "storage_location_id": None,
+            "expiry_date": date(2026, 12, 31), "quantity_delta": -2,
+        })
+
+    def test_other_households_category_is_rejected(self):
+        form = self._form(category=str(self.other_category.pk))
+
+        self.assertFalse(form.is_valid())
+        self.assertIn("category", form.errors)
+
+    def test_expiry_set_requires_date(self):
+        form = self._form(expiry_action="set")
+
+        self.assertFalse(form.is_valid())
+        self.assertIn("expiry_date", form.errors)
+
+    def test_no_change_is_rejected(self):
+        form = self._form(quantity_delta="0")
+
+        self.assertFalse(form.is_valid())
+        self.assertTrue(form.non_field_errors())
+
+
+class BulkEditTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.household = Household.objects.create(name="一括編集家")
+        cls.other = Household.objects.create(name="よその家")
+        cls.category = Category.objects.create(household=cls.household, name="水")
+
+    def setUp(self):
+        self.a = InventoryItem.objects.create(household=self.household, name="水", quantity=1)
+        self.b = InventoryItem.objects.create(household=self.household, name="米", quantity=5)
+        self.gone = InventoryItem.objects.create(household=self.household, name="履歴", quantity=1, is_deleted=True)
+        self.foreign = InventoryItem.objects.create(household=self.other, name="よその在庫", quantity=1)
+        self.ids = [str(i.pk) for i in (self.a, self.b, self.gone, self.foreign)] + ["999999"]
+
+    def test_single_update_and_only_touched_ids_are_published(self):
+        table = InventoryItem._meta.db_table
+        with mock.patch.object(events, "publish_items") as publish, self.captureOnCommitCallbacks(), \
+                CaptureQueriesContext(connection) as queries:
+            updated = adjust.apply_bulk_edit(self.household, self.ids, {"category_id": self.category.pk})
+
+        self.assertEqual(updated, 2)
+        updates = [q["sql"] for q in queries if q["sql"].startswith("UPDATE") and table in q["sql"]]
+        self.assertEqual(len(updates), 1)
+        publish.assert_called_once()
+        household_id, ids, fields = publish.call_args.args
+        self.assertEqual(household_id, self.household.pk)
+        self.assertEqual(sorted(ids), sorted([self.a.pk, self.b.pk]))
+        self.assertEqual(fields, ("category_id",))
+        self.assertIsNone(InventoryItem.objects.get(pk=self.foreign.pk).category_id)
+        self.assertIsNone(InventoryItem.objects.get(pk=self.gone.pk).category_id)
+
+    def test_quantity_delta_floors_at_zero_and_records_ledger(self):
+        with self.captureOnCommitCallbacks():
+            adjust.apply_bulk_edit(self.household, self.ids, {"quantity_delta": -3})
+
+        quantities = dict(InventoryItem.objects.values_list("id", "quantity"))
+        self.assertEqual((quantities[self.a.pk], quantities[self.b.pk]), (0, 2))
+        self.assertEqual(quantities[self.foreign.pk], 1)
+        self.assertEqual(
+            sorted(QuantityLedger.objects.filter(reason="bulk_edit").values_list("item_id", "delta")),
+            sorted([(self.a.pk, -1), (self.b.pk, -3)]),
+        )
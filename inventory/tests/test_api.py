@@ -0,0 +1,111 @@
+"""
+読み取り専用 JSON API（async 版）：どの API も自分の世帯のものだけを返す
+"""
+from django.contrib.auth import get_user_model
+from django.test import TransactionTestCase
+from django.urls import reverse
+
+from accounts.models import AlertSetting, Household
+from inventory.models import Category, InventoryItem, InviteToken, StorageLocation
+from inventory.tests.threads import ThreadConnectionsMixin
+
+
+class AsyncApiScopeTests(ThreadConnectionsMixin, TransactionTestCase):
+    """
+    - API は parallel.gather で別スレッド（別の接続）から読むので、データをコミットして確かめる
+    - よその世帯にも同じ名前のデータを置き、混ざらないことを見る
+    """
+
+    def setUp(self):
+        super().setUp()
+        User = get_user_model()
+        self.household = Household.objects.create(name="API テスト家")
+        self.other = Household.objects.create(name="よその家")
+        self.user = User.objects.create_user("alice", password="p", household=self.household)
+        self.bob = User.objects.create_user("bob", password="p", household=self.household)
+        User.objects.create_user("mallory", password="p", household=self.other)
+        AlertSetting.objects.create(household=self.household, quantity_threshold=2)
+        AlertSetting.objects.create(household=self.other, quantity_threshold=0)
+        InviteToken.objects.create(household=self.household)
+        InviteToken.objects.create(household=self.other)
+
+        self.water = Category.objects.create(household=self.household, name="水", goal_amount=10)
+        self.shelf = StorageLocation.objects.create(household=self.household, name="水屋")
+        self.foreign_water = Category.objects.create(household=self.other, name="水", goal_amount=10)
+        StorageLocation.objects.create(household=self.other, name="水屋")
+
+        self.mine = InventoryItem.objects.create(
+            household=self.household, name="水", quantity=2, content_amount=2, category=self.water,
+            storage_location=self.shelf,
+        )
+        self.gone = InventoryItem.objects.create(household=self.household, name="水（古い）", quantity=1, is_deleted=True)
+        InventoryItem.objects.create(
+            household=self.other, name="水（よそ）", quantity=9, content_amount=9, category=self.foreign_water,
+        )
+        InventoryItem.objects.create(household=self.other, name="水（よその履歴）", quantity=1, is_deleted=True)
+        self.client.force_login(self.user)
+
+    def _get(self, name, **params):
+        response = self.client.get(reverse(name), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_items(self):
+        data = self._get("inventory:api_items")
+
+        self.assertEqual([item["id"] for item in data["items"]], [self.mine.pk])
+        item = data["items"][0]
+        self.assertEqual(item["alert"], "blue")  # 自分の世帯の閾値（2以下）で判定
+        self.assertEqual(item["category"], {"id": self.water.pk, "name": "水"})
+        self.assertEqual((data["total_items"], data["total_quantity"]), (1, 2))
+
+        # よその世帯の分類で絞っても、よその在庫は出ない
+        self.assertEqual(self._get("inventory:api_items", category=self.foreign_water.pk)["items"], [])
+
+    def test_balance(self):
+        data = self._get("inventory:api_balance")
+
+        self.assertEqual([row["id"] for row in data["rows"]], [self.water.pk])
+        self.assertEqual((data["total"], data["members"]), (4.0, 2))
+        self.assertEqual(data["rows"][0]["achievement_percent"], 40.0)
+
+    def test_history(self):
+        data = self._get("inventory:api_history")
+
+        self.assertEqual([row["id"] for row in data["items"]], [self.gone.pk])
+        self.assertEqual((data["count"], data["has_next"]), (1, False))
+        self.assertEqual(self.client.get(reverse("inventory:api_history"), {"page": "x"}).status_code, 400)
+
+    def test_autocomplete(self):
+        data = self._get("inventory:api_autocomplete", q="水")
+
+        self.assertEqual(data["products"], ["水", "水（古い）"])
+        self.assertEqual(data["categories"], [{"id": self.water.pk, "name": "水"}])
+        self.assertEqual(data["locations"], [{"id": self.shelf.pk, "name": "水屋"}])
+        self.assertEqual(self._get("inventory:api_autocomplete", q=" "),
+                         {"products": [], "categories": [], "locations": []})
+
+    def test_members(self):
+        data = self._get("accounts:member_list_json")
+
+        self.assertEqual(data["household"], {"id": self.household.pk, "name": "API テスト家"})
+        self.assertEqual([m["username"] for m in data["members"]], ["alice", "bob"])
+        self.assertEqual(data["pending_invites"], 1)
+
+    def test_login_and_household_required(self):
+        names = ("inventory:api_items", "inventory:api_balance", "inventory:api_history",
+                 "inventory:api_autocomplete", "accounts:member_list_json")
+
+        self.client.logout()
+        for name in names:
+            with self.subTest(name=name):
+                response = self.client.get(reverse(name))
+                self.assertEqual(response.status_code, 302)
+                self.assertIn("login", response["Location"])
+
+        self.client.force_login(get_user_model().objects.create_user("nobody", password="p"))
+        for name in names:
+            with self.subTest(name=name):
+                self.assertRedirects(
+                    self.client.get(reverse(name)), reverse("inventory:no_household"), fetch_redirect_response=False,
+                )
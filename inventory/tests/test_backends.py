@@ -0,0 +1,100 @@
+"""
+DB ごとの処理の切り替え（inventory.services.backends）が SQLite と PostgreSQL で同じ結果になるか
+"""
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from accounts.models import Household
+from inventory.models import Category, InventoryItem, Product
+from inventory.services import backends
+
+
+class BackendParityTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.household = Household.objects.create(name="テスト家")
+        cls.user = get_user_model().objects.create_user("alice", password="p", household=cls.household)
+
+    def _item(self, name, **kwargs):
+        return InventoryItem.objects.create(household=self.household, name=name, quantity=1, **kwargs)
+
+
+class UpsertProductsTests(BackendParityTestCase):
+    def test_creates_missing_and_returns_existing(self):
+        existing = Product.objects.create(household=self.household, name="水2L")
+
+        products = backends.upsert_products(self.household.pk, ["水2L", "缶詰", "缶詰"])
+
+        self.assertEqual(sorted(products), ["水2L", "缶詰"])
+        self.assertEqual(products["水2L"].pk, existing.pk)
+        self.assertEqual(Product.objects.filter(household=self.household).count(), 2)
+
+    def test_repeated_call_returns_same_rows(self):
+        first = backends.upsert_products(self.household.pk, ["米", "水"])
+        second = backends.upsert_products(self.household.pk, ["水", "米"])
+
+        self.assertEqual({n: p.pk for n, p in first.items()}, {n: p.pk for n, p in second.items()})
+
+    def test_empty(self):
+        self.assertEqual(backends.upsert_products(self.household.pk, []), {})
+
+    def test_items_with_same_name_share_product(self):
+        a = self._item("乾パン")
+        b = self._item("乾パン")
+
+        self.assertIsNotNone(a.product_id)
+        self.assertEqual(a.product_id, b.product_id)
+
+
+class ClaimTests(BackendParityTestCase):
+    def test_claims_same_rows_as_plain_query(self):
+        categories = [Category.objects.create(household=self.household, name=f"分類{i}") for i in range(3)]
+        queryset = Category.objects.filter(household=self.household).order_by("id")
+
+        self.assertEqual(list(backends.claim(queryset)), categories)
+
+    def test_skip_locked_only_where_supported(self):
+        sql = str(backends.claim(Category.objects.all()).query)
+
+        if connection.features.has_select_for_update_skip_locked:
+            self.assertIn("SKIP LOCKED", sql)
+        else:
+            self.assertNotIn("FOR UPDATE", sql)
+
+
+class SearchTests(BackendParityTestCase):
+    def test_icontains_matches_case_insensitively(self):
+        self._item("Milk 1L")
+        self._item("milk tea")
+        self._item("豆乳")
+        self._item("削除済みmilk", is_deleted=True)
+
+        names = InventoryItem.objects.filter(
+            household=self.household, is_deleted=False, name__icontains="MILK"
+        ).values_list("name", flat=True)
+
+        self.assertEqual(sorted(names), ["Milk 1L", "milk tea"])
+
+    def test_list_view_search(self):
+        self._item("保存水")
+        self._item("水2L")
+        self._item("缶詰")
+        self.client.force_login(self.user)
+
+        response = self.client.get(reverse("inventory:inventory_list"), {"q": "水"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(i.name for i in response.context["items"]), ["保存水", "水2L"])
+
+    @skipUnless(backends.is_postgresql(), "PostgreSQL のときだけ作るインデックス")
+    def test_postgresql_indexes_exist(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT indexname FROM pg_indexes WHERE indexname IN "
+                "('item_name_trgm_idx', 'item_live_name_idx', 'category_deleted_idx')"
+            )
+            self.assertEqual(len(cursor.fetchall()), 3)
@@ -0,0 +1,159 @@
+"""
+バックアップの書き出し・取り込み（inventory.services.backup）
+"""
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from accounts.models import AlertSetting, Household
+from inventory.models import (
+    Category, InventoryItem, InventorySnapshot, MediaFile, Memo, Product, QuantityLedger, StorageLocation,
+)
+from inventory.services import backup, ledger
+from inventory.tests.media import TemporaryMediaMixin, image_file
+
+
+class BackupRoundTripTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.household = Household.objects.create(name="書き出し元")
+
+    def _item(self, name):
+        return InventoryItem.objects.create(household=self.household, name=name, quantity=1)
+
+    def test_import_links_products(self):
+        self._item("水2L")
+        self._item("水2L")
+        self._item("缶詰")
+
+        with self.captureOnCommitCallbacks():
+            household, counts, _skipped = backup.import_lines(backup.export_lines(self.household), name="コピー")
+
+        self.assertEqual(counts["item"], 3)
+        products = Product.objects.filter(household=household)
+        self.assertEqual(sorted(products.values_list("name", flat=True)), ["水2L", "缶詰"])
+        self.assertFalse(InventoryItem.objects.filter(household=household, product__isnull=True).exists())
+
+    def test_memo_authors_are_not_taken_from_other_households(self):
+        User = get_user_model()
+        alice = User.objects.create_user("alice", password="p", household=self.household)
+        carol = User.objects.create_user("carol", password="p", household=self.household)
+        Memo.objects.create(household=self.household, user=alice, title="alice のメモ")
+        Memo.objects.create(household=self.household, user=carol, title="carol のメモ")
+        lines = list(backup.export_lines(self.household))
+
+        # 取り込む先の環境では、carol という名前は別の世帯の別人
+        stranger_household = Household.objects.create(name="別の世帯")
+        User.objects.filter(pk=carol.pk).update(household=stranger_household)
+
+        # owner が無ければ、owner 以外の作成者のメモは読み込まない
+        household, counts, skipped = backup.import_lines(lines, name="owner なし")
+        self.assertEqual((counts["memo"], skipped["memo"]), (0, 2))
+
+        household, counts, skipped = backup.import_lines(lines, name="コピー", owner=alice)
+        self.assertEqual((counts["memo"], skipped["memo"]), (2, 0))
+        self.assertEqual(
+            dict(Memo.objects.filter(household=household).values_list("title", "user__username")),
+            {"alice のメモ": "alice", "carol のメモ": "alice"},
+        )
+
+
+class BackupArchiveTests(TemporaryMediaMixin, TestCase):
+    """
+    export_household（zip）→ import_household で、メモ・スナップショット・画像まで元どおりになる
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.household = Household.objects.create(name="書き出し元", target_days=14)
+        cls.alice = get_user_model().objects.create_user("alice", password="p", household=cls.household)
+        AlertSetting.objects.create(household=cls.household, quantity_threshold=3, expiry_days=10)
+        cls.water = Category.objects.create(household=cls.household, name="水", goal_amount=20)
+        cls.shelf = StorageLocation.objects.create(household=cls.household, name="棚")
+
+    def setUp(self):
+        self.storage = InventoryItem._meta.get_field("image").storage
+        # 書き出しの日時はミリ秒まで（DjangoJSONEncoder）
+        self.past = (timezone.now() - timedelta(days=3)).replace(microsecond=0)
+
+        with self.captureOnCommitCallbacks():
+            self.a = InventoryItem.objects.create(
+                household=self.household, name="水", quantity=4, content_amount=2, category=self.water,
+                storage_location=self.shelf, image=image_file(),
+            )
+            self.b = InventoryItem.objects.create(household=self.household, name="水", quantity=1, image=image_file())
+            self.gone = InventoryItem.objects.create(household=self.household, name="米", quantity=2, is_deleted=True)
+        ledger.record([
+            ledger.entry_for(item, item.quantity, "create") for item in (self.a, self.b, self.gone)
+        ])
+        QuantityLedger.objects.update(created_at=self.past - timedelta(hours=1))
+        snapshot = ledger.take_snapshot(self.household.pk, date=self.past.date())
+        InventorySnapshot.objects.filter(pk=snapshot.pk).update(taken_at=self.past)
+
+        memo = Memo.objects.create(household=self.household, user=self.alice, title="買い物", body="水を2本")
+        Memo.objects.filter(pk=memo.pk).update(created_at=self.past, updated_at=self.past + timedelta(hours=1))
+
+    def _round_trip(self):
+        path = os.path.join(tempfile.mkdtemp(), "backup.zip")
+        self.addCleanup(os.remove, path)
+        call_command("export_household", str(self.household.pk), "--output", path, stderr=StringIO())
+
+        # 画像はストレージから消えていても zip から戻す
+        image_name = self.a.image.name
+        self.storage.delete(image_name)
+        MediaFile.objects.filter(name=image_name).delete()
+
+        out = StringIO()
+        with self.captureOnCommitCallbacks():
+            call_command("import_household", path, "--name", "コピー", "--owner", "alice", stdout=out)
+        return Household.objects.get(name="コピー"), out.getvalue()
+
+    def test_items_images_and_settings(self):
+        household, out = self._round_trip()
+
+        self.assertIn("在庫 3", out)
+        self.assertEqual(household.target_days, 14)
+        self.assertEqual(
+            AlertSetting.objects.filter(household=household).values_list("quantity_threshold", "expiry_days").get(),
+            (3, 10),
+        )
+        items = InventoryItem.objects.filter(household=household).order_by("id")
+        self.assertEqual(
+            [(i.name, i.quantity, i.is_deleted, i.category.name if i.category else None) for i in items],
+            [("水", 4, False, "水"), ("水", 1, False, None), ("米", 2, True, None)],
+        )
+        name = self.a.image.name
+        self.assertEqual([i.image.name for i in items[:2]], [name, name])
+        self.assertTrue(self.storage.exists(name))
+        self.assertEqual(MediaFile.objects.get(name=name).ref_count, 2)
+
+    def test_ledger_and_snapshots_point_at_new_items(self):
+        household, _out = self._round_trip()
+        new_ids = dict(
+            zip([self.a.pk, self.b.pk, self.gone.pk],
+                InventoryItem.objects.filter(household=household).order_by("id").values_list("id", flat=True))
+        )
+        new_water = Category.objects.get(household=household, name="水")
+
+        snapshot = InventorySnapshot.objects.get(household=household)
+        self.assertEqual((snapshot.date, snapshot.taken_at), (self.past.date(), self.past))
+        self.assertEqual(snapshot.items, {str(new_ids[self.a.pk]): 4, str(new_ids[self.b.pk]): 1})
+        self.assertEqual(snapshot.categories, {str(new_water.pk): 8.0, "none": 1.0})
+
+        self.assertEqual(
+            ledger.quantities_as_of(household.pk, timezone.now()),
+            {new_ids[pk]: qty for pk, qty in ledger.quantities_as_of(self.household.pk, timezone.now()).items()},
+        )
+
+    def test_memos_keep_author_and_times(self):
+        household, _out = self._round_trip()
+
+        memo = Memo.objects.get(household=household)
+        self.assertEqual((memo.title, memo.body, memo.user_id), ("買い物", "水を2本", self.alice.pk))
+        self.assertEqual((memo.created_at, memo.updated_at), (self.past, self.past + timedelta(hours=1)))
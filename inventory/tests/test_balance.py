@@ -0,0 +1,195 @@
+"""
+備蓄バランス画面（BalanceView / BalancePivotView）とデータ版数
+"""
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.models import Household
+from inventory.models import Category, InventoryItem, StorageLocation
+from inventory.services import charts
+from inventory.services.balance import calc_category_location_matrix
+
+
+class BalanceETagTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.household = Household.objects.create(name="バランステスト家")
+        cls.user = get_user_model().objects.create_user("alice", password="p", household=cls.household)
+
+    def test_member_change_invalidates_etag(self):
+        self.client.force_login(self.user)
+        url = reverse("inventory:balance")
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # 目安量から目標を計算する分類が無い世帯でも、人数が変われば取り直す
+        with self.captureOnCommitCallbacks(execute=True):
+            bob = get_user_model().objects.create_user("bob", password="p", household=self.household)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        etag = self.client.get(url)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            bob.delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class BalanceChartTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.household = Household.objects.create(name="グラフテスト家")
+        cls.user = get_user_model().objects.create_user("alice", password="p", household=cls.household)
+        cls.water = Category.objects.create(household=cls.household, name="水", color="#2196f3")
+        cls.rice = Category.objects.create(household=cls.household, name="米", color="#ff9800")
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.item = InventoryItem.objects.create(household=self.household, name="水", quantity=3, category=self.water)
+            InventoryItem.objects.create(household=self.household, name="米", quantity=1, category=self.rice)
+
+    def test_empty_and_single_category_pies(self):
+        self.assertIn("データなし", charts.render_pie_svg([]))
+
+        single = charts.render_pie_svg([{"name": "水", "color": "#2196f3", "share_percent": 100}])
+        self.assertIn("<circle", single)
+        self.assertNotIn("<path", single)
+
+    def test_page_embeds_svg_without_chart_library(self):
+        response = self.client.get(reverse("inventory:balance"))
+
+        self.assertContains(response, 'class="balance-pie"')
+        self.assertContains(response, "<path", count=2)  # 2分類の扇形
+        self.assertContains(response, "<title>水")
+        self.assertNotContains(response, "chart.js", status_code=200)
+
+    def test_charts_are_cached_until_data_version_changes(self):
+        url = reverse("inventory:balance")
+        with mock.patch.object(charts, "render_pie_svg", wraps=charts.render_pie_svg) as render:
+            self.client.get(url)
+            self.client.get(url)
+            self.assertEqual(render.call_count, 1)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                self.item.quantity = 5
+                self.item.save()
+            self.client.get(url)
+            self.assertEqual(render.call_count, 2)
+
+            # 保管場所で絞ると別のキー
+            self.client.get(url, {"storage": StorageLocation.objects.create(household=self.household, name="棚").pk})
+            self.assertEqual(render.call_count, 3)
+
+
+class BalancePivotTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.household = Household.objects.create(name="ピボットテスト家")
+        cls.other = Household.objects.create(name="よその家")
+        cls.user = get_user_model().objects.create_user("alice", password="p", household=cls.household)
+        cls.water = Category.objects.create(household=cls.household, name="水", goal_amount=20)
+        cls.rice = Category.objects.create(household=cls.household, name="米", goal_amount=0)
+        cls.pantry = StorageLocation.objects.create(household=cls.household, name="納戸")
+        cls.shelf = StorageLocation.objects.create(household=cls.household, name="棚")
+
+        def item(household=cls.household, **kwargs):
+            InventoryItem.objects.create(household=household, name="在庫", **kwargs)
+
+        item(category=cls.water, storage_location=cls.pantry, quantity=3, content_amount=2)
+        item(category=cls.water, storage_location=cls.pantry, quantity=1, content_amount=4)
+        item(category=cls.water, storage_location=cls.shelf, quantity=1, content_amount=5)
+        item(category=cls.rice, quantity=2, content_amount=1.5)
+        item(storage_location=cls.shelf, quantity=1, content_amount=1)
+        # 数えないもの：履歴・数量0・よその世帯
+        item(category=cls.water, storage_location=cls.pantry, quantity=9, content_amount=9, is_deleted=True)
+        item(category=cls.water, storage_location=cls.pantry, quantity=0, content_amount=9)
+        item(household=cls.other, quantity=9, content_amount=9)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_matrix_in_one_group_by(self):
+        with self.assertNumQueries(3):  # 集計1回 + 分類 + 保管場所
+            matrix = calc_category_location_matrix(self.household)
+
+        self.assertEqual([loc["name"] for loc in matrix["locations"]], ["棚", "納戸", "未設定"])
+        cells = {row["name"]: [cell["amount"] for cell in row["cells"]] for row in matrix["rows"]}
+        self.assertEqual(cells, {"水": [5.0, 10.0, 0.0], "米": [0.0, 0.0, 3.0], "未分類": [1.0, 0.0, 0.0]})
+        self.assertEqual(matrix["column_totals"], [6.0, 10.0, 3.0])
+        self.assertEqual(matrix["total"], 19.0)
+
+        water = next(row for row in matrix["rows"] if row["name"] == "水")
+        self.assertEqual((water["total"], water["achievement_percent"]), (15.0, 75.0))
+        self.assertEqual([cell["achievement_percent"] for cell in water["cells"]], [25.0, 50.0, 0.0])
+        self.assertEqual([cell["heat"] for cell in water["cells"]], [0.5, 1.0, 0.0])
+        rice = next(row for row in matrix["rows"] if row["name"] == "米")
+        self.assertEqual(rice["achievement_percent"], 0.0)  # 目標なし
+
+    def test_json_view_is_cached_by_data_version(self):
+        self.client.force_login(self.user)
+        url = reverse("inventory:balance_pivot")
+
+        with mock.patch("inventory.views.calc_category_location_matrix", wraps=calc_category_location_matrix) as calc:
+            data = self.client.get(url, {"format": "json"}).json()
+            self.assertEqual(data, calc_category_location_matrix(self.household))
+            self.assertContains(self.client.get(url), "納戸")
+            self.assertEqual(calc.call_count, 1)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                InventoryItem.objects.create(
+                    household=self.household, name="水", category=self.water, storage_location=self.shelf, quantity=1,
+                )
+            data = self.client.get(url, {"format": "json"}).json()
+            self.assertEqual(calc.call_count, 2)
+            self.assertEqual(data["total"], 20.0)
+
+    def test_json_view_requires_login(self):
+        response = self.client.get(reverse("inventory:balance_pivot"), {"format": "json"})
+
+        self.assertEqual(response.status_code, 302)
+
+
+class DataVersionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.household = Household.objects.create(name="版数テスト家")
+
+    def _version(self):
+        return Household.objects.get(pk=self.household.pk).data_version
+
+    def test_one_bump_per_transaction(self):
+        before = self._version()
+        table = Household._meta.db_table
+
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                category = Category.objects.create(household=self.household, name="水")
+                for i in range(3):
+                    InventoryItem.objects.create(household=self.household, name=f"水{i}", quantity=1, category=category)
+                StorageLocation.objects.create(household=self.household, name="棚")
+            self.assertEqual(self._version(), before)  # コミット前は進めない
+
+        self.assertEqual(self._version(), before + 1)
+        updates = [q["sql"] for q in queries if q["sql"].startswith("UPDATE") and table in q["sql"]]
+        self.assertEqual(len(updates), 1)
+
+    def test_rolled_back_changes_do_not_bump(self):
+        before = self._version()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    Category.objects.create(household=self.household, name="水")
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            # 取り消されたセーブポイントの分は数えず、その後の変更でまた登録する
+            StorageLocation.objects.create(household=self.household, name="棚")
+
+        self.assertEqual(self._version(), before + 1)
@@ -0,0 +1,132 @@
+"""
+一括操作を元に戻す（inventory.services.batches）
+"""
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import Household
+from inventory.models import (
+    Category, InventoryItem, OperationBatch, OperationBatchEdit, QuantityLedger, StorageLocation,
+)
+from inventory.services import adjust, batches
+
+
+class UndoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.household = Household.objects.create(name="元に戻すテスト家")
+        cls.user = get_user_model().objects.create_user("alice", password="p", household=cls.household)
+        cls.water = Category.objects.create(household=cls.household, name="水")
+        cls.rice = Category.objects.create(household=cls.household, name="米")
+        cls.shelf = StorageLocation.objects.create(household=cls.household, name="棚")
+
+    def setUp(self):
+        self.a = InventoryItem.objects.create(
+            household=self.household, name="水", quantity=1, category=self.water, expiry_date=date(2027, 1, 1),
+        )
+        self.b = InventoryItem.objects.create(
+            household=self.household, name="米", quantity=5, category=self.rice, storage_location=self.shelf,
+        )
+        self.ids = [self.a.pk, self.b.pk]
+        self.client.force_login(self.user)
+
+    def _bulk_edit(self, changes):
+        with self.captureOnCommitCallbacks():
+            adjust.apply_bulk_edit(self.household, self.ids, changes, user=self.user)
+        return batches.last_undoable(self.household)
+
+    def _undo(self, batch_id):
+        with self.captureOnCommitCallbacks():
+            return batches.undo(self.household, batch_id)
+
+    def test_bulk_edit_restores_previous_values_per_item(self):
+        batch = self._bulk_edit({
+            "category_id": None, "storage_location_id": None, "expiry_date": date(2030, 1, 1), "quantity_delta": -3,
+        })
+        self.assertEqual((batch.kind, batch.item_count), ("bulk_edit", 2))
+        self.assertEqual(OperationBatchEdit.objects.filter(batch=batch).count(), 2)
+
+        # 編集の後に使った分は、戻しても消さない
+        InventoryItem.objects.filter(pk=self.b.pk).update(quantity=1)
+
+        self.assertEqual(self._undo(batch.pk), 2)
+
+        a, b = InventoryItem.objects.get(pk=self.a.pk), InventoryItem.objects.get(pk=self.b.pk)
+        self.assertEqual((a.category_id, a.storage_location_id, a.expiry_date, a.quantity),
+                         (self.water.pk, None, date(2027, 1, 1), 1))
+        self.assertEqual((b.category_id, b.storage_location_id, b.expiry_date, b.quantity),
+                         (self.rice.pk, self.shelf.pk, None, 4))
+        self.assertEqual(
+            sorted(QuantityLedger.objects.filter(reason="bulk_edit").values_list("item_id", "delta")),
+            sorted([(self.a.pk, -1), (self.b.pk, -3), (self.a.pk, 1), (self.b.pk, 3)]),
+        )
+        self.assertIsNone(batches.last_undoable(self.household))
+
+    def test_bulk_edit_undo_keeps_unchanged_fields_and_drops_deleted_category(self):
+        batch = self._bulk_edit({"category_id": self.water.pk})
+        InventoryItem.objects.filter(pk=self.a.pk).update(expiry_date=date(2028, 1, 1))
+        Category.objects.filter(pk=self.rice.pk).update(is_deleted=True)
+
+        self._undo(batch.pk)
+
+        a, b = InventoryItem.objects.get(pk=self.a.pk), InventoryItem.objects.get(pk=self.b.pk)
+        self.assertEqual((a.category_id, a.expiry_date), (self.water.pk, date(2028, 1, 1)))
+        self.assertEqual((b.category_id, b.quantity), (None, 5))
+
+    def test_views_bulk_edit_then_undo(self):
+        response = self.client.post(reverse("inventory:inventory_bulk_edit_execute"), {
+            "selected_ids": self.ids, "category": "none", "storage_location": "", "expiry_action": "keep",
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(InventoryItem.objects.filter(pk__in=self.ids, category__isnull=False).exists())
+        batch = batches.last_undoable(self.household)
+        self.assertContains(self.client.get(reverse("inventory:inventory_list")), "直前の一括編集（2件）")
+
+        self.client.post(reverse("inventory:inventory_undo"), {"batch_id": batch.pk})
+
+        self.assertEqual(InventoryItem.objects.get(pk=self.a.pk).category_id, self.water.pk)
+        self.assertEqual(InventoryItem.objects.get(pk=self.b.pk).category_id, self.rice.pk)
+
+    def test_views_bulk_delete_then_undo(self):
+        self.client.post(reverse("inventory:inventory_bulk_delete_execute"), {"selected_ids": self.ids})
+        self.assertFalse(InventoryItem.objects.filter(pk__in=self.ids, is_deleted=False).exists())
+        batch = batches.last_undoable(self.household)
+        self.assertEqual(batch.kind, "bulk_delete")
+
+        self.client.post(reverse("inventory:inventory_undo"), {"batch_id": batch.pk})
+
+        self.assertEqual(InventoryItem.objects.filter(pk__in=self.ids, is_deleted=False).count(), 2)
+
+    @override_settings(INVENTORY_UNDO_RETENTION_HOURS=1)
+    def test_batches_past_retention_cannot_be_undone_and_are_purged(self):
+        batch = self._bulk_edit({"category_id": None})
+        OperationBatch.objects.filter(pk=batch.pk).update(created_at=timezone.now() - timedelta(hours=2))
+
+        self.assertIsNone(batches.last_undoable(self.household))
+        self.assertIsNone(self._undo(batch.pk))
+        self.assertIsNone(InventoryItem.objects.get(pk=self.a.pk).category_id)
+
+        # 次の一括操作で、古い操作と変更前の値が消える
+        self._bulk_edit({"expiry_date": None})
+        self.assertFalse(OperationBatch.objects.filter(pk=batch.pk).exists())
+        self.assertFalse(OperationBatchEdit.objects.filter(batch_id=batch.pk).exists())
+
+    def test_only_latest_batch_can_be_undone(self):
+        with self.captureOnCommitCallbacks():
+            self.client.post(reverse("inventory:inventory_bulk_delete_execute"), {"selected_ids": [self.a.pk]})
+        deleted = batches.last_undoable(self.household)
+        self.ids = [self.b.pk]
+        edited = self._bulk_edit({"quantity_delta": 2})
+
+        self.assertIsNone(self._undo(deleted.pk))
+        self.assertTrue(InventoryItem.objects.get(pk=self.a.pk).is_deleted)
+
+        self.assertEqual(self._undo(edited.pk), 1)
+        self.assertEqual(InventoryItem.objects.get(pk=self.b.pk).quantity, 5)
+        # 戻した後に、その前の操作が戻せるようにはならない
+        self.assertIsNone(batches.last_undoable(self.household))
+        self.assertIsNone(self._undo(deleted.pk))
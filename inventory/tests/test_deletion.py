@@ -0,0 +1,143 @@
+"""
+分類・保管場所の削除（inventory.services.deletion）
+"""
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from accounts.models import Household
+from inventory.models import Category, InventoryItem, StorageLocation, SyncTombstone
+from inventory.services import deletion, lots, stocktake
+from inventory.tests.threads import ThreadConnectionsMixin
+
+
+class PurgeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.household = Household.objects.create(name="削除テスト家")
+
+    def _item(self, name, category):
+        return InventoryItem.objects.create(household=self.household, name=name, quantity=1, category=category)
+
+    def test_detaches_items_in_chunks_and_deletes_row(self):
+        category = Category.objects.create(household=self.household, name="水")
+        items = [self._item(f"水{i}", category) for i in range(5)]
+
+        # ワーカーには渡さず（コミット後の処理を実行しない）、このテストの中で片付ける
+        with self.captureOnCommitCallbacks():
+            self.assertEqual(deletion.schedule_delete(Category.objects.filter(pk=category.pk)), 1)
+
+        self.assertFalse(Category.objects.filter(pk=category.pk).exists())
+        Category.objects.create(household=self.household, name="水")  # 同じ名前をすぐ作り直せる
+
+        with self.captureOnCommitCallbacks():
+            self.assertEqual(deletion.purge("category", category.pk, chunk_size=2), len(items))
+
+        self.assertFalse(Category.all_objects.filter(pk=category.pk).exists())
+        self.assertFalse(InventoryItem.objects.filter(category_id=category.pk).exists())
+        self.assertTrue(
+            SyncTombstone.objects.filter(kind=SyncTombstone.KIND_CATEGORY, object_id=category.pk).exists()
+        )
+
+    def test_purge_pending_is_idempotent(self):
+        category = Category.objects.create(household=self.household, name="缶詰")
+        self._item("缶詰", category)
+        with self.captureOnCommitCallbacks():
+            deletion.schedule_delete(Category.objects.filter(pk=category.pk))
+            first = deletion.purge_pending()
+            second = deletion.purge_pending()
+
+        self.assertEqual(first, {"items": 1, "category": 1, "location": 0})
+        self.assertEqual(second, {"items": 0, "category": 0, "location": 0})
+
+
+class DeleteViewTests(ThreadConnectionsMixin, TransactionTestCase):
+    """
+    画面からの削除：印を付けた時点で（ワーカーが在庫を外す前でも）どこにも出さず、同じ名前をすぐ使える
+    - async API は別スレッド（別の接続）で読むので、データをコミットする TransactionTestCase で確かめる
+    """
+
+    def setUp(self):
+        super().setUp()
+        # ワーカー（purge）には渡さない：在庫がまだ外れていない間の表示を確かめる
+        patcher = mock.patch.object(deletion, "submit_after_commit")
+        self.submit = patcher.start()
+        self.addCleanup(patcher.stop)
+        caches["fragments"].clear()
+
+        self.household = Household.objects.create(name="削除画面テスト家")
+        self.user = get_user_model().objects.create_user("alice", password="p", household=self.household)
+        self.category = Category.objects.create(household=self.household, name="非常食")
+        self.location = StorageLocation.objects.create(household=self.household, name="納戸")
+        self.item = InventoryItem.objects.create(
+            household=self.household, name="乾パン", quantity=2, category=self.category, storage_location=self.location,
+        )
+        self.gone = InventoryItem.objects.create(
+            household=self.household, name="缶詰", quantity=1, category=self.category,
+            storage_location=self.location, is_deleted=True,
+        )
+        self.client.force_login(self.user)
+
+    def _post(self, url, data=None):
+        self.submit.reset_mock()
+        response = self.client.post(url, data or {})
+        self.assertTrue(self.submit.called)
+        return response
+
+    def _delete_both(self):
+        self._post(reverse("inventory:category_delete", args=[self.category.pk]))
+        self._post(reverse("inventory:storage_location_delete", args=[self.location.pk]))
+        # 在庫はまだ付いたまま
+        self.assertEqual(InventoryItem.objects.get(pk=self.item.pk).category_id, self.category.pk)
+
+    def test_deleted_rows_are_hidden_immediately(self):
+        self._delete_both()
+
+        self.assertFalse(Category.objects.filter(household=self.household).exists())
+        self.assertNotContains(self.client.get(reverse("inventory:category_list")), "非常食")
+        self.assertNotContains(self.client.get(reverse("inventory:storage_location_list")), "納戸")
+        self.assertNotContains(self.client.get(reverse("inventory:inventory_list")), "非常食")
+
+    def test_reads_treat_deleted_rows_as_unset(self):
+        self._delete_both()
+
+        item = self.client.get(reverse("inventory:api_items")).json()["items"][0]
+        self.assertEqual((item["category"], item["storage_location"]), (None, None))
+
+        history = self.client.get(reverse("inventory:api_history")).json()["items"][0]
+        self.assertEqual((history["category__name"], history["storage_location__name"]), (None, None))
+
+        self.assertEqual([lot["location"] for lot in lots.product_summary(self.item.product)["lots"]], [None])
+
+        session = stocktake.start(self.household, self.user)
+        stocktake.save_counts(session, {self.item.pk: 5})
+        row = stocktake.compute_diff(session)[0]
+        self.assertEqual((row["category_id"], row["location"]), (None, None))
+        self.assertNotContains(self.client.get(reverse("inventory:stocktake", args=[session.pk])), "納戸")
+
+    def test_name_can_be_reused_at_once(self):
+        self._delete_both()
+
+        response = self.client.post(reverse("inventory:category_add"), {
+            "name": "非常食", "description": "", "color": "#ffcc00", "goal_amount": 0, "goal_unit": "PCS",
+            "daily_rate_per_person": 0,
+        })
+        self.assertEqual(response.status_code, 302)
+        response = self.client.post(reverse("inventory:storage_location_add"), {"name": "納戸"})
+        self.assertEqual(response.status_code, 302)
+
+        self.assertEqual(Category.all_objects.filter(household=self.household, name="非常食").count(), 2)
+        self.assertEqual(StorageLocation.objects.get(household=self.household).name, "納戸")
+
+    def test_settings_bulk_delete(self):
+        other = Category.objects.create(household=self.household, name="飲料")
+
+        self._post(reverse("inventory:settings_tabs"), {
+            "tab": "category", "action": "bulk_delete_category", "selected_ids": [self.category.pk, other.pk],
+        })
+
+        self.assertFalse(Category.objects.filter(household=self.household).exists())
+        self.assertEqual(Category.all_objects.filter(household=self.household, is_deleted=True).count(), 2)
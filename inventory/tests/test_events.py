@@ -0,0 +1,157 @@
+"""
+在庫のライブ更新（inventory.services.events / SSE）
+"""
+import asyncio
+from datetime import date, timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import Household
+from inventory.models import InventoryItem
+from inventory.services import alerts, events
+
+
+class RecordingBackend:
+    """publish されたイベントを世帯ごとにためるだけのバックエンド"""
+
+    def __init__(self, household_ids=()):
+        self.household_ids = set(household_ids)
+        self.published = []
+
+    def has_subscribers(self, household_id):
+        return household_id in self.household_ids
+
+    def publish(self, household_id, event):
+        self.published.append((household_id, event))
+
+
+class PublishTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.household = Household.objects.create(name="ライブ更新テスト家")
+        cls.other = Household.objects.create(name="よその家")
+
+    def setUp(self):
+        self.backend = RecordingBackend([self.household.pk, self.other.pk])
+        patcher = mock.patch.object(events, "get_backend", return_value=self.backend)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.item = self._item(self.household, "水", quantity=5)
+
+    def _item(self, household, name, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            item = InventoryItem.objects.create(household=household, name=name, **kwargs)
+        self.backend.published.clear()
+        return item
+
+    def test_only_changed_fields_are_sent_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.item.quantity = 1
+            self.item.save()
+            self.assertEqual(self.backend.published, [])  # コミット前は送らない
+
+        self.assertEqual(self.backend.published, [(self.household.pk, {
+            "type": "item", "id": self.item.pk, "changed": {"quantity": 1}, "alert": alerts.BLUE, "days_left": None,
+        })])
+
+    def test_unchanged_save_and_untracked_fields_send_nothing(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.item.save()
+            # update_fields に入っていない項目は、値が変わっていても送らない
+            self.item.quantity = 2
+            self.item.save(update_fields=["updated_at"])
+
+        self.assertEqual(self.backend.published, [])
+
+    def test_expiry_label_and_delete_events(self):
+        expiry = timezone.localdate() + timedelta(days=3)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.item.expiry_date = expiry
+            self.item.save()
+        event = self.backend.published[-1][1]
+        self.assertEqual(event["changed"]["expiry_date"], expiry.isoformat())
+        self.assertIn("expiry_label", event["changed"])
+        self.assertEqual(event["days_left"], 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            events.publish_items(self.household.pk, [self.item.pk], ("is_deleted",))
+            InventoryItem.objects.filter(pk=self.item.pk).update(is_deleted=True)
+        deleted = (self.household.pk, {"type": "item", "id": self.item.pk, "deleted": True})
+        self.assertEqual(self.backend.published[-1], deleted)
+
+        self.backend.published.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.item.delete()
+        self.assertEqual(self.backend.published, [deleted])
+
+    def test_events_stay_in_household(self):
+        foreign = self._item(self.other, "よその在庫", quantity=1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            events.publish_items(self.household.pk, [self.item.pk], ("quantity",))
+            foreign.quantity = 3
+            foreign.save()
+
+        self.assertEqual(
+            [(household_id, event["id"]) for household_id, event in self.backend.published],
+            [(self.household.pk, self.item.pk), (self.other.pk, foreign.pk)],
+        )
+
+    def test_no_subscribers_means_no_queries(self):
+        self.backend.household_ids.clear()
+        with self.captureOnCommitCallbacks() as callbacks:
+            events.publish_items(self.household.pk, [self.item.pk])
+
+        with self.assertNumQueries(0):
+            for callback in callbacks:
+                callback()
+        self.assertEqual(self.backend.published, [])
+
+    def test_stream_view_requires_login(self):
+        response = self.client.get(reverse("inventory:inventory_events"))
+
+        self.assertEqual(response.status_code, 302)
+
+
+class StreamTests(TestCase):
+    def _run(self, coro):
+        backend = events.InProcessBackend()
+        with mock.patch.object(events, "get_backend", return_value=backend):
+            return asyncio.run(coro(backend))
+
+    def test_stream_sends_hello_then_household_events_and_unsubscribes(self):
+        async def scenario(backend):
+            stream = events.stream(1, 7)
+            first = await anext(stream)
+            backend.publish(2, {"type": "item", "id": 99})
+            backend.publish(1, {"type": "item", "id": 5, "changed": {"name": "水"}})
+            second = await asyncio.wait_for(anext(stream), 1)
+            subscribed = backend.has_subscribers(1)
+            await stream.aclose()
+            return first, second, subscribed, backend.has_subscribers(1)
+
+        first, second, subscribed, after = self._run(scenario)
+
+        self.assertEqual(first, 'retry: 3000\nevent: hello\ndata: {"version":7}\n\n')
+        self.assertEqual(second, 'event: item\ndata: {"type":"item","id":5,"changed":{"name":"水"}}\n\n')
+        self.assertEqual((subscribed, after), (True, False))
+
+    def test_overflow_is_replaced_by_reset(self):
+        async def scenario(backend):
+            subscription = backend.subscribe(1)
+            for i in range(3):
+                backend.publish(1, {"type": "item", "id": i})
+            await asyncio.sleep(0)
+            return [subscription.queue.get_nowait() for _ in range(subscription.queue.qsize())]
+
+        with mock.patch.object(events, "QUEUE_SIZE", 2):
+            self.assertEqual(self._run(scenario), [{"type": "reset"}])
+
+    def test_item_event_for_deleted_row(self):
+        row = {"id": 1, "quantity": 0, "expiry_date": date(2030, 1, 1), "is_deleted": True}
+
+        self.assertEqual(events.item_event(row, ("quantity",), alerts.DEFAULT_ALERT, date(2029, 1, 1)),
+                         {"type": "item", "id": 1, "deleted": True})
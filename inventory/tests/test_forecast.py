@@ -0,0 +1,84 @@
+"""
+使用ペースの推定（inventory.services.forecast）
+"""
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import Household
+from inventory.models import Category, InventoryItem, QuantityLedger
+from inventory.services import forecast
+
+
+class ForecastTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.household = Household.objects.create(name="予測テスト家")
+        cls.category = Category.objects.create(household=cls.household, name="水")
+
+    def setUp(self):
+        self.today = timezone.localdate()
+
+    def _entry(self, delta, reason, days_ago=0, item_id=1):
+        return QuantityLedger.objects.create(
+            household=self.household, item_id=item_id, category_id=self.category.pk,
+            content_amount=1.0, delta=delta, reason=reason,
+            created_at=timezone.now() - timedelta(days=days_ago),
+        )
+
+    def _rate(self):
+        rates = forecast.estimate_rates([self.household.pk], today=self.today).get(self.household.pk, {})
+        return rates.get(self.category.pk)
+
+    def test_deletions_are_not_consumption(self):
+        self._entry(-300, "bulk_delete")
+        self._entry(-5, "delete")
+        self._entry(-2, "stocktake")
+
+        self.assertIsNone(self._rate())
+
+    def test_adjust_mistap_cancels_out(self):
+        self._entry(+1, "adjust")
+        self._entry(-1, "adjust")
+        self._entry(-2, "consume", item_id=2)
+
+        rate, days = self._rate()
+        self.assertEqual(days, 1)
+        self.assertAlmostEqual(rate, 2.0)
+
+    def test_quantity_decrease_by_edit_is_consumption(self):
+        # 編集画面・同期で数量を減らした（使った）分は数え、増やしただけの在庫は数えない
+        self._entry(-3, "edit")
+        self._entry(+5, "edit", item_id=2)
+
+        rate, days = self._rate()
+        self.assertEqual(days, 1)
+        self.assertAlmostEqual(rate, 3.0)
+
+    def test_edit_view_decrease_is_recorded_and_counted(self):
+        user = get_user_model().objects.create_user("alice", password="p", household=self.household)
+        item = InventoryItem.objects.create(
+            household=self.household, name="水2L", quantity=6, content_amount=2, category=self.category,
+        )
+        self.client.force_login(user)
+
+        with self.captureOnCommitCallbacks():
+            self.client.post(reverse("inventory:inventory_edit", args=[item.pk]), {
+                "name": "水2L", "quantity": 4, "content_amount": 2, "category": self.category.pk,
+            })
+
+        self.assertEqual(InventoryItem.objects.get(pk=item.pk).quantity, 4)
+        rate, _days = self._rate()
+        self.assertAlmostEqual(rate, 4.0)
+
+    def test_history_start_is_not_limited_to_window(self):
+        # 何か月も前から使っている世帯が、今日はじめて使用を記録した
+        self._entry(+10, "create", days_ago=90)
+        self._entry(-4, "consume")
+
+        rate, days = self._rate()
+        self.assertEqual(days, forecast.WINDOW_DAYS)
+        self.assertLess(rate, 4.0)
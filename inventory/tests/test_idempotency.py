@@ -0,0 +1,69 @@
+"""
+二重送信の防止（inventory.services.idempotency）
+"""
+import time
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from accounts.models import Household
+from inventory.models import IdempotencyKey, InventoryItem
+from inventory.services import idempotency, sync
+
+
+class IdempotencyTests(TestCase):
+    key = "k" * 32
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.household = Household.objects.create(name="再送テスト家")
+        cls.user = get_user_model().objects.create_user("alice", password="p", household=cls.household)
+
+    def _create_mutation(self):
+        return {"type": "item", "op": "upsert", "ref": self.key,
+                "fields": {"name": "米", "quantity": 1, "content_amount": 1}}
+
+    def test_form_resend_is_replayed(self):
+        self.client.force_login(self.user)
+        data = {"name": "水2L", "quantity": 2, "content_amount": 1, idempotency.FIELD_NAME: self.key}
+
+        first = self.client.post(reverse("inventory:inventory_add"), data)
+        second = self.client.post(reverse("inventory:inventory_add"), data)
+
+        self.assertEqual(first.status_code, 302)
+        self.assertEqual(second["Location"], first["Location"])
+        self.assertEqual(InventoryItem.objects.filter(household=self.household, name="水2L").count(), 1)
+
+    def test_second_claim_of_pending_key_does_not_wait(self):
+        record, created = idempotency.claim(self.household, self.key)
+        self.assertTrue(created)
+
+        started = time.monotonic()
+        again, created = idempotency.claim(self.household, self.key, wait=False)
+
+        self.assertFalse(created)
+        self.assertEqual(again.pk, record.pk)
+        self.assertEqual(again.status, IdempotencyKey.STATUS_PENDING)
+        self.assertLess(time.monotonic() - started, idempotency.WAIT_SECONDS)
+
+    def test_sync_returns_retry_for_pending_create(self):
+        # 同じ ref の1回目がまだ処理中（別のリクエストが claim したまま）
+        idempotency.claim(self.household, self.key)
+
+        started = time.monotonic()
+        results = sync.apply_mutations(self.household, self.user, [self._create_mutation()] * 3)
+
+        self.assertEqual([r["status"] for r in results], ["retry"] * 3)
+        self.assertLess(time.monotonic() - started, idempotency.WAIT_SECONDS)
+        self.assertFalse(InventoryItem.objects.filter(household=self.household, name="米").exists())
+
+    def test_sync_create_is_idempotent(self):
+        with self.captureOnCommitCallbacks():
+            first = sync.apply_mutations(self.household, self.user, [self._create_mutation()])
+            second = sync.apply_mutations(self.household, self.user, [self._create_mutation()])
+
+        self.assertEqual(first[0]["status"], "ok")
+        self.assertEqual(second[0]["status"], "ok")
+        self.assertEqual(first[0]["id"], second[0]["id"])
+        self.assertEqual(InventoryItem.objects.filter(household=self.household, name="米").count(), 1)
@@ -0,0 +1,103 @@
+"""
+数量の増減履歴とスナップショット（inventory.services.ledger / compact_ledger）
+"""
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from accounts.models import Household
+from inventory.models import Category, InventoryItem, InventorySnapshot, QuantityLedger
+from inventory.services import ledger
+
+
+class LedgerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.household = Household.objects.create(name="増減履歴テスト家")
+        cls.other = Household.objects.create(name="よその家")
+        cls.water = Category.objects.create(household=cls.household, name="水")
+
+    def setUp(self):
+        self.now = timezone.now()
+        self.a = InventoryItem.objects.create(
+            household=self.household, name="水", quantity=4, category=self.water, content_amount=2,
+        )
+        self.b = InventoryItem.objects.create(household=self.household, name="米", quantity=3, content_amount=1.5)
+        self.gone = InventoryItem.objects.create(household=self.household, name="履歴", quantity=9, is_deleted=True)
+
+    def _entry(self, item, delta, days_ago, household=None):
+        return QuantityLedger.objects.create(
+            household=household or self.household, item_id=item.pk, delta=delta, reason="edit",
+            created_at=self.now - timedelta(days=days_ago),
+        )
+
+    def test_record_skips_zero_deltas(self):
+        written = ledger.record([
+            ledger.entry_for(self.a, 2, "consume"), ledger.entry_for(self.b, 0, "consume"),
+        ])
+
+        self.assertEqual(written, 1)
+        entry = QuantityLedger.objects.get()
+        self.assertEqual((entry.item_id, entry.category_id, entry.content_amount), (self.a.pk, self.water.pk, 2))
+
+    def test_snapshot_overwrites_same_day(self):
+        ledger.take_snapshot(self.household.pk)
+        InventoryItem.objects.filter(pk=self.a.pk).update(quantity=1)
+        snapshot = ledger.take_snapshot(self.household.pk)
+
+        self.assertEqual(InventorySnapshot.objects.filter(household=self.household).count(), 1)
+        self.assertEqual(snapshot.items, {str(self.a.pk): 1, str(self.b.pk): 3})
+        self.assertEqual(snapshot.categories, {str(self.water.pk): 2.0, "none": 4.5})
+
+    def test_quantities_as_of_uses_snapshot_plus_tail(self):
+        # 5日前：a=1, b=3 → 3日前に a+3 → 今：a=4, b=3
+        self._entry(self.a, 1, days_ago=10)
+        self._entry(self.b, 3, days_ago=10)
+        InventorySnapshot.objects.create(
+            household=self.household, date=(self.now - timedelta(days=5)).date(),
+            taken_at=self.now - timedelta(days=5), items={str(self.a.pk): 1, str(self.b.pk): 3},
+        )
+        self._entry(self.a, 3, days_ago=3)
+        self._entry(self.b, -3, days_ago=1)
+
+        with self.assertNumQueries(2):
+            self.assertEqual(ledger.quantities_as_of(self.household.pk, self.now - timedelta(days=2)),
+                             {self.a.pk: 4, self.b.pk: 3})
+        # 0 になった在庫は含めない
+        self.assertEqual(ledger.quantities_as_of(self.household.pk, self.now), {self.a.pk: 4})
+        # スナップショットより前は増減履歴だけで組み立てる
+        self.assertEqual(ledger.quantities_as_of(self.household.pk, self.now - timedelta(days=7)),
+                         {self.a.pk: 1, self.b.pk: 3})
+        # 日付を渡すとその日の終わり時点
+        self.assertEqual(ledger.quantities_as_of(self.household.pk, (self.now - timedelta(days=3)).date()),
+                         {self.a.pk: 4, self.b.pk: 3})
+
+    def test_compact_drops_old_rows_but_keeps_history_reconstructable(self):
+        self._entry(self.a, 4, days_ago=40)
+        self._entry(self.b, 3, days_ago=40)
+        recent = self._entry(self.a, -1, days_ago=2)
+        self._entry(self.a, 1, days_ago=1)
+        foreign = self._entry(self.a, 5, days_ago=40, household=self.other)
+        before = ledger.quantities_as_of(self.household.pk, self.now)
+
+        deleted = ledger.compact(self.household.pk, keep_days=30)
+
+        self.assertEqual(deleted, 2)
+        self.assertTrue(QuantityLedger.objects.filter(pk=recent.pk).exists())
+        self.assertTrue(QuantityLedger.objects.filter(pk=foreign.pk).exists())
+        self.assertEqual(ledger.quantities_as_of(self.household.pk, timezone.now()), before)
+
+    def test_command_limits_to_household(self):
+        self._entry(self.a, 1, days_ago=40)
+        self._entry(self.a, 1, days_ago=40, household=self.other)
+        out = StringIO()
+
+        call_command("compact_ledger", "--keep-days", "7", "--household", str(self.household.pk), stdout=out)
+
+        self.assertIn("1世帯", out.getvalue())
+        self.assertEqual(list(QuantityLedger.objects.values_list("household_id", flat=True)), [self.other.pk])
+        self.assertTrue(InventorySnapshot.objects.filter(household=self.household).exists())
+        self.assertFalse(InventorySnapshot.objects.filter(household=self.other).exists())
@@ -0,0 +1,157 @@
+"""
+在庫一覧（InventoryListView）：?partial=rows と行の断片キャッシュ
+"""
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import AlertSetting, Household
+from inventory.models import Category, InventoryItem, OperationBatch, StorageLocation
+
+
+class ListTestMixin:
+    @classmethod
+    def setUpTestData(cls):
+        cls.household = Household.objects.create(name="一覧テスト家")
+        cls.other = Household.objects.create(name="よその家")
+        cls.user = get_user_model().objects.create_user("alice", password="p", household=cls.household)
+        cls.water = Category.objects.create(household=cls.household, name="飲料", color="#2196f3")
+        cls.shelf = StorageLocation.objects.create(household=cls.household, name="納戸")
+
+    def setUp(self):
+        caches["fragments"].clear()
+        self.client.force_login(self.user)
+        self.url = reverse("inventory:inventory_list")
+
+    def _item(self, name, **kwargs):
+        # 縮小画像などのワーカーには渡さない
+        with self.captureOnCommitCallbacks():
+            return InventoryItem.objects.create(household=kwargs.pop("household", self.household), name=name, **kwargs)
+
+
+class PartialRowsTests(ListTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self._item("水", quantity=3, category=self.water, storage_location=self.shelf)
+        self._item("米", quantity=1)
+        self._item("乾パン", quantity=2, is_deleted=True)
+        self._item("よその水", quantity=9, household=self.other)
+
+    def test_returns_only_summary_and_rows(self):
+        response = self.client.get(self.url, {"partial": "rows"})
+
+        self.assertTemplateUsed(response, "inventory/_list_rows.html")
+        self.assertTemplateNotUsed(response, "inventory/list.html")
+        self.assertNotContains(response, "<html")
+        self.assertNotContains(response, 'id="listRows"')
+        self.assertContains(response, "合計：2件 / 数量合計：4")
+        self.assertContains(response, 'class="item-card"', count=2)
+        self.assertNotContains(response, "乾パン")
+        self.assertNotContains(response, "よその水")
+
+    def test_applies_the_same_filters_as_the_page(self):
+        response = self.client.get(self.url, {"partial": "rows", "category": self.water.pk})
+        self.assertContains(response, "合計：1件")
+        self.assertContains(response, "水")
+
+        response = self.client.get(self.url, {"partial": "rows", "q": "米"})
+        self.assertContains(response, "合計：1件")
+
+        content = self.client.get(self.url, {"partial": "rows", "sort": "quantity"}).content.decode()
+        self.assertLess(content.index("米"), content.index("水"))
+
+    def test_skips_page_only_queries(self):
+        with CaptureQueriesContext(connection) as full:
+            self.client.get(self.url)
+        with CaptureQueriesContext(connection) as partial:
+            self.client.get(self.url, {"partial": "rows"})
+
+        # 絞り込みの選択肢・元に戻すボタンは読まない
+        self.assertLess(len(partial), len(full))
+        batch_table = OperationBatch._meta.db_table
+        self.assertTrue(any(batch_table in q["sql"] for q in full))
+        self.assertFalse(any(batch_table in q["sql"] for q in partial))
+
+    def test_select_mode_rows_have_checkboxes(self):
+        response = self.client.get(self.url, {"partial": "rows", "select_mode": "1"})
+
+        self.assertContains(response, 'name="selected_ids"', count=2)
+        self.assertNotContains(response, "qty-btn")
+
+
+class RowCacheTests(ListTestMixin, TestCase):
+    """
+    行の断片キャッシュ：キーに入れた値のどれかが変われば、その行を描き直す
+    - 確かめ方：updated_at を進めずに名前だけ書き換え（キャッシュが効いていれば古い名前のまま）、
+      キーの1つを変えると新しい名前が出る
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.item = self._item(
+            "水", quantity=5, category=self.water, storage_location=self.shelf,
+            expiry_date=timezone.localdate() + timedelta(days=60),
+        )
+        self._rows()  # 行をキャッシュに入れる
+        InventoryItem.objects.filter(pk=self.item.pk).update(name="新しい名前")
+
+    def _rows(self, **params):
+        return self.client.get(self.url, {"partial": "rows", **params})
+
+    def assertRedrawn(self, redrawn=True, **params):
+        if redrawn:
+            self.assertContains(self._rows(**params), "新しい名前")
+        else:
+            self.assertNotContains(self._rows(**params), "新しい名前")
+
+    def test_row_is_reused_while_key_is_unchanged(self):
+        self.assertRedrawn(False)
+        # 絞り込み・並び替えはキーに入れない（同じ行を使い回す）
+        self.assertRedrawn(False, sort="name")
+
+    def test_item_save_redraws(self):
+        item = InventoryItem.objects.get(pk=self.item.pk)
+        with self.captureOnCommitCallbacks():
+            item.save()
+
+        self.assertRedrawn()
+
+    def test_image_variants_redraw(self):
+        InventoryItem.objects.filter(pk=self.item.pk).update(image_variants={"source": "x"})
+
+        self.assertRedrawn()
+
+    def test_new_day_redraws(self):
+        tomorrow = timezone.localdate() + timedelta(days=1)
+        with mock.patch.object(timezone, "localdate", return_value=tomorrow):
+            self.assertRedrawn()
+
+    def test_alert_setting_redraws(self):
+        setting = AlertSetting.objects.create(household=self.household, quantity_threshold=5)
+        self.assertRedrawn()
+
+        InventoryItem.objects.filter(pk=self.item.pk).update(name="もっと新しい名前")
+        setting.expiry_days = 90
+        setting.save()
+        self.assertContains(self._rows(), "もっと新しい名前")
+
+    def test_category_and_location_changes_redraw(self):
+        self.water.color = "#000000"
+        self.water.save()
+        self.assertRedrawn()
+
+        InventoryItem.objects.filter(pk=self.item.pk).update(name="もっと新しい名前")
+        self.shelf.name = "物置"
+        self.shelf.save()
+        self.assertContains(self._rows(), "もっと新しい名前")
+
+    def test_select_mode_is_a_separate_row(self):
+        self.assertRedrawn(select_mode="1")
+        self.assertRedrawn(False)
@@ -0,0 +1,61 @@
+"""
+商品・ロットの使用（inventory.services.lots）
+"""
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from accounts.models import Household
+from inventory.models import InventoryItem, QuantityLedger
+from inventory.services import lots
+
+
+class ConsumeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.household = Household.objects.create(name="ロットテスト家")
+
+    def setUp(self):
+        today = timezone.localdate()
+        self.later = self._lot(2, expiry_date=today + timedelta(days=10))
+        self.sooner = self._lot(2, expiry_date=today + timedelta(days=3))
+        self.no_expiry = self._lot(5)
+        self.product = self.sooner.product
+
+    def _lot(self, quantity, **kwargs):
+        return InventoryItem.objects.create(household=self.household, name="牛乳", quantity=quantity, **kwargs)
+
+    def _quantities(self):
+        return [InventoryItem.objects.get(pk=i.pk).quantity for i in (self.sooner, self.later, self.no_expiry)]
+
+    def test_takes_nearest_expiry_first(self):
+        with self.captureOnCommitCallbacks():
+            taken = lots.consume(self.product, 3)
+
+        self.assertEqual(taken, [(self.sooner.pk, 2), (self.later.pk, 1)])
+        self.assertEqual(self._quantities(), [0, 1, 5])
+        self.assertEqual(
+            sorted(QuantityLedger.objects.filter(reason="consume").values_list("item_id", "delta")),
+            sorted([(self.sooner.pk, -2), (self.later.pk, -1)]),
+        )
+
+    def test_shortfall_rolls_back(self):
+        with self.assertRaises(lots.InsufficientStock) as raised:
+            lots.consume(self.product, 10)
+
+        self.assertEqual(raised.exception.available, 9)
+        self.assertEqual(self._quantities(), [2, 2, 5])
+        self.assertFalse(QuantityLedger.objects.filter(reason="consume").exists())
+
+    def test_lot_moved_to_history_after_read_is_skipped(self):
+        stale = list(lots._fefo_lots(self.product))
+        InventoryItem.objects.filter(pk=self.sooner.pk).update(is_deleted=True)
+
+        with mock.patch.object(lots, "_fefo_lots", return_value=stale), self.captureOnCommitCallbacks():
+            taken = lots.consume(self.product, 2)
+
+        self.assertEqual(taken, [(self.later.pk, 2)])
+        self.assertEqual(self._quantities(), [2, 0, 5])
+        self.assertFalse(QuantityLedger.objects.filter(reason="consume", item_id=self.sooner.pk).exists())
@@ -0,0 +1,136 @@
+"""
+在庫画像の参照数と削除（inventory.services.media / gc_media）
+"""
+import os
+from datetime import timedelta
+from io import StringIO
+
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from accounts.models import Household
+from inventory.models import InventoryItem, MediaFile
+from inventory.services import media, thumbnails
+from inventory.tests.media import TemporaryMediaMixin, image_file
+
+
+class MediaGarbageCollectionTests(TemporaryMediaMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.household = Household.objects.create(name="画像GCテスト家")
+
+    def setUp(self):
+        self.storage = InventoryItem._meta.get_field("image").storage
+
+    def _item(self, name, image=None):
+        # 縮小画像のワーカーには渡さない（コミット後の処理を実行しない）
+        with self.captureOnCommitCallbacks():
+            return InventoryItem.objects.create(household=self.household, name=name, quantity=1, image=image)
+
+    def _ref_count(self, name):
+        return MediaFile.objects.get(name=name).ref_count
+
+    def _age(self, name, hours=48):
+        MediaFile.objects.filter(name=name).update(updated_at=timezone.now() - timedelta(hours=hours))
+
+    def test_ref_counts_follow_create_replace_and_delete(self):
+        a = self._item("水", image_file())
+        b = self._item("水（複製）", image_file())
+        name = a.image.name
+        self.assertEqual(b.image.name, name)
+        self.assertEqual(self._ref_count(name), 2)
+
+        # 複製（pk=None で保存し直す）も参照を増やす
+        b.pk = None
+        b.save()
+        self.assertEqual(self._ref_count(name), 3)
+
+        a.image = image_file(color="blue")
+        a.save()
+        self.assertEqual(self._ref_count(name), 2)
+        self.assertEqual(self._ref_count(a.image.name), 1)
+
+        InventoryItem.objects.get(pk=b.pk).delete()
+        self.assertEqual(self._ref_count(name), 1)
+
+    def test_unreferenced_file_and_variants_are_collected_after_grace(self):
+        item = self._item("水", image_file())
+        name = item.image.name
+        thumbnails.generate_variants_for_source(name)
+        variants = InventoryItem.objects.get(pk=item.pk).image_variants
+        item.delete()
+
+        # 猶予時間内は残す
+        self.assertEqual(media.collect_garbage(), {"files": 0, "bytes": 0, "fixed": 0})
+        self.assertTrue(self.storage.exists(name))
+
+        self._age(name)
+        size = self.storage.size(name)
+        result = media.collect_garbage()
+
+        self.assertEqual(result["files"], 1)
+        self.assertGreater(result["bytes"], size)  # 縮小画像の分も数える
+        self.assertFalse(self.storage.exists(name))
+        for size_key in thumbnails.VARIANT_SIZES:
+            self.assertFalse(self.storage.exists(variants[size_key]["webp"]))
+        self.assertFalse(MediaFile.objects.filter(name=name).exists())
+
+    def test_reupload_before_gc_keeps_the_file(self):
+        item = self._item("水", image_file())
+        name = item.image.name
+        item.delete()
+        self._age(name)
+
+        # 同じ画像のアップロード（保存の前に MediaFile.touch で猶予の起点を進める）
+        self.assertEqual(self.storage.save("inventory_images/photo.png", image_file()), name)
+
+        self.assertEqual(media.collect_garbage()["files"], 0)
+        self.assertTrue(self.storage.exists(name))
+
+    def test_stale_count_is_fixed_instead_of_deleting(self):
+        item = self._item("水", image_file())
+        name = item.image.name
+        MediaFile.objects.filter(name=name).update(ref_count=0)
+        self._age(name)
+
+        self.assertEqual(media.collect_garbage(), {"files": 0, "bytes": 0, "fixed": 1})
+        self.assertTrue(self.storage.exists(name))
+        self.assertEqual(self._ref_count(name), 1)
+
+    def test_rebuild_and_dry_run_command(self):
+        kept = self._item("水", image_file()).image.name
+        gone_item = self._item("米", image_file(color="blue"))
+        gone = gone_item.image.name
+        gone_item.delete()
+        MediaFile.objects.filter(name=kept).update(ref_count=5)
+        self._age(gone)
+
+        out = StringIO()
+        call_command("gc_media", "--rebuild", "--dry-run", stdout=out)
+
+        self.assertIn("削除予定：1ファイル", out.getvalue())
+        self.assertTrue(self.storage.exists(gone))
+        self.assertEqual(self._ref_count(kept), 1)
+
+        call_command("gc_media", stdout=StringIO())
+        self.assertFalse(self.storage.exists(gone))
+        self.assertTrue(self.storage.exists(kept))
+
+    def test_scan_removes_old_untracked_files_only(self):
+        referenced = self._item("水", image_file()).image.name
+        MediaFile.objects.filter(name=referenced).delete()
+        old = self.storage.save("inventory_images/ab/orphan.png", ContentFile(b"x" * 10))
+        MediaFile.objects.filter(name=old).delete()
+        recent = self.storage.save("inventory_images/cd/recent.png", ContentFile(b"y"))
+        MediaFile.objects.filter(name=recent).delete()
+
+        past = (timezone.now() - timedelta(days=2)).timestamp()
+        for name in (referenced, old):
+            os.utime(self.storage.path(name), (past, past))
+
+        self.assertEqual(media.collect_untracked(), {"files": 1, "bytes": 10})
+        self.assertFalse(self.storage.exists(old))
+        self.assertTrue(self.storage.exists(recent))
+        self.assertTrue(self.storage.exists(referenced))
@@ -0,0 +1,103 @@
+"""
+画像の配信（MediaServeView）：自分の世帯の在庫の画像・縮小画像だけを返す
+"""
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from accounts.models import Household
+from inventory.models import InventoryItem
+from inventory.services import thumbnails
+from inventory.tests.media import TemporaryMediaMixin, image_file
+
+
+class MediaServeTests(TemporaryMediaMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.household = Household.objects.create(name="配信テスト家")
+        cls.other = Household.objects.create(name="よその家")
+        cls.user = get_user_model().objects.create_user("alice", password="p", household=cls.household)
+
+    def setUp(self):
+        self.storage = InventoryItem._meta.get_field("image").storage
+        self.mine = self._item(self.household, "水", image_file(color="red"))
+        self.theirs = self._item(self.other, "米", image_file(color="blue"))
+        for item in (self.mine, self.theirs):
+            thumbnails.generate_variants_for_source(item.image.name)
+            item.refresh_from_db()
+        self.client.force_login(self.user)
+
+    def _item(self, household, name, image, **kwargs):
+        # 縮小画像のワーカーには渡さない（このテストの中で作る）
+        with self.captureOnCommitCallbacks():
+            return InventoryItem.objects.create(household=household, name=name, quantity=1, image=image, **kwargs)
+
+    def _get(self, name, **headers):
+        return self.client.get(reverse("media", args=[name]), **headers)
+
+    def test_own_source_and_variants_are_served(self):
+        names = [self.mine.image.name] + [
+            self.mine.image_variants[size_key][ext]
+            for size_key in thumbnails.VARIANT_SIZES for ext in ("webp", "jpg")
+        ]
+        for name in names:
+            with self.subTest(name=name):
+                response = self._get(name)
+
+                self.assertEqual(response.status_code, 200)
+                with self.storage.open(name) as fp:
+                    self.assertEqual(b"".join(response.streaming_content), fp.read())
+                self.assertIn("immutable", response["Cache-Control"])
+
+    def test_other_household_source_and_variants_are_hidden(self):
+        names = [self.theirs.image.name] + [
+            self.theirs.image_variants[size_key][ext]
+            for size_key in thumbnails.VARIANT_SIZES for ext in ("webp", "jpg")
+        ]
+        for name in names:
+            with self.subTest(name=name):
+                self.assertTrue(self.storage.exists(name))
+                self.assertEqual(self._get(name).status_code, 404)
+
+    def test_shared_file_is_served_to_each_household_that_uses_it(self):
+        # 同じ画像は1ファイルを共有する。自分の世帯に使う在庫があれば見られる
+        self._item(self.household, "米（うち）", image_file(color="blue"))
+
+        self.assertEqual(self._get(self.theirs.image.name).status_code, 200)
+
+    def test_history_items_stay_visible(self):
+        InventoryItem.objects.filter(pk=self.mine.pk).update(is_deleted=True)
+
+        self.assertEqual(self._get(self.mine.image.name).status_code, 200)
+        self.assertEqual(self._get(self.mine.image_variants["thumb"]["webp"]).status_code, 200)
+
+    def test_unreferenced_and_traversal_paths_are_404(self):
+        orphan = self.storage.save("inventory_images/orphan.png", image_file(color="green"))
+
+        for name in (orphan, "inventory_images/../../settings.py", "inventory_images/variants/unknown_thumb.webp"):
+            with self.subTest(name=name):
+                self.assertEqual(self._get(name).status_code, 404)
+
+    def test_anonymous_is_redirected_to_login(self):
+        self.client.logout()
+
+        response = self._get(self.mine.image.name)
+
+        self.assertEqual(response.status_code, 302)
+        self.assertNotIn("ETag", response)
+
+    def test_etag_revalidation(self):
+        etag = self._get(self.mine.image.name)["ETag"]
+
+        self.assertEqual(self._get(self.mine.image.name, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # 縮小画像は元画像と別の ETag
+        self.assertNotEqual(self._get(self.mine.image_variants["thumb"]["webp"])["ETag"], etag)
+
+    @override_settings(MEDIA_SERVE_BACKEND="x-accel", MEDIA_ACCEL_PREFIX="/protected-media/")
+    def test_x_accel_hands_off_only_after_the_check(self):
+        response = self._get(self.mine.image.name)
+        self.assertEqual(response["X-Accel-Redirect"], "/protected-media/" + self.mine.image.name)
+
+        response = self._get(self.theirs.image.name)
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn("X-Accel-Redirect", response)
@@ -0,0 +1,73 @@
+"""
+設定画面（SettingsTabsView）：表示中のタブだけ読み、GET では書き込まない
+"""
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.models import AlertSetting, Household
+from inventory.models import Category, StorageLocation
+
+WRITE_PREFIXES = ("INSERT", "UPDATE", "DELETE", "SAVEPOINT", "BEGIN")
+
+
+class SettingsTabsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.household = Household.objects.create(name="設定テスト家")
+        cls.other = Household.objects.create(name="よその家")
+        cls.user = get_user_model().objects.create_user("alice", password="p", household=cls.household)
+        Category.objects.create(household=cls.household, name="飲料")
+        Category.objects.create(household=cls.other, name="よその分類")
+        StorageLocation.objects.create(household=cls.household, name="納戸")
+        StorageLocation.objects.create(household=cls.other, name="よその場所")
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.url = reverse("inventory:settings_tabs")
+
+    def _get(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response, [q["sql"] for q in queries]
+
+    def test_get_never_writes(self):
+        for tab in ("category", "storage", "alert", "unknown"):
+            with self.subTest(tab=tab):
+                _response, queries = self._get(tab=tab)
+
+                self.assertEqual([sql for sql in queries if sql.startswith(WRITE_PREFIXES)], [])
+        self.assertFalse(AlertSetting.objects.filter(household=self.household).exists())
+
+    def test_only_active_tab_is_read(self):
+        category_table = Category._meta.db_table
+        location_table = StorageLocation._meta.db_table
+        alert_table = AlertSetting._meta.db_table
+
+        response, queries = self._get(tab="category")
+        self.assertContains(response, "飲料")
+        self.assertNotContains(response, "よその分類")
+        self.assertFalse(any(location_table in sql or alert_table in sql for sql in queries))
+
+        response, queries = self._get(tab="storage")
+        self.assertContains(response, "納戸")
+        self.assertNotContains(response, "よその場所")
+        self.assertFalse(any(category_table in sql or alert_table in sql for sql in queries))
+
+        # 知らないタブは分類タブ
+        response, _queries = self._get(tab="unknown")
+        self.assertEqual(response.context["tab"], "category")
+
+    def test_alert_tab_shows_defaults_then_saved_values(self):
+        response, _queries = self._get(tab="alert")
+        form = response.context["form"]
+        self.assertIsNone(form.instance.pk)
+        self.assertEqual((form["quantity_threshold"].value(), form["expiry_days"].value()), (1, 30))
+
+        AlertSetting.objects.create(household=self.household, quantity_threshold=4, expiry_days=7)
+        response, _queries = self._get(tab="alert")
+        form = response.context["form"]
+        self.assertEqual((form["quantity_threshold"].value(), form["expiry_days"].value()), (4, 7))
@@ -0,0 +1,55 @@
+"""
+買い物リスト（inventory.services.shopping）
+"""
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from accounts.models import AlertSetting, Household
+from inventory.models import InventoryItem
+from inventory.services import shopping
+
+
+class ShoppingListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.household = Household.objects.create(name="買い物テスト家")
+        AlertSetting.objects.create(household=cls.household, quantity_threshold=2, expiry_days=7)
+
+    def setUp(self):
+        self.today = timezone.localdate()
+        # 結果は世帯の版数入りキーでキャッシュされる（テストごとに版数が巻き戻るので消しておく）
+        cache.clear()
+
+    def _item(self, name, quantity, **kwargs):
+        return InventoryItem.objects.create(household=self.household, name=name, quantity=quantity, **kwargs)
+
+    def _lines(self):
+        result = shopping.build_shopping_list(self.household, today=self.today)
+        return {entry["name"]: entry for group in result["groups"] for entry in group["entries"]}
+
+    def test_lots_are_one_line_checked_against_product_total(self):
+        # どのロットも閾値以下だが、合計は閾値より多い
+        for _ in range(3):
+            self._item("缶詰", 1)
+        # 合計でも閾値以下
+        self._item("乾パン", 1)
+        self._item("乾パン", 1)
+
+        lines = self._lines()
+
+        self.assertNotIn("缶詰", lines)
+        self.assertEqual(lines["乾パン"]["amount"], 1)
+        self.assertEqual(lines["乾パン"]["reasons"], ["残り2個"])
+
+    def test_expiry_uses_nearest_lot_and_expiring_quantity(self):
+        soon = self.today + timedelta(days=2)
+        self._item("牛乳", 4, expiry_date=soon)
+        self._item("牛乳", 5, expiry_date=self.today + timedelta(days=30))
+
+        line = self._lines()["牛乳"]
+
+        self.assertEqual(line["amount"], 4)
+        self.assertEqual(line["reasons"], [f"期限 {soon:%m/%d}"])
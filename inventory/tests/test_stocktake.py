@@ -0,0 +1,91 @@
+"""
+棚卸し（inventory.services.stocktake）
+"""
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import Household
+from inventory.models import InventoryItem, QuantityLedger, StocktakeEntry
+from inventory.services import stocktake
+
+
+class StocktakeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.household = Household.objects.create(name="棚卸しテスト家")
+        cls.user = get_user_model().objects.create_user("alice", password="p", household=cls.household)
+
+    def setUp(self):
+        self.touched = self._item("画像だけ更新")
+        self.edited = self._item("数量を編集")
+        self.deleted = self._item("履歴へ移動")
+        self.plain = self._item("そのまま")
+        self.session = stocktake.start(self.household, self.user)
+        stocktake.save_counts(self.session, {
+            self.touched.pk: 3, self.edited.pk: 4, self.deleted.pk: 5, self.plain.pk: 6,
+        })
+
+        # 棚卸し中の変更：数量を変えない更新・数量の編集・論理削除
+        InventoryItem.objects.filter(pk=self.touched.pk).update(updated_at=timezone.now() + timedelta(minutes=1))
+        InventoryItem.objects.filter(pk=self.edited.pk).update(quantity=2)
+        InventoryItem.objects.filter(pk=self.deleted.pk).update(is_deleted=True)
+
+    def _item(self, name):
+        return InventoryItem.objects.create(household=self.household, name=name, quantity=1)
+
+    def test_only_quantity_changes_conflict(self):
+        conflicts = {row["id"]: row["conflict"] for row in stocktake.compute_diff(self.session)}
+
+        self.assertEqual(conflicts, {
+            self.touched.pk: None, self.edited.pk: "edited", self.deleted.pk: "deleted", self.plain.pk: None,
+        })
+
+    def test_apply_skips_conflicts_unless_overwritten(self):
+        with self.captureOnCommitCallbacks():
+            result = stocktake.apply(self.session)
+
+        self.assertEqual(result, {"applied": 2, "skipped": 2})
+        quantities = dict(InventoryItem.objects.values_list("id", "quantity"))
+        self.assertEqual(quantities[self.touched.pk], 3)
+        self.assertEqual(quantities[self.plain.pk], 6)
+        self.assertEqual(quantities[self.edited.pk], 2)
+        self.assertEqual(quantities[self.deleted.pk], 1)
+        self.assertEqual(QuantityLedger.objects.filter(reason="stocktake").count(), 2)
+        # 反映済みの棚卸しはもう反映しない
+        self.assertEqual(stocktake.apply(self.session), {"applied": 0, "skipped": 0})
+
+    def test_apply_overwrites_selected_edit(self):
+        with self.captureOnCommitCallbacks():
+            result = stocktake.apply(self.session, overwrite_ids=[str(self.edited.pk)])
+
+        self.assertEqual(result, {"applied": 3, "skipped": 1})
+        self.assertEqual(InventoryItem.objects.get(pk=self.edited.pk).quantity, 4)
+
+    def test_start_copies_quantities(self):
+        session = stocktake.start(self.household, self.user)
+
+        self.assertEqual(session.pk, self.session.pk)  # 棚卸し中のものを続ける
+        self.assertEqual(
+            dict(StocktakeEntry.objects.filter(session=session).values_list("item_id", "expected_quantity")),
+            {item.pk: 1 for item in (self.touched, self.edited, self.deleted, self.plain)},
+        )
+
+    def test_view_saves_counts_and_rejects_malformed_payload(self):
+        self.client.force_login(self.user)
+        url = reverse("inventory:stocktake", args=[self.session.pk])
+
+        response = self.client.post(url, {"counts": {str(self.plain.pk): 7}}, content_type="application/json")
+        self.assertEqual(response.json(), {"saved": 1})
+
+        for body in ("{", "[]", '{"counts": [1]}', {"counts": {str(self.plain.pk): -1}}, {"counts": {"x": 1}}):
+            with self.subTest(body=body):
+                response = self.client.post(url, body, content_type="application/json")
+
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("error", response.json())
+
+        self.assertEqual(StocktakeEntry.objects.get(session=self.session, item=self.plain).counted_quantity, 7)
@@ -0,0 +1,136 @@
+"""
+オフライン同期（inventory.services.sync）
+"""
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import Household
+from inventory.models import InventoryItem, Memo, QuantityLedger, SyncTombstone
+from inventory.services import ledger, sync
+
+
+@override_settings(INVENTORY_SYNC_SAFETY_SECONDS=0)
+class SyncTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.household = Household.objects.create(name="同期テスト家")
+        cls.user = get_user_model().objects.create_user("alice", password="p", household=cls.household)
+
+    def _item(self, name, quantity=1):
+        return InventoryItem.objects.create(household=self.household, name=name, quantity=quantity)
+
+    def _pull_all(self, cursor="", limit=2):
+        rows, deleted = [], []
+        while True:
+            page = sync.changes(self.household, cursor, limit)
+            for kind, kind_rows in page["changes"].items():
+                rows.extend((kind, row[0]) for row in kind_rows)
+            deleted.extend(page["deleted"])
+            cursor = page["cursor"]
+            if not page["has_more"]:
+                return rows, deleted, cursor
+
+    def test_pages_then_returns_only_later_changes(self):
+        items = [self._item(f"在庫{i}") for i in range(5)]
+        memo = Memo.objects.create(household=self.household, user=self.user, title="メモ", body="")
+
+        rows, deleted, cursor = self._pull_all()
+        self.assertEqual(sorted(rows), sorted([("item", i.pk) for i in items] + [("memo", memo.pk)]))
+        self.assertEqual(deleted, [])
+
+        items[2].quantity = 9
+        items[2].save()
+        memo_pk = memo.pk
+        memo.delete()
+
+        rows, deleted, _cursor = self._pull_all(cursor)
+        self.assertEqual(rows, [("item", items[2].pk)])
+        self.assertEqual(deleted, [[SyncTombstone.KIND_MEMO, memo_pk]])
+
+    def test_expired_cursor_is_410(self):
+        old = sync.to_micros(timezone.now() - timedelta(days=sync.tombstone_days() + 1))
+        self.client.force_login(self.user)
+
+        response = self.client.get(reverse("inventory:sync"), {"cursor": sync.encode_cursor(old, {})})
+
+        self.assertEqual(response.status_code, 410)
+        self.assertTrue(response.json()["reset"])
+
+    def test_invalid_cursor_is_400(self):
+        self.client.force_login(self.user)
+
+        response = self.client.get(reverse("inventory:sync"), {"cursor": "not-a-cursor"})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_stale_base_is_conflict_and_not_applied(self):
+        item = self._item("水", quantity=3)
+        base = sync.to_micros(item.updated_at)
+        item.quantity = 5
+        item.save()
+
+        mutation = {"type": "item", "op": "upsert", "id": item.pk, "base": base, "fields": {"quantity": 1}}
+        with self.captureOnCommitCallbacks():
+            conflict = sync.apply_mutations(self.household, self.user, [mutation])
+
+        self.assertEqual(conflict[0]["status"], "conflict")
+        self.assertEqual(InventoryItem.objects.get(pk=item.pk).quantity, 5)
+
+        item.refresh_from_db()
+        mutation["base"] = sync.to_micros(item.updated_at)
+        with self.captureOnCommitCallbacks():
+            ok = sync.apply_mutations(self.household, self.user, [mutation])
+
+        self.assertEqual(ok[0]["status"], "ok")
+        self.assertEqual(InventoryItem.objects.get(pk=item.pk).quantity, 1)
+        self.assertEqual(
+            list(QuantityLedger.objects.filter(reason="edit", item_id=item.pk).values_list("delta", flat=True)), [-4]
+        )
+
+    def test_ledger_is_written_with_each_mutation(self):
+        item = self._item("水", quantity=3)
+        edit = {"type": "item", "op": "upsert", "id": item.pk, "base": sync.to_micros(item.updated_at),
+                "fields": {"quantity": 1}}
+        create = {"type": "item", "op": "upsert", "ref": "r" * 32,
+                  "fields": {"name": "米", "quantity": 2, "content_amount": 1}}
+
+        # 2件目の途中で落ちても、反映済みの1件目の履歴は残り、2件目は行も履歴も残らない
+        with mock.patch.object(sync, "_prepare", side_effect=[None, RuntimeError]), \
+                self.captureOnCommitCallbacks(), self.assertRaises(RuntimeError):
+            sync.apply_mutations(self.household, self.user, [edit, create])
+
+        self.assertEqual(InventoryItem.objects.get(pk=item.pk).quantity, 1)
+        self.assertEqual(list(QuantityLedger.objects.values_list("item_id", "delta")), [(item.pk, -2)])
+        self.assertFalse(InventoryItem.objects.filter(name="米").exists())
+
+    def test_failed_ledger_write_rolls_back_mutation(self):
+        item = self._item("水", quantity=3)
+        mutation = {"type": "item", "op": "delete", "id": item.pk, "base": sync.to_micros(item.updated_at)}
+
+        with mock.patch.object(ledger, "record", side_effect=RuntimeError), self.assertRaises(RuntimeError):
+            sync.apply_mutations(self.household, self.user, [mutation])
+
+        self.assertFalse(InventoryItem.objects.get(pk=item.pk).is_deleted)
+
+    def test_view_rejects_malformed_payload_before_writing(self):
+        item = self._item("水", quantity=3)
+        valid = {"type": "item", "op": "upsert", "id": item.pk, "base": sync.to_micros(item.updated_at),
+                 "fields": {"quantity": 1}}
+        self.client.force_login(self.user)
+
+        for body in ("{", b"\xff\xfe{", "[]", '{"mutations": {}}',
+                     {"mutations": [valid, {"type": ["item"], "op": "upsert"}]},
+                     {"mutations": [valid, {"type": "item", "op": "upsert", "id": 1, "base": "x"}]}):
+            with self.subTest(body=body):
+                response = self.client.post(reverse("inventory:sync"), body, content_type="application/json")
+
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("error", response.json())
+
+        self.assertEqual(InventoryItem.objects.get(pk=item.pk).quantity, 3)
+        self.assertFalse(QuantityLedger.objects.exists())
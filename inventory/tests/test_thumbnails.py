@@ -0,0 +1,89 @@
+"""
+縮小画像の作成（inventory.services.thumbnails / backfill_image_variants）
+"""
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from PIL import Image
+
+from accounts.models import Household
+from inventory.models import InventoryItem
+from inventory.services import thumbnails
+from inventory.tests.media import TemporaryMediaMixin, image_file
+
+
+class ThumbnailTests(TemporaryMediaMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.household = Household.objects.create(name="画像テスト家")
+        cls.user = get_user_model().objects.create_user("alice", password="p", household=cls.household)
+
+    def setUp(self):
+        caches["fragments"].clear()
+        self.storage = InventoryItem._meta.get_field("image").storage
+
+    def _item(self, name, image=None):
+        # 縮小画像のワーカーには渡さない（コミット後の処理を実行しない）
+        with self.captureOnCommitCallbacks():
+            return InventoryItem.objects.create(household=self.household, name=name, quantity=1, image=image)
+
+    def test_variants_are_shared_by_items_with_same_image(self):
+        a = self._item("水", image_file(size=(800, 600)))
+        b = self._item("水（複製）", image_file(size=(800, 600)))
+        self.assertEqual(a.image.name, b.image.name)
+
+        self.assertEqual(thumbnails.generate_variants_for_source(a.image.name), 2)
+
+        a.refresh_from_db()
+        variants = a.image_variants
+        self.assertEqual(variants["source"], a.image.name)
+        for size_key, px in thumbnails.VARIANT_SIZES.items():
+            for ext in ("webp", "jpg"):
+                with self.subTest(size=size_key, ext=ext), self.storage.open(variants[size_key][ext]) as fp:
+                    self.assertEqual(max(Image.open(fp).size), px)
+        self.assertEqual(InventoryItem.objects.get(pk=b.pk).image_variants, variants)
+
+    def test_derived_variants_do_not_touch_updated_at(self):
+        item = self._item("水", image_file())
+
+        thumbnails.generate_variants_for_source(item.image.name)
+
+        self.assertEqual(InventoryItem.objects.get(pk=item.pk).updated_at, item.updated_at)
+
+    def test_existing_files_are_reused_unless_forced(self):
+        item = self._item("水", image_file(mode="RGBA", color=(0, 0, 255, 0)))
+        thumbnails.generate_variants_for_source(item.image.name)
+
+        with mock.patch.object(self.storage, "save", wraps=self.storage.save) as save:
+            thumbnails.generate_variants_for_source(item.image.name)
+            self.assertEqual(save.call_count, 0)
+
+            thumbnails.generate_variants_for_source(item.image.name, force=True)
+            self.assertEqual(save.call_count, len(thumbnails.VARIANT_SIZES) * len(thumbnails.VARIANT_FORMATS))
+
+    def test_backfill_fills_missing_variants(self):
+        with_image = [self._item(f"画像{i}", image_file(color=color)) for i, color in enumerate(("red", "blue"))]
+        without_image = self._item("画像なし")
+
+        call_command("backfill_image_variants", "--sync", stdout=StringIO())
+
+        for item in with_image:
+            item.refresh_from_db()
+            self.assertFalse(thumbnails.needs_variants(item))
+        self.assertEqual(InventoryItem.objects.get(pk=without_image.pk).image_variants, {})
+
+    def test_cached_list_row_picks_up_new_variants(self):
+        item = self._item("水", image_file())
+        self.client.force_login(self.user)
+        url = reverse("inventory:inventory_list")
+
+        self.assertNotContains(self.client.get(url), "<picture>")
+
+        thumbnails.generate_variants_for_source(item.image.name)
+
+        self.assertContains(self.client.get(url), "<picture>", count=1)
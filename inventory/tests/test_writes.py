@@ -0,0 +1,96 @@
+"""
+書き込みのやり直し（inventory.services.writes）
+"""
+from unittest import mock, skipUnless
+
+from django.db import OperationalError, connection, transaction
+from django.test import TransactionTestCase, override_settings
+
+from accounts.models import Household
+from inventory.services import writes
+
+
+class RunTests(TransactionTestCase):
+    """
+    run() はトランザクションの外で呼ばれたときだけやり直す。TestCase は全体が atomic の中なので
+    TransactionTestCase で確かめる
+    """
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(writes.time, "sleep")
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _flaky(self, failures, message="database is locked"):
+        """failures 回だけ、行を作ってからロック待ちで失敗する書き込み"""
+        calls = []
+
+        def write():
+            calls.append(connection.in_atomic_block)
+            household = Household.objects.create(name=f"{len(calls)}回目")
+            if len(calls) <= failures:
+                raise OperationalError(message)
+            return household
+
+        return write, calls
+
+    def test_retries_locked_writes_and_rolls_back_failed_attempts(self):
+        write, calls = self._flaky(2)
+
+        household = writes.run(write)
+
+        self.assertEqual(calls, [True, True, True])  # 毎回トランザクションの中
+        self.assertEqual(self.sleep.call_count, 2)
+        self.assertLess(self.sleep.call_args_list[0].args[0], self.sleep.call_args_list[1].args[0])
+        self.assertEqual(list(Household.objects.values_list("name", flat=True)), [household.name])
+        self.assertEqual(household.name, "3回目")
+
+    def test_gives_up_after_retries(self):
+        write, calls = self._flaky(writes.RETRIES + 1)
+
+        with self.assertRaises(OperationalError):
+            writes.run(write)
+
+        self.assertEqual(len(calls), writes.RETRIES + 1)
+        self.assertFalse(Household.objects.exists())
+
+    def test_other_errors_are_not_retried(self):
+        write, calls = self._flaky(1, message="no such table: x")
+
+        with self.assertRaises(OperationalError):
+            writes.run(write)
+
+        self.assertEqual(len(calls), 1)
+        self.sleep.assert_not_called()
+
+    def test_inside_atomic_calls_through_without_retry(self):
+        write, calls = self._flaky(1)
+
+        with self.assertRaises(OperationalError), transaction.atomic():
+            writes.run(write)
+
+        self.assertEqual(len(calls), 1)
+        self.sleep.assert_not_called()
+        self.assertFalse(Household.objects.exists())
+
+    def test_decorator_passes_arguments(self):
+        @writes.retry_on_locked
+        def create(name, *, target_days):
+            return Household.objects.create(name=name, target_days=target_days)
+
+        self.assertEqual(create("デコレーター", target_days=7).target_days, 7)
+
+    @skipUnless(connection.vendor == "sqlite", "SQLite のときだけ書き込みを1本ずつ流す")
+    @override_settings(INVENTORY_SQLITE_SERIALIZE_WRITES=True)
+    def test_sqlite_writes_hold_the_process_lock(self):
+        held = []
+        writes.run(lambda: held.append(writes._locks[connection.alias].locked()))
+
+        self.assertEqual(held, [True])
+        self.assertFalse(writes._locks[connection.alias].locked())
+
+    def test_is_locked(self):
+        self.assertTrue(writes.is_locked(OperationalError("database is locked")))
+        self.assertTrue(writes.is_locked(OperationalError("database table is locked: inventory_item")))
+        self.assertFalse(writes.is_locked(OperationalError("disk I/O error")))
@@ -0,0 +1,20 @@
+"""
+parallel.gather（別スレッド・別のDB接続で読む async API）を呼ぶテストの部品
+"""
+from unittest import mock
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class ThreadConnectionsMixin:
+    """
+    別スレッドの接続を、読むたびに閉じる（CONN_MAX_AGE=0 にする）
+    - 接続を持ったままのスレッドが残ると、PostgreSQL でテスト用DBを消せなくなる
+    - 別の接続から見えるよう、データをコミットする TransactionTestCase と組み合わせる
+    """
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.dict(connections.settings[DEFAULT_DB_ALIAS], {"CONN_MAX_AGE": 0})
+        patcher.start()
+        self.addCleanup(patcher.stop)
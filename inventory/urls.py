@@ -17,6 +17,25 @@ urlpatterns = [
     path("<int:pk>/edit/", views.InventoryUpdateView.as_view(), name="inventory_edit"),
     path("<int:pk>/delete/", views.InventoryDeleteView.as_view(), name="inventory_delete"),
     path("<int:pk>/duplicate/", views.InventoryDuplicateView.as_view(), name="inventory_duplicate"),
+
+    # 数量の増減をまとめて反映（JSON）
+    path("adjust/", views.InventoryAdjustView.as_view(), name="inventory_adjust"),
+    path("sync/", views.SyncView.as_view(), name="sync"),
+    path("events/", views.InventoryEventsView.as_view(), name="inventory_events"),
+
+    # 読み取り専用 JSON API（async）
+    path("api/items/", views.InventoryItemsApiView.as_view(), name="api_items"),
+    path("api/balance/", views.BalanceApiView.as_view(), name="api_balance"),
+    path("api/history/", views.HistoryApiView.as_view(), name="api_history"),
+    path("api/autocomplete/", views.AutocompleteApiView.as_view(), name="api_autocomplete"),
+
+    # 棚卸し（開始 → 数えた数を途中保存 → 差分を確認して反映）
+    path("stocktake/start/", views.StocktakeStartView.as_view(), name="stocktake_start"),
+    path("stocktake/<int:pk>/", views.StocktakeView.as_view(), name="stocktake"),
+    path("stocktake/<int:pk>/diff/", views.StocktakeDiffView.as_view(), name="stocktake_diff"),
+
+    # 商品（同じ名前のロット）を期限の近い順に使う
+    path("products/<int:pk>/consume/", views.ProductConsumeView.as_view(), name="product_consume"),
   
     # 一括削除
     path("bulk-delete/", views.InventoryBulkDeleteView.as_view(), name="inventory_bulk_delete"),
@@ -25,6 +44,13 @@ urlpatterns = [
     # 一括複製
     path("bulk-duplicate/", views.InventoryBulkDuplicateView.as_view(), name="inventory_bulk_duplicate"),
     path("bulk-duplicate/execute/", views.InventoryBulkDuplicateExecuteView.as_view(), name="inventory_bulk_duplicate_execute"),    
+
+    # 直前の一括削除・一括複製・一括編集を元に戻す
+    path("undo/", views.InventoryUndoView.as_view(), name="inventory_undo"),
+
+    # 一括編集
+    path("bulk-edit/", views.InventoryBulkEditView.as_view(), name="inventory_bulk_edit"),
+    path("bulk-edit/execute/", views.InventoryBulkEditExecuteView.as_view(), name="inventory_bulk_edit_execute"),
     
     # 過去一覧（History）
     path("history/", views.InventoryHistoryListView.as_view(), name="inventory_history"),
@@ -52,6 +78,10 @@ urlpatterns = [
     
     # バランス確認（Balance）
     path("balance/", views.BalanceView.as_view(), name="balance"),
+    path("balance/pivot/", views.BalancePivotView.as_view(), name="balance_pivot"),
+
+    # 買い物リスト（?format=txt / csv でダウンロード）
+    path("shopping/", views.ShoppingListView.as_view(), name="shopping_list"),
     
     # 分類（Category）
     path("category/", views.CategoryListView.as_view(), name="category_list"),
@@ -67,6 +97,7 @@ urlpatterns = [
    
     # 設定（タブ統合）
     path("settings/", views.SettingsTabsView.as_view(), name="settings_tabs"),
+    path("settings/export/", views.HouseholdExportView.as_view(), name="household_export"),
 
     # 設定互換URL
     path(
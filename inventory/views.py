@@ -3,10 +3,10 @@ from django.shortcuts import render
 
 
 # 自分のアプリのモデル
-from .models import InventoryItem, Category, StorageLocation, Memo
+from .models import InventoryItem, Category, StorageLocation, Memo, Product, StocktakeSession
 
 # 自作：世帯必須Mixin（世帯が無いユーザーは弾くため）
-from .mixins import HouseholdRequiredMixin
+from .mixins import AsyncHouseholdRequiredMixin, HouseholdRequiredMixin, IdempotentPostMixin
 
 # Django：ログイン必須にするMixin（未ログインならログイン画面へ）
 from django.contrib.auth.mixins import LoginRequiredMixin
@@ -46,7 +46,15 @@ from django.db import models
 
 
 # バランス確認
-from .services.balance import calc_category_amounts
+from .services.balance import calc_category_amounts, calc_category_location_matrix
+from .services.charts import balance_charts
+from .services.forecast import attach_forecast, get_daily_rates
+from .services import adjust, alerts, backup, batches, deletion, events, ledger, lots, parallel, stocktake, sync
+from .services.shopping import build_shopping_list, to_csv, to_text
+from .services.supply import apply_required_amount, member_counts
+from .services.versions import bump_household_version, household_cache_key
+from django.core.cache import cache
+from django.http import JsonResponse
 
 # Django：現在時刻（期限切れ判定やused_at更新に使う）
 from django.utils import timezone
@@ -58,14 +66,14 @@ from accounts.forms import CustomUserCreationForm
 
 # ★ 追加：世帯ごとの閾値（AlertSetting）を取得する
 # 「世帯で1つだけ」の設定値を在庫一覧の判定基準として使う
-from accounts.models import AlertSetting
+from accounts.models import AlertSetting, Household
 from accounts.forms import AlertSettingForm
 
 # ★追加：在庫フォーム（期限入力対応）
-from .forms import InventoryItemForm
+from .forms import InventoryBulkEditForm, InventoryItemForm
 
 # アラート判定
-from datetime import date, timedelta
+from datetime import date, datetime, timedelta
 
 # 複製
 from django.views import View
@@ -92,6 +100,19 @@ from .models import Category
 
 from django.utils.http import url_has_allowed_host_and_scheme
 
+# 画像配信（MediaServeView）
+import json
+import mimetypes
+import os
+from urllib.parse import quote
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+
+from .services.thumbnails import source_stem_for_variant
+from .storage import content_digest
+
 
 
 class NextUrlMixin:
@@ -131,9 +152,10 @@ class NoHouseholdView(TemplateView):
 # ----------------------------
 # 招待リンク発行画面（ログイン必須）
 # ----------------------------
-class InviteCreateView(LoginRequiredMixin, HouseholdRequiredMixin, TemplateView):
+class InviteCreateView(LoginRequiredMixin, HouseholdRequiredMixin, IdempotentPostMixin, TemplateView):
     """
     - household必須（HouseholdRequiredMixinで担保）
+    - 二重送信では招待リンクを2つ作らず、1回目に発行したリンクを表示し直す
     """
     template_name = "inventory/invite/create.html"
     EXPIRE_HOURS = 24  # 有効期限（時間）
@@ -192,6 +214,19 @@ class InviteCreateView(LoginRequiredMixin, HouseholdRequiredMixin, TemplateView)
     def redirect_top(self):
         return redirect("inventory:inventory_list")
 
+    def idempotency_outcome(self, response):
+        # 発行できたときだけ、発行したリンクを結果として保存する
+        data = getattr(response, "context_data", None) or {}
+        if not data.get("invite_url"):
+            return None
+        return "", {"invite_url": data["invite_url"], "expires_at": data["expires_at"].isoformat()}
+
+    def idempotency_replay(self, record):
+        context = self.get_context_data()
+        context["invite_url"] = record.payload["invite_url"]
+        context["expires_at"] = datetime.fromisoformat(record.payload["expires_at"])
+        return self.render_to_response(context)
+
 
 # ----------------------------
 # 招待リンクを開いたときの受け口
@@ -331,6 +366,48 @@ class InviteTokenDeleteView(LoginRequiredMixin, HouseholdRequiredMixin, DeleteVi
 # 在庫（Inventory）一覧画面（ログイン必須）
 # ----------------------------
 
+def filter_inventory_items(qs, params):
+    """
+    在庫一覧の ?category= / ?storage= / ?q= / ?sort= を queryset に反映する
+    - 一覧画面（InventoryListView）と JSON 版（InventoryItemsApiView）で同じ結果にする
+    """
+    # GETパラメータによる絞り込み（分類）
+    category_id = params.get("category")
+    if category_id:
+        qs = qs.filter(category_id=category_id)
+
+    # GETパラメータによる絞り込み（保管場所）
+    storage_id = params.get("storage")
+    if storage_id:
+        qs = qs.filter(storage_location_id=storage_id)
+
+    # GETパラメータによる検索（商品名）
+    q = params.get("q")
+    if q:
+        qs = qs.filter(name__icontains=q)
+
+    # GETパラメータによる並び替え
+    sort = params.get("sort", "")
+
+    if sort == "expiry":
+        # 期限が近い順（未設定は最後）
+        qs = qs.order_by(models.F("expiry_date").asc(nulls_last=True), "name")
+
+    elif sort == "quantity":
+        # 数量が少ない順（同数は名前順）
+        qs = qs.order_by("quantity", "name")
+
+    elif sort == "name":
+        # 名前順（50音順相当）
+        qs = qs.order_by("name")
+
+    else:
+        # デフォルト（いままでの表示順を維持したいなら何もしない）
+        pass
+
+    return qs
+
+
 # 在庫（Inventory）一覧ページ（スマホ前提）（ログイン必須）
 class InventoryListView(LoginRequiredMixin, HouseholdRequiredMixin, ListView):
     """
@@ -340,14 +417,28 @@ class InventoryListView(LoginRequiredMixin, HouseholdRequiredMixin, ListView):
     ② GETパラメータ (?category=, ?storage=) があれば絞り込み
     ③ 各在庫に「アラート判定結果（赤/青）」と「残日数」を付与して
        テンプレートに渡す
+    ④ ?partial=rows のときは、件数と在庫の行（_list_rows.html）だけ返す
+       → 絞り込み・並び替え・検索を、ページ全体を読み直さずに差し替える（一覧の JS から使う）
 
     ※ データベースには保存せず、
        表示用の一時的な属性を item に追加している
     """
     model = InventoryItem
     template_name = "inventory/list.html"
+    partial_template_name = "inventory/_list_rows.html"
     context_object_name = "items"   # テンプレ側で {% for item in items %} と書ける
 
+    # 行の断片キャッシュ（_list_rows.html）の有効期限（秒）。日付がキーに入るので1日で十分
+    ROW_CACHE_TIMEOUT = 60 * 60 * 24
+
+    def is_partial(self):
+        return self.request.GET.get("partial") == "rows"
+
+    def get_template_names(self):
+        if self.is_partial():
+            return [self.partial_template_name]
+        return super().get_template_names()
+
     # ① 一覧の取得（データ取得部分）
     def get_queryset(self):
         """
@@ -368,41 +459,8 @@ class InventoryListView(LoginRequiredMixin, HouseholdRequiredMixin, ListView):
             .select_related("storage_location", "category")
         )
 
-        # GETパラメータによる絞り込み（分類）
-        category_id = self.request.GET.get("category")
-        if category_id:
-            qs = qs.filter(category_id=category_id)
-
-        # GETパラメータによる絞り込み（保管場所）
-        storage_id = self.request.GET.get("storage")
-        if storage_id:
-            qs = qs.filter(storage_location_id=storage_id)
-
-        # GETパラメータによる検索（商品名）
-        q = self.request.GET.get("q")
-        if q:
-            qs = qs.filter(name__icontains=q)
-        
-        # GETパラメータによる並び替え
-        sort = self.request.GET.get("sort", "")
-
-        if sort == "expiry":
-            # 期限が近い順（未設定は最後）
-            qs = qs.order_by(models.F("expiry_date").asc(nulls_last=True), "name")
-
-        elif sort == "quantity":
-            # 数量が少ない順（同数は名前順）
-            qs = qs.order_by("quantity", "name")
-
-        elif sort == "name":
-            # 名前順（50音順相当）
-            qs = qs.order_by("name")
-
-        else:
-            # デフォルト（いままでの表示順を維持したいなら何もしない）
-            pass
-            
-        return qs
+        # GETパラメータによる絞り込み・検索・並び替え（JSON 版と共通）
+        return filter_inventory_items(qs, self.request.GET)
 
     def get_context_data(self, **kwargs):
         """
@@ -418,13 +476,19 @@ class InventoryListView(LoginRequiredMixin, HouseholdRequiredMixin, ListView):
 
         household = self.request.user.household
 
-        # 絞り込みフォーム用の選択肢
-        context["categories"] = Category.objects.filter(household=household).order_by("name")
-        context["storages"] = StorageLocation.objects.filter(household=household).order_by("name")
+        # 行だけ返すときは、フォームの選択肢・元に戻すボタン・版数を作らない（クエリを減らす）
+        partial = self.is_partial()
+        if not partial:
+            # 絞り込みフォーム用の選択肢
+            context["categories"] = Category.objects.filter(household=household).order_by("name")
+            context["storages"] = StorageLocation.objects.filter(household=household).order_by("name")
+
+            # 今選ばれている値（テンプレの selected 用）
+            context["selected_category"] = self.request.GET.get("category", "")
+            context["selected_storage"] = self.request.GET.get("storage", "")
 
-        # 今選ばれている値（テンプレの selected 用）
-        context["selected_category"] = self.request.GET.get("category", "")
-        context["selected_storage"] = self.request.GET.get("storage", "")
+            # 直前の一括削除・一括複製・一括編集（元に戻すボタン用）
+            context["undoable_batch"] = batches.last_undoable(household)
 
         # 一覧（items）を取り出す
         items = context.get("items") or context.get("object_list") or []
@@ -437,49 +501,27 @@ class InventoryListView(LoginRequiredMixin, HouseholdRequiredMixin, ListView):
         today = timezone.localdate()
 
         # ✅ accounts.AlertSetting を世帯で1件取得。なければデフォルトで動かす
-        DEFAULT_ALERT = {
-            "quantity_threshold": 1,  # 青（個数）
-            "expiry_days": 30,        # 青（期限日数）
-        }
-
-        setting = AlertSetting.objects.filter(household=household).first()
-        if setting is None:
-            alert = DEFAULT_ALERT
-        else:
-            alert = {
-                "quantity_threshold": setting.quantity_threshold,
-                "expiry_days": setting.expiry_days,
-            }
+        alert = self._get_alert_setting()
+
+        # 行の断片キャッシュのキー（_list_rows.html）
+        context["today"] = today
+        context["alert"] = alert
+        context["row_cache_timeout"] = self.ROW_CACHE_TIMEOUT
 
-        # 各在庫アイテムごとに判定を付与
+        # 各在庫アイテムごとに判定を付与（ライブ更新の判定と同じ alerts.alert_state）
         for item in items:
-            # 残り日数を計算（expiry_date がない場合は None）
-            if item.expiry_date is None:
-                days_left = None
-            else:
-                days_left = (item.expiry_date - today).days
-
-            item.days_left = days_left
-
-            qty = item.quantity or 0  # None対策
-
-            # ✅ 赤（固定）：在庫0 または 期限<=0日
-            red_by_qty = (qty <= 0)
-            red_by_days = (days_left is not None) and (days_left <= 0)
-            item.is_red = red_by_qty or red_by_days
-
-            # ✅ 青（設定連動）：赤じゃない場合だけ
-            if not item.is_red:
-                blue_by_qty = (qty <= alert["quantity_threshold"])
-                blue_by_days = (days_left is not None) and (days_left <= alert["expiry_days"])
-                item.is_blue = blue_by_qty or blue_by_days
-            else:
-                item.is_blue = False
-                
+            state, item.days_left = alerts.alert_state(item.quantity, item.expiry_date, alert, today)
+            item.is_red = state == alerts.RED
+            item.is_blue = state == alerts.BLUE
+
             # テンプレ互換（既存テンプレは is_alert_* を参照しているため）
             item.is_alert_red = item.is_red
             item.is_alert_blue = item.is_blue
 
+        if not partial:
+            # ライブ更新（SSE）の接続時に、表示中のデータが古くないか確かめる
+            context["data_version"] = household.data_version
+
         return context
     
     def _get_alert_setting(self):
@@ -487,20 +529,12 @@ class InventoryListView(LoginRequiredMixin, HouseholdRequiredMixin, ListView):
         accounts.AlertSetting を世帯で1件取得。
         無ければデフォルトを返す（落ちないための保険）。
         """
-        household = self.request.user.household
-        setting = AlertSetting.objects.filter(household=household).first()
-
-        if setting is None:
-            return self.DEFAULT_ALERT
-
-        return {
-            "quantity_threshold": setting.quantity_threshold,
-            "expiry_days": setting.expiry_days,
-        }
+        return alerts.alert_setting(self.request.user.household)
             
 # 在庫（Inventory）を追加する画面（ログイン必須）
-class InventoryCreateView(LoginRequiredMixin, HouseholdRequiredMixin, CreateView):
+class InventoryCreateView(LoginRequiredMixin, HouseholdRequiredMixin, IdempotentPostMixin, CreateView):
     """
+    - 二重送信（同じ idempotency_key）では2件目を作らず、1回目と同じ画面へ戻す
     - form_valid() で InventoryItem.household を自動セットする（世帯ひも付け漏れ防止）
     - get_form() で Category の候補を「自分の世帯だけ」に絞る（他世帯カテゴリ混入防止）
     """
@@ -523,8 +557,12 @@ class InventoryCreateView(LoginRequiredMixin, HouseholdRequiredMixin, CreateView
 
         # ★ここで household を詰める
         form.instance.household = self.request.user.household
-        
-        return super().form_valid(form)
+
+        response = super().form_valid(form)
+
+        # 数量の増減履歴（追加）
+        ledger.record([ledger.entry_for(self.object, self.object.quantity, "create")])
+        return response
 
     def get_form(self, form_class=None):
         """
@@ -553,7 +591,246 @@ class InventoryDetailView(LoginRequiredMixin, HouseholdRequiredMixin, DetailView
 
     def get_queryset(self):
         return InventoryItem.objects.filter(household=self.request.user.household)
-    
+
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        # 同じ名前のロット（期限違い）の合計と使う順
+        if self.object.product_id and not self.object.is_deleted:
+            ctx["product"] = lots.product_summary(self.object.product)
+        return ctx
+
+# 商品（同じ名前のロットのまとまり）を N 個使う（ログイン必須）
+class ProductConsumeView(LoginRequiredMixin, HouseholdRequiredMixin, View):
+    """
+    - 期限の近いロットから減らす（lots.consume）
+    - fetch / JSON で呼ばれたら JSON、フォーム送信なら元の画面へ戻す
+    """
+
+    def post(self, request, pk):
+        product = get_object_or_404(Product, pk=pk, household=request.user.household)
+        wants_json = "application/json" in request.headers.get("Accept", "")
+
+        try:
+            quantity = int(request.POST.get("quantity", 1))
+            if quantity <= 0:
+                raise ValueError
+        except (TypeError, ValueError):
+            if wants_json:
+                return JsonResponse({"error": "数量は1以上の数字で入力してください。"}, status=400)
+            messages.error(request, "数量は1以上の数字で入力してください。")
+            return redirect(self._next_url(request))
+
+        try:
+            taken = lots.consume(product, quantity)
+        except lots.InsufficientStock as e:
+            if wants_json:
+                return JsonResponse({"error": str(e), "available": e.available}, status=409)
+            messages.error(request, f"{product.name}：{e}")
+            return redirect(self._next_url(request))
+
+        if wants_json:
+            summary = lots.product_summary(product)
+            summary["taken"] = [{"id": item_id, "quantity": take} for item_id, take in taken]
+            return JsonResponse(summary)
+
+        messages.success(request, f"{product.name}を{quantity}個使いました。")
+        return redirect(self._next_url(request))
+
+    def _next_url(self, request):
+        next_url = request.POST.get("next")
+        if next_url and url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()}):
+            return next_url
+        return reverse("inventory:inventory_list")
+
+# 数量の増減をまとめて反映する API（ログイン必須）
+class InventoryAdjustView(LoginRequiredMixin, HouseholdRequiredMixin, View):
+    """
+    POST（JSON）：{"ops": [{"id": 1, "delta": -1}, {"id": 2, "set": 5}, ...]}
+    - 一覧の +/- ボタンの連打をまとめて1リクエストで送る
+    - フォーム全体（画像も）を送り直さないので、他のメンバーの変更を上書きしない
+    - 戻り値：{"items": [{"id", "quantity"}], "missing": [...]}
+    """
+
+    def post(self, request):
+        try:
+            payload = json.loads(request.body or b"{}")
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return JsonResponse({"error": "JSON の形式が正しくありません。"}, status=400)
+        ops = payload.get("ops") if isinstance(payload, dict) else None
+        if not isinstance(ops, list):
+            return JsonResponse({"error": "ops は1件以上のリストで指定してください。"}, status=400)
+
+        # 各操作の形（adjust.normalize）は書き込みより前に全件ぶん確かめる
+        try:
+            result = adjust.apply_adjustments(request.user.household, ops)
+        except adjust.InvalidAdjustment as e:
+            return JsonResponse({"error": str(e)}, status=400)
+        return JsonResponse(result)
+
+# 世帯の在庫の変更をライブで受け取る SSE（ログイン必須）
+class InventoryEventsView(AsyncHouseholdRequiredMixin, View):
+    """
+    text/event-stream で、一覧を開いているメンバーに在庫の変更を送り続ける（events.stream）
+    - 接続を長く持つので async ビュー。ASGI（stocknavi/asgi.py）で動かす前提
+    """
+
+    async def get(self, request):
+        household_id = request.user.household_id
+        version = await Household.objects.filter(pk=household_id).values_list(
+            "data_version", flat=True
+        ).aget()
+        response = StreamingHttpResponse(
+            events.stream(household_id, version),
+            content_type="text/event-stream",
+        )
+        response["Cache-Control"] = "no-cache"
+        # nginx などのプロキシにためこませない
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+# 差分同期 API（オフラインで使うクライアント向け・ログイン必須）
+class SyncView(LoginRequiredMixin, HouseholdRequiredMixin, View):
+    """
+    GET ?cursor=...&limit=...：前回以降の変更を1ページ返す（sync.changes）
+      - cursor なしで全件。has_more の間は返った cursor で続きを取る
+      - cursor が古すぎるときは 410（全件取り直し）
+    POST（JSON）：{"mutations": [...]}：オフライン中の変更をまとめて反映する（sync.apply_mutations）
+      - 競合した変更は上書きせず、サーバーの今の行を返す
+    """
+
+    def get(self, request):
+        try:
+            limit = int(request.GET.get("limit") or sync.DEFAULT_LIMIT)
+            result = sync.changes(request.user.household, request.GET.get("cursor", ""), limit)
+        except sync.CursorExpired as e:
+            return JsonResponse({"error": str(e), "reset": True}, status=410)
+        except ValueError as e:
+            message = str(e) if isinstance(e, sync.InvalidCursor) else "limit は数字で指定してください。"
+            return JsonResponse({"error": message}, status=400)
+        return JsonResponse(result)
+
+    def post(self, request):
+        try:
+            payload = json.loads(request.body or b"{}")
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return JsonResponse({"error": "JSON の形式が正しくありません。"}, status=400)
+        if not isinstance(payload, dict):
+            return JsonResponse({"error": "JSON はオブジェクトで送ってください。"}, status=400)
+
+        # 形の確認（sync._validate）は書き込みより前に全件ぶん行われる
+        try:
+            results = sync.apply_mutations(request.user.household, request.user, payload.get("mutations"))
+        except sync.InvalidMutation as e:
+            return JsonResponse({"error": str(e)}, status=400)
+        return JsonResponse({"results": results})
+
+# ----------------------------
+# 棚卸し（ログイン必須）
+# ----------------------------
+class StocktakeStartView(LoginRequiredMixin, HouseholdRequiredMixin, View):
+    """
+    棚卸しを始める（棚卸し中のものがあれば、それを続ける）
+    """
+
+    def post(self, request):
+        session = stocktake.start(request.user.household, request.user)
+        return redirect("inventory:stocktake", pk=session.pk)
+
+
+class StocktakeSessionMixin:
+    """
+    URL の pk から「自分の世帯の、棚卸し中の」セッションを取る
+    """
+
+    def get_session(self):
+        return get_object_or_404(
+            StocktakeSession,
+            pk=self.kwargs["pk"],
+            household=self.request.user.household,
+            status=StocktakeSession.STATUS_OPEN,
+        )
+
+
+class StocktakeView(LoginRequiredMixin, HouseholdRequiredMixin, StocktakeSessionMixin, TemplateView):
+    """
+    GET ：数えた数の入力画面（保管場所 → 名前の順）
+    POST：JSON {"counts": {在庫ID: 数 or null}} を途中保存（入力欄ごとにまとめて送られる）
+    """
+    template_name = "inventory/stocktake.html"
+
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        session = self.get_session()
+        entries = (
+            session.entries.values(
+                "item_id",
+                "item__name",
+                "expected_quantity",
+                "counted_quantity",
+                location=deletion.live("item__storage_location"),
+            )
+            .order_by(models.F("location").asc(nulls_first=True), "item__name", "item_id")
+        )
+        ctx.update({
+            "session": session,
+            "entries": entries,
+        })
+        return ctx
+
+    def post(self, request, pk):
+        session = self.get_session()
+        try:
+            payload = json.loads(request.body or b"{}")
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return JsonResponse({"error": "JSON の形式が正しくありません。"}, status=400)
+        if not isinstance(payload, dict):
+            return JsonResponse({"error": "JSON はオブジェクトで送ってください。"}, status=400)
+
+        # counts の形（{在庫ID: 数}）は save_counts が書き込みより前に確かめる
+        try:
+            saved = stocktake.save_counts(session, payload.get("counts"))
+        except stocktake.InvalidCount as e:
+            return JsonResponse({"error": str(e)}, status=400)
+        return JsonResponse({"saved": saved})
+
+
+class StocktakeDiffView(LoginRequiredMixin, HouseholdRequiredMixin, StocktakeSessionMixin, View):
+    """
+    GET ：差分と衝突（棚卸し中に編集・削除された在庫）の確認画面
+    POST：action=apply で反映（overwrite_ids の衝突行は上書き）/ action=cancel で中止
+    """
+    template_name = "inventory/stocktake_diff.html"
+
+    def get(self, request, pk):
+        session = self.get_session()
+        diff = stocktake.compute_diff(session)
+        return render(request, self.template_name, {
+            "session": session,
+            "diff": diff,
+            "has_conflicts": any(row["conflict"] for row in diff),
+        })
+
+    def post(self, request, pk):
+        session = self.get_session()
+        action = request.POST.get("action")
+
+        if action == "cancel":
+            stocktake.cancel(session)
+            messages.success(request, "棚卸しを中止しました。")
+            return redirect("inventory:inventory_list")
+
+        if action == "apply":
+            overwrite_ids = [pk for pk in request.POST.getlist("overwrite_ids") if pk.isdigit()]
+            result = stocktake.apply(session, overwrite_ids)
+            message = f"棚卸しを反映しました（{result['applied']}件）。"
+            if result["skipped"]:
+                message += f" 棚卸し中に変更された{result['skipped']}件はそのままにしました。"
+            messages.success(request, message)
+            return redirect("inventory:inventory_list")
+
+        messages.warning(request, "不正な操作です。")
+        return redirect("inventory:stocktake_diff", pk=session.pk)
+
 # 在庫（Inventory）を編集する画面（ログイン必須）
 class InventoryUpdateView(LoginRequiredMixin, HouseholdRequiredMixin, UpdateView):
     """
@@ -570,6 +847,15 @@ class InventoryUpdateView(LoginRequiredMixin, HouseholdRequiredMixin, UpdateView
         編集対象を「ログイン中ユーザーの世帯の在庫」に限定する
         """
         return InventoryItem.objects.filter(household=self.request.user.household)
+
+    def form_valid(self, form):
+        """
+        保存後、数量が変わっていれば増減履歴に残す
+        """
+        before = form.initial.get("quantity") or 0
+        response = super().form_valid(form)
+        ledger.record([ledger.entry_for(self.object, self.object.quantity - before, "edit")])
+        return response
     
     def get_form(self, form_class=None):
         """
@@ -588,7 +874,10 @@ class InventoryUpdateView(LoginRequiredMixin, HouseholdRequiredMixin, UpdateView
         return form
 
 # 在庫（Inventory）を複製する画面（ログイン必須）
-class InventoryDuplicateView(LoginRequiredMixin, HouseholdRequiredMixin, View):
+class InventoryDuplicateView(LoginRequiredMixin, HouseholdRequiredMixin, IdempotentPostMixin, View):
+    """
+    - 二重送信では複製を1件だけ作り、2回目は同じ編集画面へ
+    """
     def post(self, request, pk):
         src = get_object_or_404(
             InventoryItem,
@@ -605,6 +894,7 @@ class InventoryDuplicateView(LoginRequiredMixin, HouseholdRequiredMixin, View):
             content_amount=src.content_amount,
             expiry_date=src.expiry_date,
         )
+        ledger.record([ledger.entry_for(new_item, new_item.quantity, "duplicate")])
 
         return redirect("inventory:inventory_edit", pk=new_item.pk) 
 
@@ -629,7 +919,8 @@ class InventoryDeleteView(LoginRequiredMixin, HouseholdRequiredMixin, DeleteView
         """POSTで論理削除を確実に実行"""
         self.object = self.get_object()
         self.object.is_deleted = True
-        self.object.save(update_fields=["is_deleted"])
+        self.object.save(update_fields=["is_deleted", "updated_at"])
+        ledger.record([ledger.entry_for(self.object, -self.object.quantity, "delete")])
         return redirect(self.success_url)
     
     def delete(self, request, *args, **kwargs):
@@ -639,6 +930,7 @@ class InventoryDeleteView(LoginRequiredMixin, HouseholdRequiredMixin, DeleteView
         self.object = self.get_object()
         self.object.is_deleted = True
         self.object.save()
+        ledger.record([ledger.entry_for(self.object, -self.object.quantity, "delete")])
         return redirect(self.success_url)
 
 # 在庫を一括削除（実行）
@@ -650,11 +942,21 @@ class InventoryBulkDeleteView(LoginRequiredMixin, HouseholdRequiredMixin, View):
             messages.warning(request, "削除する在庫を選択してください。")
             return redirect("inventory:inventory_list")
 
-        updated_count = InventoryItem.objects.filter(
+        qs = InventoryItem.objects.filter(
             household=request.user.household,
             id__in=selected_ids,
             is_deleted=False
-        ).update(is_deleted=True)
+        )
+
+        with transaction.atomic():
+            rows = list(qs.values("id", "quantity", "category_id", "content_amount"))
+            # 元に戻せるように、一括操作の ID を付けて履歴へ
+            batch = batches.begin(request.user.household, request.user, "bulk_delete")
+            updated_count = qs.update(is_deleted=True, operation_batch=batch, updated_at=timezone.now())
+            batches.finish(batch, updated_count)
+            ledger.record(ledger.entries_from_rows(request.user.household_id, rows, -1, "bulk_delete"))
+            events.publish_items(request.user.household_id, [row["id"] for row in rows], ("is_deleted",))
+        bump_household_version(request.user.household_id)
 
         messages.success(request, f"{updated_count}件を履歴に移動しました。")
         return redirect("inventory:inventory_list")
@@ -674,10 +976,16 @@ class InventoryBulkDeleteExecuteView(LoginRequiredMixin, HouseholdRequiredMixin,
             is_deleted=False
         )
 
-        delete_count = qs.count()
-
         # ★物理削除ではなく履歴へ
-        qs.update(is_deleted=True)
+        with transaction.atomic():
+            rows = list(qs.values("id", "quantity", "category_id", "content_amount"))
+            # 元に戻せるように、一括操作の ID を付けて履歴へ
+            batch = batches.begin(request.user.household, request.user, "bulk_delete")
+            delete_count = qs.update(is_deleted=True, operation_batch=batch, updated_at=timezone.now())
+            batches.finish(batch, delete_count)
+            ledger.record(ledger.entries_from_rows(request.user.household_id, rows, -1, "bulk_delete"))
+            events.publish_items(request.user.household_id, [row["id"] for row in rows], ("is_deleted",))
+        bump_household_version(request.user.household_id)
 
         messages.success(request, f"{delete_count}件の在庫を履歴に移動しました。")
 
@@ -705,7 +1013,10 @@ class InventoryBulkDuplicateView(LoginRequiredMixin, HouseholdRequiredMixin, Vie
         })
 
 # 在庫を一括複製（実行）
-class InventoryBulkDuplicateExecuteView(LoginRequiredMixin, HouseholdRequiredMixin, View):
+class InventoryBulkDuplicateExecuteView(LoginRequiredMixin, HouseholdRequiredMixin, IdempotentPostMixin, View):
+    """
+    - 二重送信では複製を1回分だけ作る
+    """
     def post(self, request, *args, **kwargs):
         selected_ids = request.POST.getlist("selected_ids")
 
@@ -719,15 +1030,102 @@ class InventoryBulkDuplicateExecuteView(LoginRequiredMixin, HouseholdRequiredMix
         )
 
         created_count = 0
-        for original in originals:
-            original.pk = None
-            original.id = None
-            original.household = request.user.household
-            original.save()
-            created_count += 1
+        entries = []
+        with transaction.atomic():
+            # 作った在庫に一括操作の ID を付けておく（元に戻す＝まとめて履歴へ）
+            batch = batches.begin(request.user.household, request.user, "bulk_duplicate")
+            for original in originals:
+                original.pk = None
+                original.id = None
+                original.household = request.user.household
+                original.operation_batch = batch
+                original.save()
+                entries.append(ledger.entry_for(original, original.quantity, "bulk_duplicate"))
+                created_count += 1
+            batches.finish(batch, created_count)
+            ledger.record(entries)
 
         messages.success(request, f"{created_count}件の在庫を複製しました。")
         return redirect(reverse("inventory:inventory_list") + "?select_mode=1")
+
+# 直前の一括削除・一括複製・一括編集を元に戻す（ログイン必須）
+class InventoryUndoView(LoginRequiredMixin, HouseholdRequiredMixin, View):
+    """
+    - 一覧の「元に戻す」ボタンから、表示していた操作の ID を受け取る
+      （その間に別の一括操作があれば、古い操作は戻さない）
+    """
+
+    def post(self, request, *args, **kwargs):
+        batch_id = request.POST.get("batch_id", "")
+        restored = batches.undo(request.user.household, batch_id) if batch_id.isdigit() else None
+
+        if restored is None:
+            messages.warning(request, "元に戻せる操作がありません（時間が経ったか、別の操作がありました）。")
+        else:
+            messages.success(request, f"{restored}件を元に戻しました。")
+        return redirect("inventory:inventory_list")
+
+# 在庫を一括編集（確認ページ表示）
+class InventoryBulkEditView(LoginRequiredMixin, HouseholdRequiredMixin, View):
+    """
+    - 選択した在庫の件数・数量合計・期限の範囲などを集計クエリ1回で出す
+      （在庫ごとにクエリしない）
+    - 変更内容を選ぶフォームを出し、実行は InventoryBulkEditExecuteView
+    """
+    template_name = "inventory/bulk_edit_confirm.html"
+
+    def post(self, request, *args, **kwargs):
+        selected_ids = request.POST.getlist("selected_ids")
+
+        if not selected_ids:
+            messages.warning(request, "編集する在庫を選択してください。")
+            return redirect(reverse("inventory:inventory_list") + "?select_mode=1")
+
+        form = InventoryBulkEditForm(household=request.user.household)
+        return self.render_confirm(request, form, selected_ids)
+
+    def render_confirm(self, request, form, selected_ids):
+        summary = InventoryItem.objects.filter(
+            household=request.user.household,
+            id__in=selected_ids,
+            is_deleted=False,
+        ).aggregate(
+            count=Count("id"),
+            total_quantity=Sum("quantity"),
+            categories=Count("category", distinct=True),
+            locations=Count("storage_location", distinct=True),
+            first_expiry=models.Min("expiry_date"),
+            last_expiry=models.Max("expiry_date"),
+        )
+        return render(request, self.template_name, {
+            "form": form,
+            "summary": summary,
+            "selected_ids": selected_ids,
+        })
+
+# 在庫を一括編集（実行）
+class InventoryBulkEditExecuteView(InventoryBulkEditView):
+    """
+    - 分類・保管場所は自分の世帯のものかフォームで検証してから、UPDATE 1回で反映
+    - 変更前の値を一括操作として残すので、一覧の「元に戻す」で戻せる
+    - 入力エラーのときは確認ページを出し直す
+    """
+
+    def post(self, request, *args, **kwargs):
+        selected_ids = request.POST.getlist("selected_ids")
+
+        if not selected_ids:
+            messages.warning(request, "編集対象がありません。")
+            return redirect(reverse("inventory:inventory_list") + "?select_mode=1")
+
+        form = InventoryBulkEditForm(request.POST, household=request.user.household)
+        if not form.is_valid():
+            return self.render_confirm(request, form, selected_ids)
+
+        updated = adjust.apply_bulk_edit(request.user.household, selected_ids, form.changes(), user=request.user)
+
+        messages.success(request, f"{updated}件の在庫を変更しました。")
+        return redirect(reverse("inventory:inventory_list") + "?select_mode=1")
         
 # 履歴一覧（HistoryListView）（ログイン必須）
 class InventoryHistoryListView(LoginRequiredMixin, HouseholdRequiredMixin, ListView):
@@ -787,7 +1185,9 @@ class InventoryHistoryDuplicateView(LoginRequiredMixin, HouseholdRequiredMixin,
 
         item.pk = None
         item.is_deleted = False
+        item.operation_batch = None  # 元の一括操作とは別の在庫にする
         item.save()
+        ledger.record([ledger.entry_for(item, item.quantity, "restore")])
 
         return redirect("inventory:inventory_list")
 
@@ -807,20 +1207,28 @@ class InventoryHistoryBulkDuplicateView(LoginRequiredMixin, HouseholdRequiredMix
         )
 
         created_count = 0
-
-        for item in qs:
-            InventoryItem.objects.create(
-                household=item.household,
-                category=item.category,
-                storage_location=item.storage_location,
-                name=item.name,
-                quantity=item.quantity,
-                content_amount=item.content_amount,
-                expiry_date=item.expiry_date,
-                image=item.image,
-                is_deleted=False,
-            )
-            created_count += 1
+        entries = []
+
+        with transaction.atomic():
+            # 作った在庫に一括操作の ID を付けておく（元に戻す＝まとめて履歴へ）
+            batch = batches.begin(request.user.household, request.user, "bulk_duplicate")
+            for item in qs:
+                new_item = InventoryItem.objects.create(
+                    household=item.household,
+                    category=item.category,
+                    storage_location=item.storage_location,
+                    name=item.name,
+                    quantity=item.quantity,
+                    content_amount=item.content_amount,
+                    expiry_date=item.expiry_date,
+                    image=item.image,
+                    is_deleted=False,
+                    operation_batch=batch,
+                )
+                entries.append(ledger.entry_for(new_item, new_item.quantity, "restore"))
+                created_count += 1
+            batches.finish(batch, created_count)
+            ledger.record(entries)
 
         messages.success(request, f"{created_count}件の履歴を在庫一覧に複製しました。")
         return redirect("inventory:inventory_list")
@@ -829,15 +1237,44 @@ class InventoryHistoryBulkDuplicateView(LoginRequiredMixin, HouseholdRequiredMix
 # バランス確認（Balance）（ログイン必須）
 # ----------------------------
 class BalanceView(LoginRequiredMixin, HouseholdRequiredMixin, TemplateView):
+    """
+    - グラフはサーバー側で SVG にして埋め込む（Chart.js などの外部スクリプト不要）
+    - 世帯のデータ版数が同じ間は ETag で 304 を返す（ページ丸ごとキャッシュ可能）
+    """
     template_name = "inventory/balance.html"
 
+    def _etag(self):
+        household = self.request.user.household
+        storage_id = self.request.GET.get("storage") or "all"
+        # なくなる見込み日は日付で変わるので今日の日付も入れる
+        today = timezone.localdate().isoformat()
+        return f'"balance-{household.pk}-{household.data_version}-{household.target_days}-{storage_id}-{today}"'
+
+    def get(self, request, *args, **kwargs):
+        etag = self._etag()
+
+        # 表示待ちのメッセージがある時は 304 にしない（メッセージが消えてしまうため）
+        if not len(messages.get_messages(request)):
+            not_modified = get_conditional_response(request, etag=etag)
+            if not_modified is not None:
+                return not_modified
+
+        response = super().get(request, *args, **kwargs)
+        response["ETag"] = etag
+        response["Cache-Control"] = "private, no-cache"
+        return response
+
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
 
         household = self.request.user.household
         storage_id = self.request.GET.get("storage") or None
 
-        rows, total = calc_category_amounts(household, storage_id)
+        members = member_counts([household.pk])[household.pk]
+        rows, total = calc_category_amounts(household, storage_id, members=members)
+
+        # 消費ペースからの見込み（保管場所で絞っている時は、その場所の量で計算）
+        attach_forecast(rows, get_daily_rates(household))
 
         storages = StorageLocation.objects.filter(
             household=household
@@ -845,13 +1282,89 @@ class BalanceView(LoginRequiredMixin, HouseholdRequiredMixin, TemplateView):
 
         ctx.update({
             "target_days": household.target_days,
+            "members": members,
             "storage_id": storage_id,
             "storages": storages,
             "rows": rows,
             "total": total,
+            "charts": balance_charts(household, storage_id, rows),
         })
         return ctx
                 
+# ----------------------------
+# バランス確認：分類 × 保管場所（ピボット）（ログイン必須）
+# ----------------------------
+class BalancePivotView(LoginRequiredMixin, HouseholdRequiredMixin, TemplateView):
+    """
+    全保管場所の分類別の量を1画面（1クエリ）で見る
+    - ?format=json で同じ内容を JSON で返す
+    - 結果は世帯のデータ版数でキャッシュする
+    """
+    template_name = "inventory/balance_pivot.html"
+    CACHE_TIMEOUT = 60 * 60
+
+    def get_matrix(self):
+        household = self.request.user.household
+        key = household_cache_key("balance_pivot", household)
+        matrix = cache.get(key)
+        if matrix is None:
+            matrix = calc_category_location_matrix(household)
+            cache.set(key, matrix, self.CACHE_TIMEOUT)
+        return matrix
+
+    def get(self, request, *args, **kwargs):
+        if request.GET.get("format") == "json":
+            return JsonResponse(self.get_matrix())
+        return super().get(request, *args, **kwargs)
+
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        matrix = self.get_matrix()
+
+        # テンプレで列合計を列と並べて回せるようにする
+        ctx.update({
+            "target_days": self.request.user.household.target_days,
+            "locations": matrix["locations"],
+            "rows": matrix["rows"],
+            "column_totals": zip(matrix["locations"], matrix["column_totals"]),
+            "total": matrix["total"],
+        })
+        return ctx
+
+
+# ----------------------------
+# 買い物リスト（ログイン必須）
+# ----------------------------
+class ShoppingListView(LoginRequiredMixin, HouseholdRequiredMixin, TemplateView):
+    """
+    - 分類の不足・残り少ない在庫・期限が近い在庫をまとめて、保管場所ごとに表示
+    - ?format=txt / ?format=csv でダウンロード
+    """
+    template_name = "inventory/shopping_list.html"
+
+    EXPORTS = {
+        "txt": (to_text, "text/plain; charset=utf-8", "shopping_list.txt"),
+        "csv": (to_csv, "text/csv; charset=utf-8", "shopping_list.csv"),
+    }
+
+    def get(self, request, *args, **kwargs):
+        export = self.EXPORTS.get(request.GET.get("format"))
+        if export is None:
+            return super().get(request, *args, **kwargs)
+
+        render_fn, content_type, filename = export
+        response = HttpResponse(
+            render_fn(build_shopping_list(request.user.household)),
+            content_type=content_type,
+        )
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        ctx["shopping"] = build_shopping_list(self.request.user.household)
+        return ctx
+
 # ----------------------------
 # 分類（Category）
 # ----------------------------
@@ -884,7 +1397,7 @@ class CategoryCreateView(LoginRequiredMixin, HouseholdRequiredMixin, CreateView)
     - 他世帯カテゴリを誤作成する事故を防ぐ
     """
     
-    fields = ["name", "description", "color", "goal_amount", "goal_unit"]
+    fields = ["name", "description", "color", "goal_amount", "goal_unit", "daily_rate_per_person"]
     template_name = "category/form.html"
     
     def get_success_url(self):
@@ -895,12 +1408,14 @@ class CategoryCreateView(LoginRequiredMixin, HouseholdRequiredMixin, CreateView)
         保存前に household を自動セットする（世帯ひも付け漏れ防止）
         """
         form.instance.household = self.request.user.household
+        # 1人1日あたりの目安量があれば、目標量は人数×目標日数から計算する
+        apply_required_amount(form.instance)
         return super().form_valid(form)
 
 # 分類（Category）編集（ログイン必須）
 class CategoryUpdateView(LoginRequiredMixin, HouseholdRequiredMixin, UpdateView):
     model = Category
-    fields = ["name", "description", "color", "goal_amount", "goal_unit"]
+    fields = ["name", "description", "color", "goal_amount", "goal_unit", "daily_rate_per_person"]
     template_name = "category/form.html"
 
     def get_success_url(self):
@@ -911,6 +1426,8 @@ class CategoryUpdateView(LoginRequiredMixin, HouseholdRequiredMixin, UpdateView)
         return Category.objects.filter(household=self.request.user.household)
 
     def form_valid(self, form):
+        # 1人1日あたりの目安量があれば、目標量は人数×目標日数から計算する
+        apply_required_amount(form.instance)
         response = super().form_valid(form)
 
         # ✅ next があれば最優先でそこへ戻す（確実）
@@ -925,7 +1442,8 @@ class CategoryDeleteView(LoginRequiredMixin, HouseholdRequiredMixin, DeleteView)
     """
     ポイント：
     - テンプレート名の衝突を防ぐため、template_name を明示する
-    - Category を削除すると、InventoryItem.category は SET_NULL で未分類になる
+    - Category を削除すると、InventoryItem.category は未分類になる
+      （在庫を外すのはワーカー。inventory.services.deletion）
     """
     model = Category
     template_name = "category/category_confirm_delete.html"
@@ -939,6 +1457,10 @@ class CategoryDeleteView(LoginRequiredMixin, HouseholdRequiredMixin, DeleteView)
         """
         return Category.objects.filter(household=self.request.user.household)
 
+    def form_valid(self, form):
+        deletion.schedule_delete(self.get_queryset().filter(pk=self.object.pk))
+        return redirect(self.get_success_url())
+
 # ----------------------------
 # 保管場所（StorageLocation）
 # ----------------------------
@@ -986,10 +1508,10 @@ class StorageLocationListView(LoginRequiredMixin, HouseholdRequiredMixin, ListVi
             messages.warning(request, "削除する保管場所を選択してください。")
             return redirect("inventory:storage_location_list")
 
-        StorageLocation.objects.filter(
+        deletion.schedule_delete(StorageLocation.objects.filter(
             household=request.user.household,
             id__in=ids,
-        ).delete()
+        ))
 
         messages.success(request, "保管場所を削除しました。")
         return redirect("inventory:storage_location_list")
@@ -1038,6 +1560,11 @@ class StorageLocationDeleteView(LoginRequiredMixin, HouseholdRequiredMixin, Dele
         # ★超重要：他世帯の削除を絶対させない
         return StorageLocation.objects.filter(household=self.request.user.household)
 
+    def form_valid(self, form):
+        # 在庫を外すのはワーカー（inventory.services.deletion）。画面からはすぐ消える
+        deletion.schedule_delete(self.get_queryset().filter(pk=self.object.pk))
+        return redirect(self.success_url)
+
 # ----------------------------
 # 設定一覧（ログイン必須）
 # ----------------------------
@@ -1106,7 +1633,7 @@ class SettingsCategoryGoalView(LoginRequiredMixin, HouseholdRequiredMixin, View)
             messages.warning(request, "削除する分類を選択してください。")
             return
 
-        Category.objects.filter(household=household, id__in=ids).delete()
+        deletion.schedule_delete(Category.objects.filter(household=household, id__in=ids))
         messages.success(request, "分類を削除しました。")
         
     def _render(self, request):
@@ -1143,28 +1670,39 @@ class SettingsCategoryGoalView(LoginRequiredMixin, HouseholdRequiredMixin, View)
 class SettingsTabsView(LoginRequiredMixin, HouseholdRequiredMixin, TemplateView):
     """
     /inventory/settings/ を1ページタブ画面にする親View
+    - 表示中のタブ（?tab=）の中身だけ作る（ほかのタブのクエリはしない）
+    - GET では書き込まない（アラート設定が無ければ、保存前の初期値でフォームを出す）
     """
     template_name = "inventory/settings/tabs.html"
 
+    # タブ名 → そのタブの context を作るメソッド
+    TABS = {
+        "category": "_category_context",
+        "storage": "_storage_context",
+        "alert": "_alert_context",
+    }
+
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
 
         # どのタブを表示するか
         tab = self.request.GET.get("tab", "category")
-        if tab not in ["category", "storage", "alert"]:
+        if tab not in self.TABS:
             tab = "category"
         ctx["tab"] = tab
 
         # 世帯情報
         ctx["household"] = self.request.user.household
 
-        # ===== タブ①：分類 =====
+        ctx.update(getattr(self, self.TABS[tab])(self.request.user.household))
+        return ctx
+
+    # ===== タブ①：分類 =====
+    def _category_context(self, household):
         q = self.request.GET.get("q", "")
         sort = self.request.GET.get("sort", "created")
 
-        categories = Category.objects.filter(
-            household=self.request.user.household
-        )
+        categories = Category.objects.filter(household=household)
 
         if q:
             categories = categories.filter(name__icontains=q)
@@ -1174,17 +1712,14 @@ class SettingsTabsView(LoginRequiredMixin, HouseholdRequiredMixin, TemplateView)
         else:
             categories = categories.order_by("id")
 
-        ctx["categories"] = categories
-        ctx["q"] = q
-        ctx["sort"] = sort
+        return {"categories": categories, "q": q, "sort": sort}
 
-        # ===== タブ②：保管場所 =====
+    # ===== タブ②：保管場所 =====
+    def _storage_context(self, household):
         loc_q = self.request.GET.get("loc_q", "")
         loc_sort = self.request.GET.get("loc_sort", "created")
 
-        locations = StorageLocation.objects.filter(
-            household=self.request.user.household
-        )
+        locations = StorageLocation.objects.filter(household=household)
 
         if loc_q:
             locations = locations.filter(name__icontains=loc_q)
@@ -1194,19 +1729,18 @@ class SettingsTabsView(LoginRequiredMixin, HouseholdRequiredMixin, TemplateView)
         else:
             locations = locations.order_by("id")
 
-        ctx["locations"] = locations
-        ctx["loc_q"] = loc_q
-        ctx["loc_sort"] = loc_sort
+        return {"locations": locations, "loc_q": loc_q, "loc_sort": loc_sort}
 
-        # ===== タブ③：アラート（フォームをcontextに渡す）=====
+    # ===== タブ③：アラート（フォームをcontextに渡す）=====
+    def _alert_context(self, household):
         # accounts側のフォームをそのまま使う（Viewをimportしないので安全）
-        alert_setting, _ = AlertSetting.objects.get_or_create(
-            household=self.request.user.household
+        # 無ければ保存していないインスタンス（モデルの初期値）で出す。作るのは保存するとき
+        alert_setting = (
+            AlertSetting.objects.filter(household=household).first()
+            or AlertSetting(household=household)
         )
-        ctx["form"] = AlertSettingForm(instance=alert_setting)
+        return {"form": AlertSettingForm(instance=alert_setting)}
 
-        return ctx 
-    
     def post(self, request, *args, **kwargs):
         tab = request.POST.get("tab") or request.GET.get("tab") or "category"
 
@@ -1251,10 +1785,11 @@ class SettingsTabsView(LoginRequiredMixin, HouseholdRequiredMixin, TemplateView)
                 messages.warning(request, "削除する分類を選択してください。")
                 return redirect(redirect_url)
 
-            Category.objects.filter(
+            # 在庫を外す処理はワーカーに任せる（画面からはすぐ消える）
+            deletion.schedule_delete(Category.objects.filter(
                 household=request.user.household,
                 id__in=selected_ids
-            ).delete()
+            ))
 
             messages.success(request, "分類を削除しました。")
             return redirect(redirect_url)
@@ -1266,10 +1801,10 @@ class SettingsTabsView(LoginRequiredMixin, HouseholdRequiredMixin, TemplateView)
                 messages.warning(request, "削除する保管場所を選択してください。")
                 return redirect(redirect_url)
 
-            StorageLocation.objects.filter(
+            deletion.schedule_delete(StorageLocation.objects.filter(
                 household=request.user.household,
                 id__in=selected_ids
-            ).delete()
+            ))
 
             messages.success(request, "保管場所を削除しました。")
             return redirect(redirect_url)
@@ -1363,3 +1898,264 @@ class MemoBulkDeleteView(LoginRequiredMixin, HouseholdRequiredMixin, View):
         return redirect("inventory:memo_list")
     
 
+
+
+# ----------------------------
+# 読み取り専用 JSON API（async 版・ログイン必須）
+# - ASGI で動かすと、DBを待っている間にスレッドを占有しない
+# - 互いに依存しないクエリは parallel.gather で同時に走らせる
+# ----------------------------
+
+# 在庫一覧（JSON）
+class InventoryItemsApiView(AsyncHouseholdRequiredMixin, View):
+    """
+    在庫一覧画面と同じ絞り込み・並び替え（filter_inventory_items）で、アラート判定付きの在庫を返す
+    - 在庫 ＋ アラート設定 を同時に読む
+    """
+
+    async def get(self, request):
+        household_id = request.user.household_id
+        qs = filter_inventory_items(
+            InventoryItem.objects.filter(household_id=household_id, is_deleted=False),
+            request.GET,
+        ).values(
+            "id", "name", "quantity", "content_amount", "expiry_date",
+            # 削除済みの印が付いた分類・保管場所は未設定として返す（在庫を外すのはワーカー）
+            live_category_id=deletion.live("category", "id"),
+            live_category_name=deletion.live("category"),
+            live_location_id=deletion.live("storage_location", "id"),
+            live_location_name=deletion.live("storage_location"),
+        )
+
+        rows, alert = await parallel.gather(
+            lambda: list(qs),
+            lambda: alerts.alert_setting(household_id),
+        )
+
+        today = timezone.localdate()
+        items = []
+        for row in rows:
+            state, days_left = alerts.alert_state(row["quantity"], row["expiry_date"], alert, today)
+            items.append({
+                "id": row["id"],
+                "name": row["name"],
+                "quantity": row["quantity"],
+                "content_amount": row["content_amount"],
+                "expiry_date": row["expiry_date"],
+                "days_left": days_left,
+                "alert": state,
+                "category": (
+                    {"id": row["live_category_id"], "name": row["live_category_name"]}
+                    if row["live_category_id"] else None
+                ),
+                "storage_location": (
+                    {"id": row["live_location_id"], "name": row["live_location_name"]}
+                    if row["live_location_id"] else None
+                ),
+            })
+
+        return JsonResponse({
+            "items": items,
+            "total_items": len(items),
+            "total_quantity": sum((row["quantity"] or 0) for row in rows),
+        })
+
+# バランス確認（JSON）
+class BalanceApiView(AsyncHouseholdRequiredMixin, View):
+    """
+    バランス確認画面の表（分類ごとの現在量・達成度・見込み）を返す
+    - 分類ごとの集計 ＋ 消費ペース ＋ 人数 を同時に読む
+    """
+
+    async def get(self, request):
+        household = await Household.objects.aget(pk=request.user.household_id)
+        storage_id = request.GET.get("storage") or None
+
+        # 人数は集計の中でも数えるが、COUNT 1回なので待ち合わせずに並べて読む
+        (rows, total), rates, counts = await parallel.gather(
+            lambda: calc_category_amounts(household, storage_id),
+            lambda: get_daily_rates(household),
+            lambda: member_counts([household.pk]),
+        )
+        attach_forecast(rows, rates)
+
+        return JsonResponse({
+            "target_days": household.target_days,
+            "members": counts[household.pk],
+            "storage_id": storage_id,
+            "rows": rows,
+            "total": total,
+        })
+
+# 履歴（JSON）
+class HistoryApiView(AsyncHouseholdRequiredMixin, View):
+    """
+    履歴（論理削除した在庫）を名前順に1ページずつ返す（?page=1〜）
+    - ページの行 ＋ 全件数 を同時に読む
+    """
+    PAGE_SIZE = 50
+
+    async def get(self, request):
+        try:
+            page = max(int(request.GET.get("page") or 1), 1)
+        except ValueError:
+            return JsonResponse({"error": "page は数字で指定してください。"}, status=400)
+
+        qs = InventoryItem.objects.filter(household_id=request.user.household_id, is_deleted=True)
+        start = (page - 1) * self.PAGE_SIZE
+        page_qs = qs.order_by("name", "id").values(
+            "id", "name", "quantity", "expiry_date", "updated_at",
+            # 削除済みの印が付いた分類・保管場所は未設定（null）として返す
+            live_category_name=deletion.live("category"),
+            live_location_name=deletion.live("storage_location"),
+        )[start:start + self.PAGE_SIZE]
+
+        rows, count = await parallel.gather(lambda: list(page_qs), qs.count)
+        for row in rows:
+            row["category__name"] = row.pop("live_category_name")
+            row["storage_location__name"] = row.pop("live_location_name")
+
+        return JsonResponse({
+            "items": rows,
+            "count": count,
+            "page": page,
+            "has_next": start + len(rows) < count,
+        })
+
+# 入力補完（JSON）
+class AutocompleteApiView(AsyncHouseholdRequiredMixin, View):
+    """
+    ?q= で始まる・含む 商品名／分類／保管場所 を返す（在庫登録フォームの入力補完用）
+    - 3種類を同時に読む。q が空なら何も読まない
+    """
+    LIMIT = 10
+
+    async def get(self, request):
+        q = (request.GET.get("q") or "").strip()
+        if not q:
+            return JsonResponse({"products": [], "categories": [], "locations": []})
+
+        household_id = request.user.household_id
+        products, categories, locations = await parallel.gather(
+            lambda: list(
+                Product.objects.filter(household_id=household_id, name__icontains=q)
+                .order_by("name").values_list("name", flat=True)[: self.LIMIT]
+            ),
+            lambda: list(
+                Category.objects.filter(household_id=household_id, name__icontains=q)
+                .order_by("name").values("id", "name")[: self.LIMIT]
+            ),
+            lambda: list(
+                StorageLocation.objects.filter(household_id=household_id, name__icontains=q)
+                .order_by("name").values("id", "name")[: self.LIMIT]
+            ),
+        )
+        return JsonResponse({"products": products, "categories": categories, "locations": locations})
+
+
+# ----------------------------
+# 世帯データの書き出し（ログイン必須）
+# ----------------------------
+class HouseholdExportView(LoginRequiredMixin, HouseholdRequiredMixin, View):
+    """
+    自分の世帯を書き出してダウンロードさせる（export_household コマンドと同じ形式）
+    - ?format=zip：household.jsonl ＋ 画像
+    - それ以外：JSONL だけ
+    - 作りながら送る（全部をメモリに載せない）。大きさは最後まで分からないので Content-Length は付けない
+    """
+    FORMATS = {
+        "jsonl": (backup.export_jsonl, "application/x-ndjson; charset=utf-8"),
+        "zip": (backup.export_zip, "application/zip"),
+    }
+
+    def get(self, request):
+        fmt = request.GET.get("format") or "jsonl"
+        if fmt not in self.FORMATS:
+            return HttpResponse("format は jsonl か zip を指定してください。", status=400)
+
+        household = request.user.household
+        export, content_type = self.FORMATS[fmt]
+        filename = f"stocknavi-household-{household.pk}-{timezone.localdate():%Y%m%d}.{fmt}"
+
+        response = StreamingHttpResponse(export(household), content_type=content_type)
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        response["Cache-Control"] = "private, no-store"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+
+# ----------------------------
+# 在庫画像の配信（ログイン必須・世帯チェックあり）
+# ----------------------------
+class MediaServeView(LoginRequiredMixin, HouseholdRequiredMixin, View):
+    """
+    /media/<name> の画像を「自分の世帯の在庫の画像」のときだけ返す
+
+    - 実際のファイル転送はフロントのWebサーバー（nginx / Apache）に任せる
+      settings.MEDIA_SERVE_BACKEND:
+        "x-accel"   : nginx の X-Accel-Redirect（MEDIA_ACCEL_PREFIX の internal location へ）
+        "x-sendfile": Apache mod_xsendfile などの X-Sendfile
+        "django"    : 開発用。Django がファイルを返す
+    - ハッシュ名の画像は中身が変わらないので、強い ETag と1年キャッシュを付ける
+    """
+
+    IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+    DEFAULT_MAX_AGE = 60 * 60
+
+    def get(self, request, name):
+        storage = InventoryItem._meta.get_field("image").storage
+
+        if not self._is_owned(request.user.household, name):
+            raise Http404
+
+        try:
+            path = storage.path(name)
+        except SuspiciousFileOperation:
+            raise Http404
+        if not os.path.isfile(path):
+            raise Http404
+
+        digest = content_digest(name)
+        if digest:
+            # 縮小画像は元画像と同じハッシュを持つので、ファイル名ごと ETag にする
+            etag = f'"{os.path.splitext(os.path.basename(name))[0]}"'
+            cache_control = f"private, max-age={self.IMMUTABLE_MAX_AGE}, immutable"
+        else:
+            stat = os.stat(path)
+            etag = f'"{stat.st_size:x}-{int(stat.st_mtime):x}"'
+            cache_control = f"private, max-age={self.DEFAULT_MAX_AGE}"
+
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            not_modified["Cache-Control"] = cache_control
+            return not_modified
+
+        content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        backend = getattr(settings, "MEDIA_SERVE_BACKEND", "django")
+
+        if backend == "x-accel":
+            response = HttpResponse(content_type=content_type)
+            prefix = getattr(settings, "MEDIA_ACCEL_PREFIX", "/protected-media/")
+            response["X-Accel-Redirect"] = prefix + quote(name)
+        elif backend == "x-sendfile":
+            response = HttpResponse(content_type=content_type)
+            response["X-Sendfile"] = path
+        else:
+            response = FileResponse(open(path, "rb"), content_type=content_type)
+
+        response["ETag"] = etag
+        response["Cache-Control"] = cache_control
+        return response
+
+    def _is_owned(self, household, name):
+        """
+        その画像（または縮小画像の元画像）を使う在庫が自分の世帯にあるか
+        - 履歴（論理削除済み）の在庫の画像も見られるようにする
+        """
+        items = InventoryItem.objects.filter(household=household)
+
+        stem = source_stem_for_variant(name)
+        if stem is not None:
+            return items.filter(image__startswith=stem + ".").exists()
+
+        return items.filter(image=name).exists()
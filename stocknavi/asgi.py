@@ -5,6 +5,11 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
+
+在庫のライブ更新（/inventory/events/ の SSE）は接続を長く持つ async ビューなので、
+WSGI ではなくこの application で動かす（例：uvicorn stocknavi.asgi:application）。
+イベントの配信は既定ではプロセス内（INVENTORY_EVENTS_BACKEND）なので、
+書き込みも同じ ASGI プロセスで受ける構成にする。
 """
 
 import os
@@ -75,13 +75,48 @@ WSGI_APPLICATION = 'stocknavi.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
+# SQLite を複数人で同時に書き込んでも詰まりにくくする設定（接続を開くたびに PRAGMA を流す）
+# - journal_mode=WAL    ：読み取りと書き込みが互いを待たない（書き込みどうしは1本ずつ）
+# - synchronous=NORMAL  ：WAL では安全なまま fsync を減らせる（電源断で直前のコミットだけ失う可能性）
+# - mmap_size / cache_size：読み取りをメモリで済ませる（mmap 256MB・ページキャッシュ約 64MB）
+# - timeout             ：ロックを取れないときに待つ秒数（busy_timeout）
+# - transaction_mode    ：トランザクションの最初に書き込みロックを取る（BEGIN IMMEDIATE）
+#   読んでから書くトランザクションが途中でロックを取れず、待たずに "database is locked" になるのを防ぐ
+SQLITE_OPTIONS = {
+    "init_command": (
+        "PRAGMA journal_mode=WAL;"
+        "PRAGMA synchronous=NORMAL;"
+        "PRAGMA mmap_size=268435456;"
+        "PRAGMA cache_size=-65536;"
+        "PRAGMA temp_store=MEMORY;"
+    ),
+    "timeout": 20,
+    "transaction_mode": "IMMEDIATE",
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': SQLITE_OPTIONS,
     }
 }
 
+# POSTGRES_DB を指定したら PostgreSQL を使う（psycopg が必要）
+# - 検索の pg_trgm インデックスなどは PostgreSQL のときだけ作られ、
+#   処理の切り替えも接続先を見て行う（inventory.services.backends）
+if os.environ.get("POSTGRES_DB"):
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ["POSTGRES_DB"],
+        'USER': os.environ.get("POSTGRES_USER", ""),
+        'PASSWORD': os.environ.get("POSTGRES_PASSWORD", ""),
+        'HOST': os.environ.get("POSTGRES_HOST", ""),
+        'PORT': os.environ.get("POSTGRES_PORT", ""),
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -134,6 +169,51 @@ AUTH_USER_MODEL = "accounts.CustomUser"
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# 画像配信（MediaServeView）の転送方法
+# - "django"    : 開発用（Django がファイルを返す）
+# - "x-accel"   : nginx。MEDIA_ACCEL_PREFIX を internal location にして MEDIA_ROOT を alias する
+# - "x-sendfile": Apache（mod_xsendfile）
+MEDIA_SERVE_BACKEND = os.environ.get("MEDIA_SERVE_BACKEND", "django")
+MEDIA_ACCEL_PREFIX = "/protected-media/"
+
+# キャッシュ
+# - default  ：集計・グラフなど（世帯の版数入りキーで使う）
+# - fragments：在庫一覧の行の断片（1行1件。件数の上限を超えると古いものから間引く）
+#   複数プロセスで共有したいときは FileBasedCache や Redis などに差し替える
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "fragments": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "inventory-fragments",
+        "TIMEOUT": 60 * 60 * 24,
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    },
+}
+
 # メール送信（開発用）
 EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
-DEFAULT_FROM_EMAIL = "StockNavi <no-reply@example.com>"
\ No newline at end of file
+DEFAULT_FROM_EMAIL = "StockNavi <no-reply@example.com>"
+
+# バックグラウンド処理（画像の縮小など）のスレッド数
+INVENTORY_WORKER_THREADS = 2
+
+# 一括削除・一括複製を「元に戻す」ことができる時間（時間）
+INVENTORY_UNDO_RETENTION_HOURS = 24
+
+# 二重送信防止キーの保持時間（時間）
+INVENTORY_IDEMPOTENCY_TTL_HOURS = 24
+
+# 差分同期：削除の記録（SyncTombstone）を残す日数
+INVENTORY_SYNC_TOMBSTONE_DAYS = 30
+
+# 差分同期：まだコミットされていない書き込みを取りこぼさないよう、直近この秒数の変更は次回に回す
+INVENTORY_SYNC_SAFETY_SECONDS = 2
+
+# SQLite：同じプロセス内の書き込みトランザクション（inventory.services.writes）を1本ずつ順番に流す
+# （ロック待ちのやり直しで取り合うより速い。複数プロセスの間は timeout の待ちで順番になる）
+INVENTORY_SQLITE_SERIALIZE_WRITES = True
+
+# 在庫のライブ更新（SSE）の配信先。既定は同じプロセス内だけに配る
+INVENTORY_EVENTS_BACKEND = "inventory.services.events.InProcessBackend"
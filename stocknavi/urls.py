@@ -20,8 +20,10 @@ urlpatterns = [
     path("invite/", inv_views.InviteCreateView.as_view(), name="invite_create_root"),
     path("invite/<str:token>/", inv_views.InviteAcceptView.as_view(), name="invite_accept_root"),
 
+    # 在庫画像（世帯チェック後、転送はWebサーバーに任せる）
+    path(f"{settings.MEDIA_URL.strip('/')}/<path:name>", inv_views.MediaServeView.as_view(), name="media"),
+
 ]
 
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATICFILES_DIRS[0])    
\ No newline at end of file